@@ -0,0 +1,187 @@
+import heapq
+import math
+import os
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+# (name, span in seconds)
+DEFAULT_WINDOWS: Tuple[Tuple[str, float], ...] = (("1m", 60.0), ("5m", 300.0), ("1h", 3600.0))
+# Each window is a ring of this many buckets, so it slides in steps of span / BUCKETS.
+BUCKETS = 12
+# Directories past ``max_dirs`` in one bucket are counted under this key.
+OTHER_DIR = "(other)"
+
+
+class SpaceSaving:
+    """Top-K heavy hitters in ``k`` counters (Metwally et al.).
+
+    A key that is not tracked replaces the smallest counter and inherits its
+    count as ``error``, so every estimate is an upper bound that is off by
+    at most ``error``. The minimum is found through a lazily pruned heap.
+    """
+
+    def __init__(self, k: int) -> None:
+        self.k = max(1, k)
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, key: str, n: int = 1) -> None:
+        count = self._counts.get(key)
+        if count is None:
+            if len(self._counts) < self.k:
+                count, error = 0, 0
+            else:
+                error = self._pop_min()
+                count = error
+            self._errors[key] = error
+        count += n
+        self._counts[key] = count
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(c, key) for key, c in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> int:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self._counts.get(key) == count:
+                del self._counts[key]
+                del self._errors[key]
+                return count
+
+    def items(self) -> Iterable[Tuple[str, int, int]]:
+        for key, count in self._counts.items():
+            yield key, count, self._errors[key]
+
+
+class _Bucket:
+    __slots__ = ("start", "counts", "paths")
+
+    def __init__(self, start: float, top_k: int) -> None:
+        self.start = start
+        # (directory, event) -> count
+        self.counts: Counter = Counter()
+        self.paths = SpaceSaving(top_k)
+
+
+class _Window:
+    def __init__(self, name: str, span: float, top_k: int, max_dirs: int) -> None:
+        self.name = name
+        self.span = span
+        self.step = span / BUCKETS
+        self._top_k = top_k
+        self._max_dirs = max_dirs
+        self._buckets: Deque[_Bucket] = deque()
+        # Running sums over ``_buckets``, so reads do not re-add every bucket.
+        self.totals: Counter = Counter()
+
+    def add(self, now: float, directory: str, event: str, path: str) -> None:
+        bucket = self._current(now)
+        key = (directory, event)
+        if key not in bucket.counts and len(bucket.counts) >= self._max_dirs:
+            key = (OTHER_DIR, event)
+        bucket.counts[key] += 1
+        self.totals[key] += 1
+        bucket.paths.add(path)
+
+    def expire(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets and buckets[0].start + self.step <= now - self.span:
+            old = buckets.popleft()
+            for key, n in old.counts.items():
+                left = self.totals[key] - n
+                if left > 0:
+                    self.totals[key] = left
+                else:
+                    del self.totals[key]
+
+    def _current(self, now: float) -> _Bucket:
+        start = math.floor(now / self.step) * self.step
+        if not self._buckets or self._buckets[-1].start < start:
+            self._buckets.append(_Bucket(start, self._top_k))
+            self.expire(now)
+        return self._buckets[-1]
+
+    def top_paths(self, limit: int) -> List[Dict[str, Any]]:
+        # Per-bucket sketches add up; so do their error bounds.
+        merged: Dict[str, List[int]] = {}
+        for bucket in self._buckets:
+            for path, count, error in bucket.paths.items():
+                entry = merged.setdefault(path, [0, 0])
+                entry[0] += count
+                entry[1] += error
+        ranked = heapq.nlargest(limit, merged.items(), key=lambda item: item[1][0])
+        return [{"path": path, "count": count, "error": error} for path, (count, error) in ranked]
+
+
+class LiveAggregates:
+    """Rolling per-directory / per-event counts and busiest paths over fixed windows.
+
+    Must be used from the event loop thread. Each event updates one bucket
+    per window; expired buckets are subtracted from running totals, so the
+    cost per event does not grow with traffic or history. Memory is bounded
+    by ``BUCKETS`` x (``max_dirs`` counters + ``top_k`` path counters) per window.
+    """
+
+    def __init__(
+        self,
+        *,
+        windows: Iterable[Tuple[str, float]] = DEFAULT_WINDOWS,
+        top_k: int = 20,
+        max_dirs: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self._windows = [_Window(name, span, max(1, top_k), max(1, max_dirs)) for name, span in windows]
+        self.observed = 0
+
+    @property
+    def window_names(self) -> List[str]:
+        return [w.name for w in self._windows]
+
+    def observe(self, payload: Dict[str, Any]) -> None:
+        self.observe_many((payload,))
+
+    def observe_many(self, payloads: Iterable[Dict[str, Any]]) -> None:
+        now = self._clock()
+        for payload in payloads:
+            path = payload.get("src_path")
+            event = payload.get("event")
+            if not path or not event:
+                continue
+            directory = os.path.dirname(path) or path
+            for window in self._windows:
+                window.add(now, directory, event, path)
+            self.observed += 1
+
+    def snapshot(self, *, window: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        now = self._clock()
+        windows: Dict[str, Any] = {}
+        for w in self._windows:
+            if window is not None and w.name != window:
+                continue
+            w.expire(now)
+            by_event: Counter = Counter()
+            by_dir: Dict[str, Counter] = {}
+            for (directory, event), n in w.totals.items():
+                by_event[event] += n
+                by_dir.setdefault(directory, Counter())[event] += n
+            total = sum(by_event.values())
+            hot = heapq.nlargest(limit, by_dir.items(), key=lambda item: sum(item[1].values()))
+            windows[w.name] = {
+                "span_s": w.span,
+                "events": total,
+                "rate_per_s": round(total / w.span, 3),
+                "by_event": dict(by_event),
+                "hot_dirs": [
+                    {"dir": directory, "count": sum(events.values()), "events": dict(events)}
+                    for directory, events in hot
+                ],
+                "top_paths": w.top_paths(limit),
+            }
+        return {"observed": self.observed, "windows": windows}
@@ -0,0 +1,30 @@
+import asyncio
+from typing import List, TypeVar
+
+T = TypeVar("T")
+
+
+async def drain_batch(queue: asyncio.Queue[T], *, max_size: int, max_wait: float) -> List[T]:
+    batch: List[T] = [await queue.get()]
+    if max_size <= 1:
+        return batch
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait
+
+    while len(batch) < max_size:
+        try:
+            batch.append(queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+
+    return batch
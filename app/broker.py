@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from app.replay import ReplayBuffer
+
+logger = logging.getLogger("hawkeye-broker")
+
+# Frames are JSON lines. Writer -> worker: {"s": stream, "p": payload}.
+# Worker -> writer: first {"hello": {"last_seq": {stream: seq}}}, then {"s": "logs", "p": payload}
+# for records logged inside the worker.
+STREAMS = ("events", "logs")
+LINE_LIMIT = 16 * 1024 * 1024
+
+
+def encode_frame(stream: str, payload: Dict[str, Any]) -> bytes:
+    return json.dumps({"s": stream, "p": payload}, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class _Subscriber:
+    __slots__ = ("writer", "name")
+
+    def __init__(self, writer: asyncio.StreamWriter, name: str) -> None:
+        self.writer = writer
+        self.name = name
+
+
+class EventBroker:
+    """Publishes persisted payloads from the writer process to worker processes over a Unix socket.
+
+    Each payload is encoded once and written to every subscriber. A subscriber
+    whose socket buffer grows past ``max_buffer_bytes`` is disconnected; it
+    reconnects with its last seq and is caught up from the replay buffers.
+    Must be used from the event loop thread.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        replay: Dict[str, ReplayBuffer],
+        on_log: Optional[Callable[[Dict[str, Any]], None]] = None,
+        max_buffer_bytes: int = 8 * 1024 * 1024,
+    ) -> None:
+        self._path = path
+        self._replay = replay
+        self._on_log = on_log
+        self._max_buffer_bytes = max_buffer_bytes
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._subscribers: Set[_Subscriber] = set()
+        self._connected = 0
+        self.published = 0
+        self.dropped_slow = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped_slow": self.dropped_slow,
+        }
+
+    async def start(self) -> None:
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self._path, limit=LINE_LIMIT)
+        logger.info("Broker listening on %s", self._path)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for sub in list(self._subscribers):
+            sub.writer.close()
+        self._subscribers.clear()
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+    def publish(self, stream: str, payload: Dict[str, Any]) -> None:
+        if not self._subscribers:
+            return
+        self.published += 1
+        frame = encode_frame(stream, payload)
+        for sub in list(self._subscribers):
+            self._write(sub, frame)
+
+    def _write(self, sub: _Subscriber, frame: bytes) -> None:
+        transport = sub.writer.transport
+        if transport.is_closing():
+            self._subscribers.discard(sub)
+            return
+        sub.writer.write(frame)
+        if transport.get_write_buffer_size() > self._max_buffer_bytes:
+            self.dropped_slow += 1
+            logger.warning("Broker subscriber %s is too slow, disconnecting", sub.name)
+            self._subscribers.discard(sub)
+            transport.abort()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connected += 1
+        sub = _Subscriber(writer, f"worker-{self._connected}")
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+            hello = hello.get("hello") if isinstance(hello, dict) else None
+            last_seq = hello.get("last_seq") if isinstance(hello, dict) else None
+            self._catch_up(sub, last_seq if isinstance(last_seq, dict) else {})
+            self._subscribers.add(sub)
+            logger.info("Broker subscriber %s connected", sub.name)
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                if isinstance(frame, dict) and frame.get("s") == "logs" and "p" in frame and self._on_log is not None:
+                    self._on_log(frame["p"])
+        # ValueError covers malformed JSON and frames over LINE_LIMIT.
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as exc:
+            logger.warning("Broker subscriber %s failed: %s", sub.name, exc)
+        finally:
+            self._subscribers.discard(sub)
+            writer.close()
+            logger.info("Broker subscriber %s disconnected", sub.name)
+
+    def _catch_up(self, sub: _Subscriber, last_seq: Dict[str, int]) -> None:
+        for stream, seq in last_seq.items():
+            buffer = self._replay.get(stream)
+            if buffer is None or not isinstance(seq, int) or isinstance(seq, bool):
+                continue
+            gap = buffer.since(seq)
+            if gap is None:
+                logger.warning("Broker subscriber %s missed %s older than the replay buffer", sub.name, stream)
+                continue
+            for payload in gap:
+                sub.writer.write(encode_frame(stream, payload))
+
+
+class BrokerClient:
+    """Worker side: receives payloads from the writer and sends worker logs back; reconnects forever."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        on_payload: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        last_seq: Callable[[], Dict[str, int]],
+        retry_interval: float = 1.0,
+    ) -> None:
+        self._path = path
+        self._on_payload = on_payload
+        self._last_seq = last_seq
+        self._retry_interval = retry_interval
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self.connected = asyncio.Event()
+        self.received = 0
+        self.logs_dropped = 0
+        self.bad_frames = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected.is_set(),
+            "received": self.received,
+            "logs_dropped": self.logs_dropped,
+            "bad_frames": self.bad_frames,
+        }
+
+    def send_log(self, payload: Dict[str, Any]) -> None:
+        if self._writer is None or self._writer.transport.is_closing():
+            self.logs_dropped += 1
+            return
+        self._writer.write(encode_frame("logs", payload))
+
+    async def run(self) -> None:
+        warned = False
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self._path, limit=LINE_LIMIT)
+            except (FileNotFoundError, ConnectionError) as exc:
+                if not warned:
+                    logger.warning("Broker at %s is not reachable yet: %s", self._path, exc)
+                    warned = True
+                await asyncio.sleep(self._retry_interval)
+                continue
+
+            warned = False
+            try:
+                await self._session(reader, writer)
+            # ValueError: a frame over LINE_LIMIT; the stream cannot be resynced, so reconnect.
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError) as exc:
+                logger.warning("Broker connection lost: %s", exc)
+            finally:
+                self._writer = None
+                self.connected.clear()
+                writer.close()
+            await asyncio.sleep(self._retry_interval)
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(json.dumps({"hello": {"last_seq": self._last_seq()}}).encode("utf-8") + b"\n")
+        await writer.drain()
+        self._writer = writer
+        self.connected.set()
+        logger.info("Connected to broker at %s", self._path)
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                frame = json.loads(line)
+            except ValueError:
+                self.bad_frames += 1
+                logger.warning("Skipping malformed broker frame (%d bytes)", len(line))
+                continue
+            self.received += 1
+            try:
+                await self._on_payload(frame["s"], frame["p"])
+            except Exception:
+                logger.exception("Failed to handle broker payload")
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import logging
+import os
+import stat
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger("hawkeye-enrichment")
+
+# (st_dev, st_ino, st_size, st_mtime_ns): if none of these changed the content is taken as unchanged.
+StatKey = Tuple[int, int, int, int]
+Fingerprint = Tuple[int, Optional[str]]
+
+HASH_DIGEST_SIZE = 16
+
+
+class HashCache:
+    """LRU of content hashes by ``StatKey``; shared by the pool threads."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._items: "OrderedDict[StatKey, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: StatKey) -> Optional[str]:
+        with self._lock:
+            digest = self._items.get(key)
+            if digest is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return digest
+
+    def put(self, key: StatKey, digest: str) -> None:
+        with self._lock:
+            self._items[key] = digest
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+def _stat_key(st: os.stat_result) -> StatKey:
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, partial(hashlib.blake2b, digest_size=HASH_DIGEST_SIZE)).hexdigest()
+
+
+def fingerprint(path: str, max_bytes: int, cache: HashCache) -> Optional[Fingerprint]:
+    """(size, hash) of a regular file; hash is None above ``max_bytes``. None if the file is gone."""
+    try:
+        st = os.stat(path)
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        if st.st_size > max_bytes:
+            return st.st_size, None
+        key = _stat_key(st)
+        digest = cache.get(key)
+        if digest is None:
+            digest = _hash_file(path)
+            # Written to while we read it: the hash may be torn, so keep it out of the cache.
+            if _stat_key(os.stat(path)) == key:
+                cache.put(key, digest)
+        return st.st_size, digest
+    except OSError:
+        return None
+
+
+class _Slot:
+    __slots__ = ("payload", "ready")
+
+    def __init__(self, payload: Dict[str, Any], ready: bool) -> None:
+        self.payload = payload
+        self.ready = ready
+
+
+class ContentEnricher:
+    """Adds ``size``/``hash`` to file events and drops ``modified`` events whose content did not change.
+
+    Must be used from the event loop thread. Files are stat'ed and hashed on a
+    bounded thread pool and payloads leave in arrival order. While
+    ``max_pending`` lookups are in flight, new events pass through without
+    ``size``/``hash`` rather than queueing more work.
+    """
+
+    def __init__(
+        self,
+        *,
+        loop: asyncio.AbstractEventLoop,
+        sink: Callable[[Dict[str, Any]], None],
+        max_bytes: int,
+        workers: int = 2,
+        max_pending: int = 256,
+        cache_size: int = 65536,
+        max_paths: int = 65536,
+    ) -> None:
+        self._loop = loop
+        self._sink = sink
+        self._max_bytes = max_bytes
+        self._max_pending = max(1, max_pending)
+        self._max_paths = max(1, max_paths)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="hawkeye-hash")
+        self._cache = HashCache(cache_size)
+        self._order: Deque[_Slot] = deque()
+        # path -> hash of the content last emitted for it
+        self._known: "OrderedDict[str, str]" = OrderedDict()
+        self._in_flight = 0
+        self._closed = False
+        self.received = 0
+        self.emitted = 0
+        self.suppressed = 0
+        self.passed_busy = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "received": self.received,
+            "emitted": self.emitted,
+            "suppressed": self.suppressed,
+            "passed_busy": self.passed_busy,
+            "in_flight": self._in_flight,
+            "cache_hits": self._cache.hits,
+            "cache_misses": self._cache.misses,
+        }
+
+    def push(self, payload: Dict[str, Any]) -> None:
+        self.received += 1
+        event = payload.get("event")
+        if payload.get("is_directory") or event not in ("created", "modified", "moved"):
+            slot = _Slot(payload, ready=True)
+        elif self._in_flight >= self._max_pending:
+            self.passed_busy += 1
+            slot = _Slot(payload, ready=True)
+        else:
+            slot = _Slot(payload, ready=False)
+            path = payload.get("dest_path") if event == "moved" else payload.get("src_path")
+            self._in_flight += 1
+            future = self._executor.submit(fingerprint, path, self._max_bytes, self._cache)
+            future.add_done_callback(partial(self._done_threadsafe, slot))
+        self._order.append(slot)
+        self._drain()
+
+    def close(self) -> None:
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        while self._order:
+            self._release(self._order.popleft().payload)
+        self._in_flight = 0
+
+    def _done_threadsafe(self, slot: _Slot, future: Future) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._done, slot, future)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _done(self, slot: _Slot, future: Future) -> None:
+        if self._closed:
+            return
+        self._in_flight -= 1
+        if not future.cancelled():
+            exc = future.exception()
+            if exc is not None:
+                logger.error("Failed to fingerprint %s: %s", slot.payload.get("src_path"), exc)
+            elif future.result() is not None:
+                slot.payload["size"], slot.payload["hash"] = future.result()
+        slot.ready = True
+        self._drain()
+
+    def _drain(self) -> None:
+        while self._order and self._order[0].ready:
+            self._release(self._order.popleft().payload)
+
+    def _release(self, payload: Dict[str, Any]) -> None:
+        event = payload.get("event")
+        src = payload.get("src_path")
+        digest = payload.get("hash")
+        if event == "modified" and digest is not None and self._known.get(src) == digest:
+            self.suppressed += 1
+            return
+
+        if event in ("deleted", "moved"):
+            self._known.pop(src, None)
+        if not payload.get("is_directory") and event != "deleted":
+            path = payload.get("dest_path") if event == "moved" else src
+            if digest is None:
+                self._known.pop(path, None)
+            else:
+                self._remember(path, digest)
+
+        self.emitted += 1
+        self._sink(payload)
+
+    def _remember(self, path: str, digest: str) -> None:
+        self._known[path] = digest
+        self._known.move_to_end(path)
+        if len(self._known) > self._max_paths:
+            self._known.popitem(last=False)
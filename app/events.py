@@ -1,24 +1,51 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Callable, Dict, List, Literal, Optional
+from typing import Any, Callable, Deque, Dict, List, Literal, Optional, Tuple, Union
 
 EventType = Literal["created", "deleted", "modified", "moved"]
 
 logger = logging.getLogger("hawkeye-emitter")
 
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") of the last formatted timestamp.
+_iso_second: Tuple[int, str] = (-1, "")
+
+
+def format_utc_ns(time_ns: int) -> str:
+    global _iso_second
+    sec, rem = divmod(time_ns, 1_000_000_000)
+    cached_sec, prefix = _iso_second
+    if cached_sec != sec:
+        prefix = datetime.fromtimestamp(sec, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        _iso_second = (sec, prefix)
+    return f"{prefix}.{rem // 1_000_000:03d}+00:00"
+
+
 def utc_now() -> str:
-    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    return format_utc_ns(time.time_ns())
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ChangeFileEvent:
+    """A filesystem change as seen by the observer.
+
+    Built on the observer thread, so it only stores what it was given plus the
+    wall-clock and monotonic ``time_ns`` of the observation; the payload dict
+    and ISO timestamp are produced by :meth:`to_dict` when a sink needs them.
+    Equality ignores the timestamps.
+    """
+
     event: EventType
     src_path: str
     dest_path: Optional[str]
     is_directory: bool
+    wall_ns: int = field(default_factory=time.time_ns, compare=False, repr=False)
+    mono_ns: int = field(default_factory=time.monotonic_ns, compare=False, repr=False)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -26,22 +53,165 @@ class ChangeFileEvent:
             "src_path": self.src_path,
             "dest_path": self.dest_path,
             "is_directory": self.is_directory,
-            "timestamp_utc": utc_now(),
+            "timestamp_utc": format_utc_ns(self.wall_ns),
         }
 
 
 Handler = Callable[[ChangeFileEvent], None]
+BatchHandler = Callable[[List[ChangeFileEvent]], None]
+
+QUEUED_OVERFLOW_POLICIES = ("drop-newest", "drop-oldest")
+
+
+class QueuedHandler:
+    """Runs one handler on its own thread behind a bounded queue.
+
+    :meth:`put` is what the observer thread calls: a deque append and an
+    ``Event.set``, never the handler itself. With ``batch_size`` > 1 the
+    handler gets lists of up to ``batch_size`` events, waiting up to
+    ``max_wait`` seconds for a batch to fill.
+    """
+
+    def __init__(
+        self,
+        handler: Union[Handler, BatchHandler],
+        *,
+        name: str,
+        maxsize: int = 10000,
+        overflow: str = "drop-newest",
+        batch_size: int = 1,
+        max_wait: float = 0.0,
+    ) -> None:
+        if overflow not in QUEUED_OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow!r}")
+        self.name = name
+        self._handler = handler
+        self._maxsize = max(1, maxsize)
+        self._overflow = overflow
+        self._batch_size = max(1, batch_size)
+        self._max_wait = max_wait
+        # deque(maxlen) evicts the oldest item itself on append.
+        self._items: Deque[ChangeFileEvent] = deque(maxlen=self._maxsize if overflow == "drop-oldest" else None)
+        self._wake = threading.Event()
+        self._closing = False
+        self.dropped = 0
+        self.handled = 0
+        self.failed = 0
+        self.high_water = 0
+        self._thread = threading.Thread(target=self._run, name=f"hawkeye-handler-{name}", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self._overflow,
+            "depth": len(self._items),
+            "high_water": self.high_water,
+            "dropped": self.dropped,
+            "handled": self.handled,
+            "failed": self.failed,
+        }
+
+    def put(self, evt: ChangeFileEvent) -> None:
+        depth = len(self._items)
+        if depth >= self._maxsize:
+            self.dropped += 1
+            if self._overflow == "drop-newest":
+                return
+        self._items.append(evt)
+        if depth >= self.high_water:
+            self.high_water = depth + 1
+        self._wake.set()
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stops the worker after it has handled what is already queued."""
+        self._closing = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _take(self, count: int) -> List[ChangeFileEvent]:
+        batch: List[ChangeFileEvent] = []
+        while self._items and len(batch) < count:
+            batch.append(self._items.popleft())
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while self._items:
+                batch = self._take(self._batch_size)
+                if len(batch) < self._batch_size and self._max_wait > 0 and not self._closing:
+                    deadline = time.monotonic() + self._max_wait
+                    while len(batch) < self._batch_size and not self._closing:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._wake.wait(remaining):
+                            break
+                        self._wake.clear()
+                        batch.extend(self._take(self._batch_size - len(batch)))
+                self._call(batch)
+            if self._closing:
+                return
+
+    def _call(self, batch: List[ChangeFileEvent]) -> None:
+        try:
+            if self._batch_size > 1:
+                self._handler(batch)
+                self.handled += len(batch)
+                return
+            for evt in batch:
+                try:
+                    self._handler(evt)
+                    self.handled += 1
+                except Exception:
+                    self.failed += 1
+                    logger.exception("Event handler %s failed: %s", self.name, evt)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Event handler %s failed on a batch of %d", self.name, len(batch))
 
 
 class EventEmitter:
+    """Fans events out to handlers on the thread that calls :meth:`emit`.
+
+    Plain handlers run inline. Handlers added with :meth:`add_queued` only get
+    a non-blocking handoff there, so a slow one cannot stall the observer.
+    """
+
     def __init__(self) -> None:
-        self._handlers: List[Handler] = []
+        # Replaced, never mutated, so emit can iterate without copying.
+        self._handlers: Tuple[Handler, ...] = ()
+        self._queued: Dict[str, QueuedHandler] = {}
 
     def add(self, handler: Handler) -> None:
-        self._handlers.append(handler)
+        self._handlers = self._handlers + (handler,)
+
+    def add_queued(
+        self,
+        handler: Union[Handler, BatchHandler],
+        *,
+        name: Optional[str] = None,
+        maxsize: int = 10000,
+        overflow: str = "drop-newest",
+        batch_size: int = 1,
+        max_wait: float = 0.0,
+    ) -> QueuedHandler:
+        name = name or getattr(handler, "__qualname__", None) or f"handler-{len(self._queued)}"
+        queued = QueuedHandler(
+            handler, name=name, maxsize=maxsize, overflow=overflow, batch_size=batch_size, max_wait=max_wait
+        )
+        self._queued[name] = queued
+        self._handlers = self._handlers + (queued.put,)
+        return queued
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: q.stats() for name, q in self._queued.items()}
+
+    def close(self) -> None:
+        for queued in self._queued.values():
+            queued.close()
 
     def emit(self, evt: ChangeFileEvent) -> None:
-        for h in list(self._handlers):
+        for h in self._handlers:
             try:
                 h(evt)
             except Exception:
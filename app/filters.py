@@ -0,0 +1,126 @@
+import re
+from typing import Dict, Iterable, List, Optional, Pattern
+
+from app.pathglob import has_magic, normalize_path, translate_glob
+
+# "<watch dir>|<pattern>" scopes a pattern to one watch dir.
+SCOPE_SEPARATOR = "|"
+
+
+def patterns_for(root: str, entries: Iterable[str]) -> List[str]:
+    norm_root = normalize_path(root)
+    patterns: List[str] = []
+    for entry in entries:
+        if SCOPE_SEPARATOR in entry:
+            scope, pattern = entry.split(SCOPE_SEPARATOR, 1)
+            if normalize_path(scope.strip()) != norm_root:
+                continue
+            entry = pattern
+        entry = entry.strip()
+        if entry:
+            patterns.append(entry)
+    return patterns
+
+
+def _compile_union(regexes: List[str]) -> Optional[Pattern[str]]:
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{r})" for r in regexes), re.DOTALL)
+
+
+class _CompiledPatterns:
+    """Name patterns (no ``/``) match a single path component; path patterns
+    are anchored at the watch root unless they are absolute."""
+
+    __slots__ = ("names", "name_re", "path_re")
+
+    def __init__(self, root: str, patterns: Iterable[str], *, subtree: bool) -> None:
+        names: List[str] = []
+        name_res: List[str] = []
+        path_res: List[str] = []
+        suffix = r"(?:/.*)?\Z" if subtree else r"\Z"
+
+        for raw in patterns:
+            pattern = normalize_path(raw)
+            if "/" not in pattern:
+                if has_magic(pattern):
+                    name_res.append(translate_glob(pattern) + r"\Z")
+                else:
+                    names.append(pattern)
+                continue
+            if not pattern.startswith("/") and not re.match(r"^[A-Za-z]:/", pattern) and not pattern.startswith("**"):
+                pattern = f"{root}/{pattern}" if root != "/" else f"/{pattern}"
+            path_res.append(translate_glob(pattern) + suffix)
+
+        self.names = frozenset(names)
+        self.name_re = _compile_union(name_res)
+        self.path_re = _compile_union(path_res)
+
+    def __bool__(self) -> bool:
+        return bool(self.names) or self.name_re is not None or self.path_re is not None
+
+    def match_name(self, name: str) -> bool:
+        if name in self.names:
+            return True
+        return self.name_re is not None and self.name_re.match(name) is not None
+
+    def match_path(self, path: str) -> bool:
+        return self.path_re is not None and self.path_re.match(path) is not None
+
+
+class PathFilter:
+    """Include/exclude globs for one watch dir, compiled once.
+
+    An excluded directory excludes everything beneath it. Include patterns
+    only apply to files, so directories stay traversable.
+    """
+
+    def __init__(self, root: str, *, include: Iterable[str] = (), exclude: Iterable[str] = ()) -> None:
+        self.root = normalize_path(root)
+        self._root_prefix = self.root.rstrip("/") + "/"
+        self._include = _CompiledPatterns(self.root, include, subtree=False)
+        self._exclude = _CompiledPatterns(self.root, exclude, subtree=True)
+
+    def __bool__(self) -> bool:
+        return bool(self._include) or bool(self._exclude)
+
+    def _relative_parts(self, norm: str) -> List[str]:
+        if norm.startswith(self._root_prefix):
+            return norm[len(self._root_prefix):].split("/")
+        if norm == self.root:
+            return []
+        return norm.split("/")
+
+    def excludes(self, path: str) -> bool:
+        if not self._exclude:
+            return False
+        norm = normalize_path(path)
+        if self._exclude.match_path(norm):
+            return True
+        if self._exclude.names or self._exclude.name_re is not None:
+            return any(self._exclude.match_name(part) for part in self._relative_parts(norm))
+        return False
+
+    def allows(self, path: str, is_directory: bool = False) -> bool:
+        if self.excludes(path):
+            return False
+        if is_directory or not self._include:
+            return True
+        norm = normalize_path(path)
+        if self._include.match_path(norm):
+            return True
+        return self._include.match_name(norm.rsplit("/", 1)[-1])
+
+
+def build_path_filters(
+    watch_dirs: Iterable[str],
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+) -> Dict[str, PathFilter]:
+    include, exclude = list(include), list(exclude)
+    filters: Dict[str, PathFilter] = {}
+    for d in watch_dirs:
+        path_filter = PathFilter(d, include=patterns_for(d, include), exclude=patterns_for(d, exclude))
+        if path_filter:
+            filters[d] = path_filter
+    return filters
@@ -0,0 +1,205 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import aiosqlite
+
+from app.loggers.db_logger import PartitionedReader
+
+MAX_LIMIT = 1000
+# Rows walked in id order before falling back to an index range plus a sort.
+PROBE_ROWS = 2000
+
+FILE_EVENT_COLUMNS = ("id", "event", "src_path", "dest_path", "is_directory", "timestamp_utc", "size", "hash")
+LOG_JOURNAL_COLUMNS = ("id", "timestamp_utc", "level", "message", "logger_name", "repeat_count")
+
+
+@dataclass(frozen=True)
+class Page:
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[int]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"items": self.items, "next_cursor": self.next_cursor}
+
+
+def normalize_timestamp(value: str) -> str:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _prefix_clause(column: str, prefix: str) -> Tuple[str, List[Any]]:
+    # A range on the raw column keeps the column index usable. Paths are stored
+    # as the observer reported them, so the platform separator is used as-is.
+    sep = os.sep
+    base = prefix.rstrip("/\\")
+    after_sep = chr(ord(sep) + 1)
+    if not base:
+        return f"{column} >= ? AND {column} < ?", [sep, after_sep]
+    # One contiguous range from "<base>" to "<base>/~"; the last condition drops
+    # siblings such as "<base>-x" that sort inside it.
+    return (
+        f"{column} >= ? AND {column} < ? AND ({column} = ? OR {column} >= ?)",
+        [base, f"{base}{after_sep}", base, f"{base}{sep}"],
+    )
+
+
+class _Where:
+    def __init__(self) -> None:
+        self.clauses: List[str] = []
+        self.params: List[Any] = []
+        # A range filter (path prefix, time bound) that no (<column>, id) index serves in id order.
+        self.ranged = False
+
+    def add(self, clause: str, *params: Any, ranged: bool = False) -> None:
+        self.clauses.append(clause)
+        self.params.extend(params)
+        self.ranged = self.ranged or ranged
+
+    def sql(self, *extra: str) -> str:
+        clauses = [*self.clauses, *extra]
+        return f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+
+class _Query:
+    def __init__(self, *, since: Optional[str], until: Optional[str], cursor: Optional[int], descending: bool) -> None:
+        self.since = normalize_timestamp(since) if since else None
+        self.until = normalize_timestamp(until) if until else None
+        self.cursor = cursor
+        self.descending = descending
+
+    def cursor_clause(self) -> Tuple[Tuple[str, ...], Tuple[Any, ...]]:
+        if self.cursor is None:
+            return (), ()
+        return ("id < ?" if self.descending else "id > ?",), (self.cursor,)
+
+
+def _add_common(where: _Where, query: _Query) -> None:
+    if query.since:
+        where.add("timestamp_utc >= ?", query.since, ranged=True)
+    if query.until:
+        where.add("timestamp_utc < ?", query.until, ranged=True)
+
+
+async def _select(
+    conn: aiosqlite.Connection,
+    source: str,
+    columns: Sequence[str],
+    where: _Where,
+    query: _Query,
+    *,
+    limit: int,
+) -> List[Tuple[Any, ...]]:
+    """Up to ``limit`` matching rows of ``source`` in id order after the cursor."""
+    select = ", ".join(columns)
+    order = "DESC" if query.descending else "ASC"
+    cursor_sql, cursor_params = query.cursor_clause()
+    if where.ranged:
+        # A range filter means an index range plus a sort over every match. When
+        # the filter is common, the next PROBE_ROWS rows by id already fill the page.
+        inner = f"SELECT * FROM {source} {_Where().sql(*cursor_sql)} ORDER BY id {order} LIMIT ?"
+        sql = f"SELECT {select} FROM ({inner}) {where.sql()} ORDER BY id {order} LIMIT ?"
+        async with conn.execute(sql, (*cursor_params, PROBE_ROWS, *where.params, limit)) as cur:
+            rows = await cur.fetchall()
+        if len(rows) >= limit:
+            return rows
+
+    sql = f"SELECT {select} FROM {source} {where.sql(*cursor_sql)} ORDER BY id {order} LIMIT ?"
+    async with conn.execute(sql, (*where.params, *cursor_params, limit)) as cur:
+        return await cur.fetchall()
+
+
+async def _fetch_page(
+    conn: Union[aiosqlite.Connection, PartitionedReader],
+    table: str,
+    columns: Sequence[str],
+    where: _Where,
+    query: _Query,
+    *,
+    limit: int,
+) -> Page:
+    limit = max(1, min(limit, MAX_LIMIT))
+    if isinstance(conn, PartitionedReader):
+        rows = await _fetch_partitioned(conn, table, columns, where, query, limit=limit)
+    else:
+        rows = await _select(conn, table, columns, where, query, limit=limit + 1)
+
+    items = [dict(zip(columns, row)) for row in rows[:limit]]
+    next_cursor = items[-1]["id"] if len(rows) > limit else None
+    return Page(items=items, next_cursor=next_cursor)
+
+
+async def _fetch_partitioned(
+    reader: PartitionedReader,
+    table: str,
+    columns: Sequence[str],
+    where: _Where,
+    query: _Query,
+    *,
+    limit: int,
+) -> List[Tuple[Any, ...]]:
+    # Ids grow across sources, so filling the page source by source keeps the order.
+    rows: List[Tuple[Any, ...]] = []
+    async with reader.lock:
+        sources = reader.sources(
+            table, since=query.since, until=query.until, cursor=query.cursor, descending=query.descending
+        )
+        async for schema in sources:
+            rows.extend(
+                await _select(reader.conn, f"{schema}.{table}", columns, where, query, limit=limit + 1 - len(rows))
+            )
+            if len(rows) > limit:
+                await sources.aclose()
+                break
+    return rows
+
+
+async def query_file_events(
+    conn: Union[aiosqlite.Connection, PartitionedReader],
+    *,
+    path_prefix: Optional[str] = None,
+    event: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = 100,
+    descending: bool = True,
+) -> Page:
+    where = _Where()
+    if path_prefix:
+        clause, params = _prefix_clause("src_path", path_prefix)
+        where.add(clause, *params, ranged=True)
+    if event:
+        where.add("event = ?", event)
+    query = _Query(since=since, until=until, cursor=cursor, descending=descending)
+    _add_common(where, query)
+
+    page = await _fetch_page(conn, "file_events", FILE_EVENT_COLUMNS, where, query, limit=limit)
+    for item in page.items:
+        item["is_directory"] = bool(item["is_directory"])
+    return page
+
+
+async def query_log_journal(
+    conn: Union[aiosqlite.Connection, PartitionedReader],
+    *,
+    level: Optional[str] = None,
+    logger_name: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = 100,
+    descending: bool = True,
+) -> Page:
+    where = _Where()
+    if level:
+        where.add("level = ?", level.upper())
+    if logger_name:
+        where.add("logger_name = ?", logger_name)
+    query = _Query(since=since, until=until, cursor=cursor, descending=descending)
+    _add_common(where, query)
+
+    return await _fetch_page(conn, "log_journal", LOG_JOURNAL_COLUMNS, where, query, limit=limit)
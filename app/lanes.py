@@ -0,0 +1,110 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from app.metrics import LANE_BUSY, LANE_WAIT
+
+EVENTS_LANE = "events"
+LOGS_LANE = "logs"
+
+
+class LaneScheduler:
+    """Weighted fair turns for work that shares the loop, SQLite and Socket.IO.
+
+    One turn runs at a time. When several lanes are waiting, the one with the
+    smallest virtual time goes next; a turn advances its lane's virtual time
+    by its duration divided by the lane's weight, so under contention each
+    lane gets busy time in proportion to its weight. A lane that was idle
+    starts from the current virtual clock instead of spending banked credit.
+    The next turn is picked one loop iteration after a release, so a busy
+    lane can queue its next request and compete for it. Must be used from
+    the event loop thread.
+    """
+
+    def __init__(self, weights: Dict[str, float]) -> None:
+        if not weights or any(w <= 0 for w in weights.values()):
+            raise ValueError(f"Lane weights must be positive: {weights!r}")
+        self._weights = dict(weights)
+        self._vtime = {lane: 0.0 for lane in weights}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in weights}
+        self._clock = 0.0
+        self._busy = False
+        self._dispatching = False
+        self.turns = {lane: 0 for lane in weights}
+        self.busy_seconds = {lane: 0.0 for lane in weights}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            lane: {
+                "weight": self._weights[lane],
+                "waiting": len(self._waiters[lane]),
+                "turns": self.turns[lane],
+                "busy_s": round(self.busy_seconds[lane], 3),
+            }
+            for lane in self._weights
+        }
+
+    @asynccontextmanager
+    async def turn(self, lane: str) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        requested = loop.time()
+        await self._acquire(lane)
+        started = loop.time()
+        LANE_WAIT.observe(started - requested, lane)
+        try:
+            yield
+        finally:
+            elapsed = loop.time() - started
+            self.turns[lane] += 1
+            self.busy_seconds[lane] += elapsed
+            LANE_BUSY.inc(lane, amount=elapsed)
+            self._vtime[lane] += elapsed / self._weights[lane]
+            self._release()
+
+    async def _acquire(self, lane: str) -> None:
+        if lane not in self._weights:
+            raise KeyError(f"Unknown lane: {lane!r}")
+        if not self._waiters[lane] and self._vtime[lane] < self._clock:
+            self._vtime[lane] = self._clock
+        if not self._busy and not any(self._waiters.values()):
+            self._grant(lane)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just before the cancellation landed: pass the turn on.
+                self._release()
+            else:
+                self._waiters[lane].remove(waiter)
+            raise
+
+    def _grant(self, lane: str) -> None:
+        self._busy = True
+        self._clock = max(self._clock, self._vtime[lane])
+
+    def _release(self) -> None:
+        self._busy = False
+        if not self._dispatching:
+            self._dispatching = True
+            asyncio.get_running_loop().call_soon(self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._dispatching = False
+        if self._busy:
+            return
+        lane = self._next_lane()
+        if lane is None:
+            return
+        self._grant(lane)
+        self._waiters[lane].popleft().set_result(None)
+
+    def _next_lane(self) -> Optional[str]:
+        waiting = [lane for lane, waiters in self._waiters.items() if waiters]
+        if not waiting:
+            return None
+        return min(waiting, key=lambda lane: (self._vtime[lane], -self._weights[lane]))
@@ -1,64 +1,550 @@
+import asyncio
 import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 
 import aiosqlite
-from typing import Any, Dict
+
+from app.loggers.db_writer import WriteLane, write_batch
 
 logger = logging.getLogger("hawkeye-db")
 
-CREATE_TABLE_SQL = """
-CREATE TABLE IF NOT EXISTS file_events (
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# The ``(<column>, id)`` indexes serve "<column> = ? AND id < ? ORDER BY id"
+# keyset pages without a sort; path prefixes and time bounds are ranges on
+# the src_path / timestamp_utc indexes. The journal tables are shared by the main file
+# and the time partitions; ``{schema}`` is empty or an attached name plus a dot.
+JOURNAL_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS {schema}file_events (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     event TEXT NOT NULL,
     src_path TEXT NOT NULL,
     dest_path TEXT NULL,
     is_directory INTEGER NOT NULL,
-    timestamp_utc TEXT NOT NULL
+    timestamp_utc TEXT NOT NULL,
+    size INTEGER NULL,
+    hash TEXT NULL
 );
-CREATE INDEX IF NOT EXISTS idx_file_events_event ON file_events(event);
-    
-CREATE TABLE IF NOT EXISTS log_journal (
+CREATE INDEX IF NOT EXISTS {schema}idx_file_events_event_id ON file_events(event, id);
+CREATE INDEX IF NOT EXISTS {schema}idx_file_events_src_path_id ON file_events(src_path, id);
+CREATE INDEX IF NOT EXISTS {schema}idx_file_events_timestamp ON file_events(timestamp_utc);
+
+CREATE TABLE IF NOT EXISTS {schema}log_journal (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     timestamp_utc TEXT NOT NULL,
     level TEXT NOT NULL,
     message TEXT NOT NULL,
-    logger_name TEXT NOT NULL
+    logger_name TEXT NOT NULL,
+    repeat_count INTEGER NOT NULL DEFAULT 1
 );
-CREATE INDEX IF NOT EXISTS idx_log_journal_level ON log_journal(level);
+CREATE INDEX IF NOT EXISTS {schema}idx_log_journal_level_id ON log_journal(level, id);
+CREATE INDEX IF NOT EXISTS {schema}idx_log_journal_logger_id ON log_journal(logger_name, id);
+CREATE INDEX IF NOT EXISTS {schema}idx_log_journal_timestamp ON log_journal(timestamp_utc);
 """
 
-async def init_db(db_path: str) -> aiosqlite.Connection:
+CREATE_TABLE_SQL = JOURNAL_TABLES_SQL.format(schema="") + """
+CREATE TABLE IF NOT EXISTS file_events_rollup (
+    hour_utc TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    event TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (hour_utc, directory, event)
+);
+CREATE INDEX IF NOT EXISTS idx_file_events_rollup_directory ON file_events_rollup(directory, hour_utc);
+
+CREATE TABLE IF NOT EXISTS tree_snapshot (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    is_directory INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (root, path)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS log_journal_rollup (
+    hour_utc TEXT NOT NULL,
+    level TEXT NOT NULL,
+    logger_name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (hour_utc, level, logger_name)
+);
+"""
+
+INSERT_CHANGE_LOG_TEMPLATE = """
+INSERT INTO {schema}file_events(event, src_path, dest_path, is_directory, timestamp_utc, size, hash)
+VALUES(?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_CHANGE_LOG_SQL = INSERT_CHANGE_LOG_TEMPLATE.format(schema="")
+
+INSERT_LOG_JOURNAL_TEMPLATE = """
+INSERT INTO {schema}log_journal(timestamp_utc, level, message, logger_name, repeat_count)
+VALUES(?, ?, ?, ?, ?)
+"""
+INSERT_LOG_JOURNAL_SQL = INSERT_LOG_JOURNAL_TEMPLATE.format(schema="")
+
+
+def _pragma_value(value: str, allowed: Tuple[str, ...], name: str) -> str:
+    normalized = value.strip().upper()
+    if normalized not in allowed:
+        raise ValueError(f"Unsupported {name}: {value!r} (expected one of {', '.join(allowed)})")
+    return normalized
+
+
+async def init_db(
+    db_path: str,
+    *,
+    journal_mode: str = "WAL",
+    synchronous: str = "NORMAL",
+) -> aiosqlite.Connection:
+    journal_mode = _pragma_value(journal_mode, JOURNAL_MODES, "journal_mode")
+    synchronous = _pragma_value(synchronous, SYNCHRONOUS_MODES, "synchronous")
+
     conn = await aiosqlite.connect(db_path)
+    # Only takes effect on a fresh database; existing files keep their mode until a full VACUUM.
+    await conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    await conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    await conn.execute(f"PRAGMA synchronous={synchronous}")
     await conn.executescript(CREATE_TABLE_SQL)
+    await _add_missing_columns(conn)
+    for index in OBSOLETE_INDEXES:
+        await conn.execute(f"DROP INDEX IF EXISTS {index}")
     await conn.commit()
     return conn
 
-async def insert_change_log(conn: aiosqlite.Connection, payload: Dict[str, Any]) -> None:
-    await conn.execute(
-        """
-        INSERT INTO file_events(event, src_path, dest_path, is_directory, timestamp_utc)
-        VALUES(?, ?, ?, ?, ?)
-        """,
-        (
-            payload["event"],
-            payload["src_path"],
-            payload.get("dest_path"),
-            1 if payload["is_directory"] else 0,
-            payload["timestamp_utc"],
-        ),
+
+# Columns added after the first release; CREATE TABLE IF NOT EXISTS does not touch old files.
+ADDED_COLUMNS = (
+    ("log_journal", "repeat_count", "INTEGER NOT NULL DEFAULT 1"),
+    ("file_events", "size", "INTEGER NULL"),
+    ("file_events", "hash", "TEXT NULL"),
+)
+
+
+# Single-column indexes replaced by the explicit ``(<column>, id)`` ones above.
+OBSOLETE_INDEXES = (
+    "idx_file_events_event",
+    "idx_file_events_src_path",
+    "idx_log_journal_level",
+    "idx_log_journal_logger",
+)
+
+
+async def _add_missing_columns(conn: aiosqlite.Connection) -> None:
+    for table, column, decl in ADDED_COLUMNS:
+        async with conn.execute(f"PRAGMA table_info({table})") as cur:
+            existing = {row[1] for row in await cur.fetchall()}
+        if column not in existing:
+            await conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+async def open_read_connection(
+    db_path: str, partitions: Optional["PartitionCatalog"] = None
+) -> Union[aiosqlite.Connection, "PartitionedReader"]:
+    conn = await aiosqlite.connect(f"file:{db_path}?mode=ro", uri=True)
+    await conn.execute("PRAGMA query_only=ON")
+    if partitions is not None:
+        return PartitionedReader(conn, partitions)
+    return conn
+
+
+def _change_log_row(payload: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        payload["event"],
+        payload["src_path"],
+        payload.get("dest_path"),
+        1 if payload["is_directory"] else 0,
+        payload["timestamp_utc"],
+        payload.get("size"),
+        payload.get("hash"),
+    )
+
+
+def _log_journal_row(payload: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        payload["timestamp_utc"],
+        payload["level"],
+        payload["message"],
+        payload["logger_name"],
+        payload.get("repeat_count", 1),
     )
+
+
+async def insert_change_log(conn: aiosqlite.Connection, payload: Dict[str, Any]) -> None:
+    await conn.execute(INSERT_CHANGE_LOG_SQL, _change_log_row(payload))
     await conn.commit()
 
+
+async def _inserted_ids(conn: aiosqlite.Connection, table: str, count: int) -> Sequence[int]:
+    # AUTOINCREMENT ids of one executemany on the only writer connection are consecutive.
+    async with conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)) as cur:
+        row = await cur.fetchone()
+    last = row[0] if row else count
+    return range(last - count + 1, last + 1)
+
+
+async def insert_change_logs(
+    conn: Union[aiosqlite.Connection, WriteLane], payloads: Iterable[Dict[str, Any]]
+) -> Sequence[int]:
+    rows = [_change_log_row(p) for p in payloads]
+    if not rows:
+        return ()
+    if isinstance(conn, PartitionedLane):
+        return await conn.call(conn.write_rows, "file_events", rows)
+    if isinstance(conn, WriteLane):
+        return await conn.call(write_batch, INSERT_CHANGE_LOG_SQL, "file_events", rows)
+    try:
+        await conn.executemany(INSERT_CHANGE_LOG_SQL, rows)
+        ids = await _inserted_ids(conn, "file_events", len(rows))
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return ids
+
+
 async def insert_log_journal(conn: aiosqlite.Connection, payload: Dict[str, Any]) -> None:
-    await conn.execute(
-        """
-        INSERT INTO log_journal(timestamp_utc, level, message, logger_name)
-        VALUES(?, ?, ?, ?)
-        """,
-        (
-            payload["timestamp_utc"],
-            payload["level"],
-            payload["message"],
-            payload["logger_name"],
-        ),
-    )
-    await conn.commit()
\ No newline at end of file
+    await conn.execute(INSERT_LOG_JOURNAL_SQL, _log_journal_row(payload))
+    await conn.commit()
+
+
+async def insert_log_journals(
+    conn: Union[aiosqlite.Connection, WriteLane], payloads: Iterable[Dict[str, Any]]
+) -> Sequence[int]:
+    rows = [_log_journal_row(p) for p in payloads]
+    if not rows:
+        return ()
+    if isinstance(conn, PartitionedLane):
+        return await conn.call(conn.write_rows, "log_journal", rows)
+    if isinstance(conn, WriteLane):
+        return await conn.call(write_batch, INSERT_LOG_JOURNAL_SQL, "log_journal", rows)
+    try:
+        await conn.executemany(INSERT_LOG_JOURNAL_SQL, rows)
+        ids = await _inserted_ids(conn, "log_journal", len(rows))
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return ids
+
+
+# Optional time-partitioned layout: file_events / log_journal rows go to one
+# file per day or hour named after the matching prefix of ``timestamp_utc``,
+# next to the main file, which keeps the rollups, the tree snapshot and any
+# rows written before partitioning was turned on.
+PARTITION_KEY_LENGTHS = {"day": len("2026-01-01"), "hour": len("2026-01-01T00")}
+PARTITION_FILE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2}(?:T\d{2})?)\.db$")
+PARTITION_SUFFIXES = ("", "-wal", "-shm", "-journal")
+
+# table -> (insert template, index of timestamp_utc in its row)
+_PARTITIONED_TABLES = {
+    "file_events": (INSERT_CHANGE_LOG_TEMPLATE, 4),
+    "log_journal": (INSERT_LOG_JOURNAL_TEMPLATE, 0),
+}
+
+# SQLite allows 10 attached databases by default.
+MAX_READ_ATTACHED = 8
+
+
+class PartitionCatalog:
+    """Names, paths and time ranges of the partition files of one database.
+
+    Rows are never written to a partition older than the newest one their
+    lane has used, so ids grow across partitions in key order. A row that
+    arrives after its period closed lands in the next partition; range
+    queries therefore also read the partition after ``until``, which holds
+    as long as rows are less than one period late.
+    """
+
+    def __init__(self, db_path: str, granularity: str) -> None:
+        if granularity not in PARTITION_KEY_LENGTHS:
+            raise ValueError(
+                f"Unsupported partition granularity: {granularity!r} "
+                f"(expected one of {', '.join(PARTITION_KEY_LENGTHS)})"
+            )
+        self.granularity = granularity
+        self.directory = f"{os.path.splitext(db_path)[0]}-partitions"
+        self._key_length = PARTITION_KEY_LENGTHS[granularity]
+        # lane name -> its current partition; the lane may write there or to any later one
+        self._held: Dict[str, str] = {}
+        self._held_lock = threading.Lock()
+
+    def hold(self, owner: str, key: Optional[str]) -> None:
+        with self._held_lock:
+            if key is None:
+                self._held.pop(owner, None)
+            else:
+                self._held[owner] = key
+
+    def oldest_held(self) -> Optional[str]:
+        """Oldest partition a live lane may still write to, or None."""
+        with self._held_lock:
+            return min(self._held.values(), default=None)
+
+    def key_of(self, timestamp_utc: str) -> str:
+        return timestamp_utc[: self._key_length]
+
+    def path_of(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.db")
+
+    @staticmethod
+    def alias_of(key: str) -> str:
+        return "p_" + key.replace("-", "_")
+
+    def keys(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        keys = []
+        for name in names:
+            match = PARTITION_FILE_RE.match(name)
+            if match and len(match.group(1)) == self._key_length:
+                keys.append(match.group(1))
+        return sorted(keys)
+
+    def _start(self, key: str) -> datetime:
+        fmt = "%Y-%m-%d" if self.granularity == "day" else "%Y-%m-%dT%H"
+        return datetime.strptime(key, fmt).replace(tzinfo=timezone.utc)
+
+    def start_of(self, key: str) -> str:
+        return self._start(key).isoformat(timespec="milliseconds")
+
+    def end_of(self, key: str) -> str:
+        """ISO timestamp at which the period of ``key`` ends."""
+        step = timedelta(days=1) if self.granularity == "day" else timedelta(hours=1)
+        return (self._start(key) + step).isoformat(timespec="milliseconds")
+
+    def overlapping(self, keys: Sequence[str], since: Optional[str], until: Optional[str]) -> List[str]:
+        """Keys that may hold rows with ``since <= timestamp_utc < until`` (both normalized)."""
+        selected = [k for k in keys if since is None or k >= self.key_of(since)]
+        if until is None:
+            return selected
+        boundary = self.key_of(until)
+        if until == self.start_of(boundary):
+            inside = [k for k in selected if k < boundary]
+        else:
+            inside = [k for k in selected if k <= boundary]
+        later = selected[len(inside):]
+        return inside + later[:1]
+
+    def size_bytes(self, key: str) -> int:
+        total = 0
+        for suffix in PARTITION_SUFFIXES:
+            try:
+                total += os.path.getsize(self.path_of(key) + suffix)
+            except OSError:
+                pass
+        return total
+
+    def unlink(self, key: str) -> None:
+        for suffix in PARTITION_SUFFIXES:
+            try:
+                os.unlink(self.path_of(key) + suffix)
+            except FileNotFoundError:
+                pass
+
+
+class PartitionedLane(WriteLane):
+    """Write lane for one journal table that inserts into time partitions.
+
+    The lane's connection stays on the main file and attaches the current
+    partition (plus, briefly, the next one at a period boundary), so the
+    cost of a batch does not depend on how much history is kept. Each new
+    partition's AUTOINCREMENT counter starts where the previous one ended.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        db_path: str,
+        partitions: PartitionCatalog,
+        *,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        busy_timeout_ms: int = 5000,
+    ) -> None:
+        super().__init__(name, db_path, synchronous=synchronous, busy_timeout_ms=busy_timeout_ms)
+        self.partitions = partitions
+        self._journal_mode = journal_mode
+        self._attached: List[str] = []
+        self._last_seq: Optional[int] = None
+        self.current: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "partition": self.current}
+
+    def write_rows(self, conn: sqlite3.Connection, table: str, rows: List[Tuple[Any, ...]]) -> Sequence[int]:
+        """Runs on the lane thread; returns the AUTOINCREMENT ids of ``rows``."""
+        template, ts_index = _PARTITIONED_TABLES[table]
+        if self._last_seq is None:
+            self._resume(conn, table)
+
+        segments: List[Tuple[str, List[Tuple[Any, ...]]]] = []
+        key = self.current
+        for row in rows:
+            row_key = self.partitions.key_of(row[ts_index])
+            if key is None or row_key > key:
+                key = row_key
+            if segments and segments[-1][0] == key:
+                segments[-1][1].append(row)
+            else:
+                segments.append((key, [row]))
+        for key, _ in segments:
+            self._attach(conn, key)
+
+        last_seq = self._last_seq
+        ids: List[int] = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, segment in segments:
+                schema = self.partitions.alias_of(key)
+                self._seed(conn, schema, table, last_seq)
+                conn.executemany(template.format(schema=f"{schema}."), segment)
+                last_seq = conn.execute(
+                    f"SELECT seq FROM {schema}.sqlite_sequence WHERE name = ?", (table,)
+                ).fetchone()[0]
+                ids.extend(range(last_seq - len(segment) + 1, last_seq + 1))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._last_seq = last_seq
+        self._advance(conn, segments[-1][0])
+        return ids
+
+    def _resume(self, conn: sqlite3.Connection, table: str) -> None:
+        # Continue after the newest partition holding this table, or after the main file's rows.
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        self._last_seq = row[0] if row else 0
+        keys = self.partitions.keys()
+        self.current = keys[-1] if keys else None
+        self.partitions.hold(self.name, self.current)
+        for key in reversed(keys):
+            part = sqlite3.connect(f"file:{self.partitions.path_of(key)}?mode=ro", uri=True)
+            try:
+                row = part.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+            except sqlite3.OperationalError:
+                row = None  # created but not initialized yet
+            finally:
+                part.close()
+            if row:
+                self._last_seq = max(self._last_seq, row[0])
+                break
+
+    def _attach(self, conn: sqlite3.Connection, key: str) -> None:
+        schema = self.partitions.alias_of(key)
+        if schema in self._attached:
+            return
+        os.makedirs(self.partitions.directory, exist_ok=True)
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (self.partitions.path_of(key),))
+        conn.execute(f"PRAGMA {schema}.journal_mode={self._journal_mode}")
+        conn.execute(f"PRAGMA {schema}.synchronous={self._synchronous}")
+        conn.executescript(JOURNAL_TABLES_SQL.format(schema=f"{schema}."))
+        self._attached.append(schema)
+
+    @staticmethod
+    def _seed(conn: sqlite3.Connection, schema: str, table: str, last_seq: int) -> None:
+        row = conn.execute(f"SELECT seq FROM {schema}.sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        if row is None:
+            conn.execute(f"INSERT INTO {schema}.sqlite_sequence(name, seq) VALUES(?, ?)", (table, last_seq))
+        elif row[0] < last_seq:
+            conn.execute(f"UPDATE {schema}.sqlite_sequence SET seq = ? WHERE name = ?", (last_seq, table))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        super().close(timeout)
+        self.partitions.hold(self.name, None)
+
+    def _advance(self, conn: sqlite3.Connection, key: str) -> None:
+        self.current = key
+        self.partitions.hold(self.name, key)
+        keep = self.partitions.alias_of(key)
+        for schema in [s for s in self._attached if s != keep]:
+            conn.execute(f"DETACH DATABASE {schema}")
+            self._attached.remove(schema)
+
+
+class PartitionedReader:
+    """Read connection that attaches only the partitions a query can touch.
+
+    Sources are yielded in id order (the main file first), so keyset pages
+    stop as soon as they are full. Must be used with :attr:`lock` held; the
+    attached set is shared by all queries on the connection.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, partitions: PartitionCatalog) -> None:
+        self.conn = conn
+        self.partitions = partitions
+        self.lock = asyncio.Lock()
+        self._attached: "OrderedDict[str, str]" = OrderedDict()
+        # (key, table) -> (min id, max id) of partitions that no longer receive rows
+        self._bounds: Dict[Tuple[str, str], Tuple[Optional[int], Optional[int]]] = {}
+
+    async def close(self) -> None:
+        await self.conn.close()
+
+    async def sources(
+        self,
+        table: str,
+        *,
+        since: Optional[str],
+        until: Optional[str],
+        cursor: Optional[int],
+        descending: bool,
+    ) -> AsyncIterator[str]:
+        keys = self.partitions.keys()
+        await self._forget(set(keys))
+        # The two newest partitions can still receive (late) rows.
+        settled = set(keys[:-2])
+        candidates = self.partitions.overlapping(keys, since, until)
+        order: List[Optional[str]] = [None, *candidates]
+        if descending:
+            order.reverse()
+
+        for key in order:
+            if key is None:
+                yield "main"
+                continue
+            bounds = self._bounds.get((key, table))
+            if bounds is None:
+                bounds = await self._id_bounds(await self._attach(key), table)
+                if key in settled:
+                    self._bounds[(key, table)] = bounds
+            low, high = bounds
+            if low is None:
+                continue
+            if cursor is not None and (low >= cursor if descending else high <= cursor):
+                continue
+            yield await self._attach(key)
+
+    async def _id_bounds(self, schema: str, table: str) -> Tuple[Optional[int], Optional[int]]:
+        async with self.conn.execute(f"SELECT MIN(id), MAX(id) FROM {schema}.{table}") as cur:
+            low, high = await cur.fetchone()
+        return low, high
+
+    async def _attach(self, key: str) -> str:
+        schema = self.partitions.alias_of(key)
+        if key in self._attached:
+            self._attached.move_to_end(key)
+            return schema
+        while len(self._attached) >= MAX_READ_ATTACHED:
+            _, oldest = self._attached.popitem(last=False)
+            await self.conn.execute(f"DETACH DATABASE {oldest}")
+        await self.conn.execute(
+            f"ATTACH DATABASE ? AS {schema}", (f"file:{self.partitions.path_of(key)}?mode=ro",)
+        )
+        self._attached[key] = schema
+        return schema
+
+    async def _forget(self, existing: Set[str]) -> None:
+        for key in [k for k in self._attached if k not in existing]:
+            await self.conn.execute(f"DETACH DATABASE {self._attached.pop(key)}")
+        for bound_key in [k for k in self._bounds if k[0] not in existing]:
+            del self._bounds[bound_key]
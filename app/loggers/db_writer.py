@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger("hawkeye-db-writer")
+
+T = TypeVar("T")
+
+# Distinct SQL strings kept prepared per connection; the lanes only run a handful.
+CACHED_STATEMENTS = 32
+
+_Job = Tuple[Callable[..., Any], Tuple[Any, ...], asyncio.Future, asyncio.AbstractEventLoop]
+
+
+def _resolve(future: asyncio.Future, result: Any, exc: Optional[BaseException]) -> None:
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
+
+def write_batch(conn: sqlite3.Connection, sql: str, table: str, rows: List[Tuple[Any, ...]]) -> Sequence[int]:
+    """Inserts ``rows`` in one transaction and returns their AUTOINCREMENT ids."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(sql, rows)
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    last = row[0] if row else len(rows)
+    return range(last - len(rows) + 1, last + 1)
+
+
+class WriteLane:
+    """One SQLite write connection owned by its own thread.
+
+    Jobs are handed over through a deque (appends and pops are atomic, so the
+    loop never takes a lock) and run in submission order; results come back
+    to the submitting loop. Each lane commits independently, so a burst on one
+    table only contends with the other lane for SQLite's short commit lock.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        db_path: str,
+        *,
+        synchronous: str = "NORMAL",
+        busy_timeout_ms: int = 5000,
+    ) -> None:
+        self.name = name
+        self._db_path = db_path
+        self._synchronous = synchronous
+        self._busy_timeout_ms = busy_timeout_ms
+        self._jobs: Deque[Optional[_Job]] = deque()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self.batches = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": len(self._jobs), "batches": self.batches}
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"hawkeye-db-{self.name}", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._jobs.append((fn, args, future, loop))
+        self._wake.set()
+        return future
+
+    async def call(self, fn: Callable[..., T], *args: Any) -> T:
+        return await self.submit(fn, *args)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        if self._thread is None:
+            return
+        self._jobs.append(None)
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._db_path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        conn.execute(f"PRAGMA busy_timeout={int(self._busy_timeout_ms)}")
+        conn.execute(f"PRAGMA synchronous={self._synchronous}")
+        return conn
+
+    def _run(self) -> None:
+        try:
+            conn = self._connect()
+        except BaseException as exc:
+            self._error = exc
+            self._ready.set()
+            return
+        self._ready.set()
+
+        try:
+            while True:
+                self._wake.wait()
+                self._wake.clear()
+                while self._jobs:
+                    job = self._jobs.popleft()
+                    if job is None:
+                        return
+                    fn, args, future, loop = job
+                    result, exc = None, None
+                    try:
+                        result = fn(conn, *args)
+                        self.batches += 1
+                    except Exception as e:
+                        exc = e
+                    try:
+                        loop.call_soon_threadsafe(_resolve, future, result, exc)
+                    except RuntimeError:
+                        pass  # the loop is gone
+        finally:
+            conn.close()
@@ -1,30 +1,78 @@
 import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from app.loggers.log_sampling import LogSampler
+from app.overflow import OverflowGuard
 
 
 class LogJournalQueueHandler(logging.Handler):
-    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue[Dict[str, Any]]) -> None:
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        queue: asyncio.Queue[Dict[str, Any]],
+        overflow: Optional[OverflowGuard] = None,
+        sampler: Optional[LogSampler] = None,
+    ) -> None:
         super().__init__()
         self._loop = loop
         self._queue = queue
+        self._overflow = overflow
+        self._sampler = sampler
+        self._sweep_armed = False
+        self._sweep_handle: Optional[asyncio.TimerHandle] = None
+
+    @staticmethod
+    def _payload(record: logging.LogRecord, repeat_count: int = 1) -> Dict[str, Any]:
+        return {
+            "timestamp_utc": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "logger_name": record.name,
+            "repeat_count": repeat_count,
+        }
 
     def emit(self, record: logging.LogRecord) -> None:
         try:
-            payload: Dict[str, Any] = {
-                "timestamp_utc": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
-                "level": record.levelname,
-                "message": record.getMessage(),
-                "logger_name": record.name
-            }
-
-            self._loop.call_soon_threadsafe(self._safe_put, payload)
+            if self._sampler is not None:
+                admitted = self._sampler.admit(record)
+                if self._sampler.dedup_window > 0 and not self._sweep_armed:
+                    self._sweep_armed = True
+                    self._loop.call_soon_threadsafe(self._arm_sweep)
+                if not admitted:
+                    return
+
+            self._loop.call_soon_threadsafe(self._safe_put, self._payload(record))
         except Exception:
             self.handleError(record)
 
+    def _arm_sweep(self) -> None:
+        if self._sweep_handle is None:
+            self._sweep_handle = self._loop.call_later(self._sampler.dedup_window, self._sweep)
+
+    def _sweep(self, force: bool = False) -> None:
+        self._sweep_handle = None
+        for record, count in self._sampler.expired(force=force):
+            self._safe_put(self._payload(record, count))
+        if not force and self._sampler.pending_repeats():
+            self._arm_sweep()
+        else:
+            self._sweep_armed = False
+
     def _safe_put(self, payload: Dict[str, Any]) -> None:
+        if self._overflow is not None:
+            self._overflow.put(payload)
+            return
         try:
             self._queue.put_nowait(payload)
         except asyncio.QueueFull:
             pass
+
+    def close(self) -> None:
+        # Called from the loop thread on shutdown: flush pending repeat summaries.
+        if self._sampler is not None:
+            if self._sweep_handle is not None:
+                self._sweep_handle.cancel()
+            self._sweep(force=True)
+        super().close()
@@ -1,7 +1,12 @@
 import asyncio
-from typing import Any, Dict, Awaitable, Callable
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Awaitable, Callable, Optional
 
-from app.loggers.db_logger import insert_log_journal
+from app.batching import drain_batch
+from app.lanes import LOGS_LANE, LaneScheduler
+from app.loggers.db_logger import insert_log_journals
+from app.metrics import SQLITE_COMMIT
 
 
 async def log_journal_consumer(
@@ -9,12 +14,22 @@ async def log_journal_consumer(
     queue: asyncio.Queue[Dict[str, Any]],
     db_conn,
     emit_socket: Callable[[Dict[str, Any]], Awaitable[None]] | None = None,
+    batch_size: int = 1,
+    flush_interval: float = 0.0,
+    scheduler: Optional[LaneScheduler] = None,
 ) -> None:
     while True:
-        payload = await queue.get()
+        batch = await drain_batch(queue, max_size=batch_size, max_wait=flush_interval)
         try:
-            await insert_log_journal(db_conn, payload)
-            if emit_socket is not None:
-                await emit_socket(payload)
+            async with scheduler.turn(LOGS_LANE) if scheduler is not None else nullcontext():
+                started = time.monotonic()
+                ids = await insert_log_journals(db_conn, batch)
+                SQLITE_COMMIT.observe(time.monotonic() - started, "log_journal")
+                for payload, seq in zip(batch, ids or ()):
+                    payload["seq"] = seq
+                if emit_socket is not None:
+                    for payload in batch:
+                        await emit_socket(payload)
         finally:
-            queue.task_done()
+            for _ in batch:
+                queue.task_done()
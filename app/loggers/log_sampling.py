@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Set on records that only echo a file event (see ``log_payload``); they can be
+# kept out of the journal since the event itself is already stored.
+ECHO_ATTR = "hawkeye_echo"
+
+DedupKey = Tuple[str, int, str]
+
+
+@dataclass(frozen=True)
+class SamplingPolicy:
+    # logger name (or dotted prefix) -> records per second; 0 drops the logger entirely
+    rate_limits: Dict[str, float] = field(default_factory=dict)
+    # level name -> fraction of records kept
+    sample_rates: Dict[str, float] = field(default_factory=dict)
+    dedup_window: float = 0.0
+    skip_event_echo: bool = False
+    # records at or above this level are never rate limited or sampled out
+    exempt_level: int = logging.WARNING
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rate_limits or self.sample_rates or self.dedup_window > 0 or self.skip_event_echo)
+
+
+class _TokenBucket:
+    __slots__ = ("rate", "tokens", "updated")
+
+    def __init__(self, rate: float, now: float) -> None:
+        self.rate = rate
+        self.tokens = max(rate, 1.0)
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        if self.rate <= 0:
+            return False
+        self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class _Repeat:
+    __slots__ = ("first_seen", "suppressed", "last_record")
+
+    def __init__(self, now: float) -> None:
+        self.first_seen = now
+        self.suppressed = 0
+        self.last_record: Optional[logging.LogRecord] = None
+
+
+class LogSampler:
+    """Decides which log records reach the journal queue.
+
+    Called from whichever thread logs, so state is guarded by a lock. Repeats
+    of the same (logger, level, message) inside ``dedup_window`` are counted
+    instead of passed; :meth:`expired` hands them back as one summary record
+    with the number of suppressed repeats once the window closes.
+    """
+
+    def __init__(self, policy: SamplingPolicy, clock: Callable[[], float] = time.monotonic) -> None:
+        self._policy = policy
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Optional[_TokenBucket]] = {}
+        self._credit: Dict[str, float] = {}
+        self._repeats: Dict[DedupKey, _Repeat] = {}
+        self._ready: List[Tuple[logging.LogRecord, int]] = []
+        self.passed = 0
+        self.echo_skipped = 0
+        self.deduplicated = 0
+        self.sampled_out = 0
+        self.rate_limited = 0
+
+    @property
+    def dedup_window(self) -> float:
+        return self._policy.dedup_window
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "passed": self.passed,
+            "echo_skipped": self.echo_skipped,
+            "deduplicated": self.deduplicated,
+            "sampled_out": self.sampled_out,
+            "rate_limited": self.rate_limited,
+        }
+
+    def admit(self, record: logging.LogRecord) -> bool:
+        policy = self._policy
+        if policy.skip_event_echo and getattr(record, ECHO_ATTR, False):
+            with self._lock:
+                self.echo_skipped += 1
+            return False
+
+        with self._lock:
+            now = self._clock()
+            if policy.dedup_window > 0 and self._is_repeat(record, now):
+                self.deduplicated += 1
+                return False
+            if record.levelno < policy.exempt_level:
+                if not self._sample(record.levelname):
+                    self.sampled_out += 1
+                    return False
+                bucket = self._bucket_for(record.name, now)
+                if bucket is not None and not bucket.take(now):
+                    self.rate_limited += 1
+                    return False
+            self.passed += 1
+            return True
+
+    def expired(self, *, force: bool = False) -> List[Tuple[logging.LogRecord, int]]:
+        """Closes finished dedup windows; returns (last record, suppressed count) pairs."""
+        with self._lock:
+            now = self._clock()
+            summaries, self._ready = self._ready, []
+            for key in [k for k, r in self._repeats.items() if force or now - r.first_seen >= self._policy.dedup_window]:
+                repeat = self._repeats.pop(key)
+                if repeat.suppressed and repeat.last_record is not None:
+                    summaries.append((repeat.last_record, repeat.suppressed))
+            return summaries
+
+    def pending_repeats(self) -> bool:
+        with self._lock:
+            return bool(self._repeats or self._ready)
+
+    def _is_repeat(self, record: logging.LogRecord, now: float) -> bool:
+        key = (record.name, record.levelno, record.getMessage())
+        repeat = self._repeats.get(key)
+        if repeat is not None and now - repeat.first_seen < self._policy.dedup_window:
+            repeat.suppressed += 1
+            repeat.last_record = record
+            return True
+        if repeat is not None and repeat.suppressed:
+            # The window closed before a sweep picked it up.
+            self._ready.append((repeat.last_record, repeat.suppressed))
+        self._repeats[key] = _Repeat(now)
+        return False
+
+    def _sample(self, level: str) -> bool:
+        rate = self._policy.sample_rates.get(level)
+        if rate is None or rate >= 1.0:
+            return True
+        # Deterministic "keep every 1/rate-th record" instead of random draws.
+        credit = self._credit.get(level, 0.0) + rate
+        if credit >= 1.0:
+            self._credit[level] = credit - 1.0
+            return True
+        self._credit[level] = credit
+        return False
+
+    def _bucket_for(self, name: str, now: float) -> Optional[_TokenBucket]:
+        if name in self._buckets:
+            return self._buckets[name]
+        rate = None
+        probe = name
+        while True:
+            if probe in self._policy.rate_limits:
+                rate = self._policy.rate_limits[probe]
+                break
+            if "." not in probe:
+                break
+            probe = probe.rsplit(".", 1)[0]
+        bucket = _TokenBucket(rate, now) if rate is not None else None
+        self._buckets[name] = bucket
+        return bucket
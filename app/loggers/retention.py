@@ -0,0 +1,255 @@
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from app.loggers.db_logger import PartitionCatalog
+
+logger = logging.getLogger("hawkeye-retention")
+
+ROLLUP_FILE_EVENTS_SQL = """
+INSERT INTO file_events_rollup(hour_utc, directory, event, count)
+VALUES(?, ?, ?, ?)
+ON CONFLICT(hour_utc, directory, event) DO UPDATE SET count = count + excluded.count
+"""
+
+ROLLUP_LOG_JOURNAL_SQL = """
+INSERT INTO log_journal_rollup(hour_utc, level, logger_name, count)
+VALUES(?, ?, ?, ?)
+ON CONFLICT(hour_utc, level, logger_name) DO UPDATE SET count = count + excluded.count
+"""
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    max_age: Optional[timedelta] = None
+    max_bytes: Optional[int] = None
+    chunk_size: int = 1000
+    interval: float = 300.0
+    vacuum_pages: int = 500
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_age is not None or self.max_bytes is not None
+
+
+def hour_bucket(timestamp_utc: str) -> str:
+    return f"{timestamp_utc[:13]}:00:00+00:00"
+
+
+def directory_of(path: str) -> str:
+    idx = max(path.rfind("/"), path.rfind("\\"))
+    if idx < 0:
+        return ""
+    return path[:idx] or path[:1]
+
+
+async def open_maintenance_connection(db_path: str, busy_timeout_ms: int = 5000) -> aiosqlite.Connection:
+    conn = await aiosqlite.connect(db_path)
+    await conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+    return conn
+
+
+def _file_event_bucket(row: Tuple[Any, ...]) -> Tuple[Tuple[str, str, str], int]:
+    _, event, src_path, ts = row
+    return (hour_bucket(ts), directory_of(src_path), event), 1
+
+
+def _log_journal_bucket(row: Tuple[Any, ...]) -> Tuple[Tuple[str, str, str], int]:
+    _, level, logger_name, ts, repeat_count = row
+    return (hour_bucket(ts), level, logger_name), repeat_count or 1
+
+
+# table -> (selected columns, rollup key and weight, rollup upsert)
+_ROLLUPS = {
+    "file_events": ("id, event, src_path, timestamp_utc", _file_event_bucket, ROLLUP_FILE_EVENTS_SQL),
+    "log_journal": ("id, level, logger_name, timestamp_utc, repeat_count", _log_journal_bucket, ROLLUP_LOG_JOURNAL_SQL),
+}
+
+
+async def expire_chunk(conn: aiosqlite.Connection, table: str, cutoff: Optional[str], chunk_size: int) -> int:
+    columns, bucket_of, rollup_sql = _ROLLUPS[table]
+    params = (cutoff,) if cutoff else ()
+    where = " WHERE timestamp_utc < ?" if cutoff else ""
+    age_clause = " AND timestamp_utc < ?" if cutoff else ""
+
+    async with conn.execute(
+        f"SELECT {columns} FROM {table}{where} ORDER BY id LIMIT ?",
+        (*params, chunk_size),
+    ) as cur:
+        rows = await cur.fetchall()
+    if not rows:
+        return 0
+
+    buckets: Counter[Tuple[str, str, str]] = Counter()
+    for row in rows:
+        key, weight = bucket_of(row)
+        buckets[key] += weight
+    try:
+        await conn.executemany(rollup_sql, [(*key, n) for key, n in buckets.items()])
+        await conn.execute(f"DELETE FROM {table} WHERE id <= ?{age_clause}", (rows[-1][0], *params))
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return len(rows)
+
+
+async def used_bytes(conn: aiosqlite.Connection) -> int:
+    values: List[int] = []
+    for pragma in ("page_count", "freelist_count", "page_size"):
+        async with conn.execute(f"PRAGMA {pragma}") as cur:
+            values.append((await cur.fetchone())[0])
+    page_count, freelist_count, page_size = values
+    return (page_count - freelist_count) * page_size
+
+
+async def incremental_vacuum(conn: aiosqlite.Connection, pages: int) -> int:
+    async with conn.execute("PRAGMA auto_vacuum") as cur:
+        if (await cur.fetchone())[0] != 2:
+            return 0
+
+    released = 0
+    while True:
+        async with conn.execute("PRAGMA freelist_count") as cur:
+            free = (await cur.fetchone())[0]
+        if free == 0:
+            return released
+        step = min(free, pages)
+        await conn.execute(f"PRAGMA incremental_vacuum({int(step)})")
+        await conn.commit()
+        released += step
+        await asyncio.sleep(0)
+
+
+async def enforce_retention(
+    conn: aiosqlite.Connection,
+    policy: RetentionPolicy,
+    *,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    stats = {"file_events": 0, "log_journal": 0, "vacuumed_pages": 0}
+
+    if policy.max_age is not None:
+        cutoff = ((now or datetime.now(timezone.utc)) - policy.max_age).isoformat(timespec="milliseconds")
+        for table in _ROLLUPS:
+            while True:
+                deleted = await expire_chunk(conn, table, cutoff, policy.chunk_size)
+                stats[table] += deleted
+                if deleted < policy.chunk_size:
+                    break
+                await asyncio.sleep(0)
+
+    if policy.max_bytes is not None:
+        while await used_bytes(conn) > policy.max_bytes:
+            deleted_events = await expire_chunk(conn, "file_events", None, policy.chunk_size)
+            deleted_logs = await expire_chunk(conn, "log_journal", None, policy.chunk_size)
+            stats["file_events"] += deleted_events
+            stats["log_journal"] += deleted_logs
+            if not deleted_events and not deleted_logs:
+                break
+            await asyncio.sleep(0)
+
+    if stats["file_events"] or stats["log_journal"]:
+        stats["vacuumed_pages"] = await incremental_vacuum(conn, policy.vacuum_pages)
+    return stats
+
+
+PARTITION_FILE_EVENTS_SQL = """
+SELECT substr(timestamp_utc, 1, 13), src_path, event, COUNT(*)
+FROM {schema}.file_events GROUP BY 1, 2, 3
+"""
+PARTITION_LOG_JOURNAL_SQL = """
+SELECT substr(timestamp_utc, 1, 13), level, logger_name, SUM(COALESCE(repeat_count, 1))
+FROM {schema}.log_journal GROUP BY 1, 2, 3
+"""
+
+
+async def drop_partition(conn: aiosqlite.Connection, partitions: PartitionCatalog, key: str) -> Dict[str, int]:
+    """Folds one partition into the main file's rollups, then deletes its files."""
+    schema = partitions.alias_of(key)
+    await conn.execute(f"ATTACH DATABASE ? AS {schema}", (partitions.path_of(key),))
+    try:
+        file_buckets: Counter[Tuple[str, str, str]] = Counter()
+        async with conn.execute(PARTITION_FILE_EVENTS_SQL.format(schema=schema)) as cur:
+            async for hour, src_path, event, n in cur:
+                file_buckets[(hour_bucket(hour), directory_of(src_path), event)] += n
+        async with conn.execute(PARTITION_LOG_JOURNAL_SQL.format(schema=schema)) as cur:
+            log_rows = [(hour_bucket(hour), level, name, n) for hour, level, name, n in await cur.fetchall()]
+        try:
+            await conn.executemany(ROLLUP_FILE_EVENTS_SQL, [(*k, n) for k, n in file_buckets.items()])
+            await conn.executemany(ROLLUP_LOG_JOURNAL_SQL, log_rows)
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+    finally:
+        await conn.execute(f"DETACH DATABASE {schema}")
+    partitions.unlink(key)
+    return {"file_events": sum(file_buckets.values()), "log_journal": sum(row[3] for row in log_rows)}
+
+
+async def enforce_partition_retention(
+    conn: aiosqlite.Connection,
+    partitions: PartitionCatalog,
+    policy: RetentionPolicy,
+    *,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """Drops whole partitions, oldest first.
+
+    The newest partition is always kept, and so is every partition from the
+    oldest one a live lane is still on: lanes move forward independently.
+    """
+    stats = {"file_events": 0, "log_journal": 0, "partitions": 0}
+    keys = partitions.keys()[:-1]
+    held = partitions.oldest_held()
+    if held is not None:
+        keys = [key for key in keys if key < held]
+    expired: List[str] = []
+    if policy.max_age is not None:
+        cutoff = ((now or datetime.now(timezone.utc)) - policy.max_age).isoformat(timespec="milliseconds")
+        expired = [key for key in keys if partitions.end_of(key) <= cutoff]
+    if policy.max_bytes is not None:
+        total = await used_bytes(conn) + sum(partitions.size_bytes(key) for key in partitions.keys())
+        for key in keys:
+            if total <= policy.max_bytes:
+                break
+            total -= partitions.size_bytes(key)
+            if key not in expired:
+                expired.append(key)
+
+    for key in expired:
+        dropped = await drop_partition(conn, partitions, key)
+        stats["file_events"] += dropped["file_events"]
+        stats["log_journal"] += dropped["log_journal"]
+        stats["partitions"] += 1
+    return stats
+
+
+async def retention_worker(
+    *,
+    conn: aiosqlite.Connection,
+    policy: RetentionPolicy,
+    partitions: Optional[PartitionCatalog] = None,
+) -> None:
+    while True:
+        try:
+            stats = await enforce_retention(conn, policy)
+            if partitions is not None:
+                # Rows written before partitioning was enabled still expire from the main file.
+                dropped = await enforce_partition_retention(conn, partitions, policy)
+                stats["file_events"] += dropped["file_events"]
+                stats["log_journal"] += dropped["log_journal"]
+                stats["partitions"] = dropped["partitions"]
+            if stats["file_events"] or stats["log_journal"]:
+                logger.info("Retention removed %s", stats)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Retention pass failed")
+        await asyncio.sleep(policy.interval)
@@ -0,0 +1,351 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from typing import IO, Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger("hawkeye-overflow")
+
+OVERFLOW_POLICIES = ("drop-newest", "drop-oldest", "coalesce", "spill")
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+# Sidecar with the read position: {"seq": <segment>, "offset": <bytes>}.
+CHECKPOINT_NAME = "checkpoint.json"
+# Lines read back between checkpoints; bounds what a crash can replay twice.
+CHECKPOINT_EVERY = 1000
+
+
+class SpillLog:
+    """Append-only log of JSON payloads split into segment files.
+
+    Segments are deleted once fully read back, and all of them as soon as
+    everything written has been read. The read position is checkpointed
+    (fsynced) every ``CHECKPOINT_EVERY`` lines and on :meth:`close`, so a
+    restart replays only what was not read yet; after a crash, at most the
+    lines since the last checkpoint come back twice. Every line is flushed as
+    it is written and a segment is fsynced when it is rotated out; a line
+    torn by a crash is skipped and counted in :attr:`corrupt`.
+    """
+
+    def __init__(self, directory: str, *, segment_bytes: int = 16 * 1024 * 1024) -> None:
+        self._dir = directory
+        self._segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._segments: List[int] = sorted(self._existing_segments())
+        self._writer: Optional[IO[str]] = None
+        self._writer_seq: Optional[int] = None
+        self._reader: Optional[IO[bytes]] = None
+        self._reader_seq: Optional[int] = None
+        self._since_checkpoint = 0
+        self.corrupt = 0
+
+        seq, offset = self._read_checkpoint()
+        if seq in self._segments:
+            for done in [n for n in self._segments if n < seq]:
+                os.remove(self._path(done))
+            self._segments = [n for n in self._segments if n >= seq]
+            self._reader = open(self._path(seq), "rb")
+            self._reader.seek(offset)
+            self._reader_seq = seq
+        else:
+            offset = 0
+        self._pending = sum(self._count_lines(n, offset if n == seq else 0) for n in self._segments)
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def _existing_segments(self) -> List[int]:
+        seqs: List[int] = []
+        for name in os.listdir(self._dir):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    seqs.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return seqs
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self._dir, f"{SEGMENT_PREFIX}{seq:08d}{SEGMENT_SUFFIX}")
+
+    def _count_lines(self, seq: int, offset: int = 0) -> int:
+        with open(self._path(seq), "rb") as f:
+            f.seek(offset)
+            return sum(1 for line in f if line.strip())
+
+    def _read_checkpoint(self) -> Tuple[Optional[int], int]:
+        try:
+            with open(os.path.join(self._dir, CHECKPOINT_NAME), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return int(data["seq"]), int(data["offset"])
+        except FileNotFoundError:
+            return None, 0
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring unreadable spill checkpoint in %s", self._dir)
+            return None, 0
+
+    def _write_checkpoint(self) -> None:
+        self._since_checkpoint = 0
+        if self._reader is None:
+            return
+        path = os.path.join(self._dir, CHECKPOINT_NAME)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": self._reader_seq, "offset": self._reader.tell()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _open_writer(self) -> IO[str]:
+        if self._writer is not None and self._writer.tell() < self._segment_bytes:
+            return self._writer
+        if self._writer is not None:
+            self._sync_close(self._writer)
+        seq = (self._segments[-1] + 1) if self._segments else 1
+        self._segments.append(seq)
+        self._writer_seq = seq
+        self._writer = open(self._path(seq), "a", encoding="utf-8")
+        return self._writer
+
+    def append(self, payload: Dict[str, Any]) -> None:
+        writer = self._open_writer()
+        writer.write(json.dumps(payload, separators=(",", ":")))
+        writer.write("\n")
+        writer.flush()
+        self._pending += 1
+
+    @staticmethod
+    def _sync_close(f: IO[str]) -> None:
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+
+    def pop(self) -> Optional[Dict[str, Any]]:
+        while self._segments:
+            seq = self._segments[0]
+            if self._reader_seq != seq:
+                if self._reader is not None:
+                    self._reader.close()
+                self._reader = open(self._path(seq), "rb")
+                self._reader_seq = seq
+            line = self._reader.readline()
+            if line.strip():
+                self._pending -= 1
+                try:
+                    payload = json.loads(line)
+                except ValueError:
+                    self.corrupt += 1
+                    logger.warning("Skipping corrupt spill line in %s", self._path(seq))
+                    payload = None
+                if self._pending <= 0:
+                    self._discard()
+                else:
+                    self._since_checkpoint += 1
+                    if self._since_checkpoint >= CHECKPOINT_EVERY:
+                        self._write_checkpoint()
+                if payload is None:
+                    continue
+                return payload
+            if line:
+                continue
+
+            if seq == self._writer_seq:
+                self._discard()
+                return None
+            self._reader.close()
+            self._reader = None
+            self._reader_seq = None
+            self._segments.pop(0)
+            os.remove(self._path(seq))
+        self._pending = 0
+        return None
+
+    def _discard(self) -> None:
+        """Everything written has been read back: drop every segment and the checkpoint."""
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._reader_seq = None
+        self.close()
+        for seq in self._segments:
+            os.remove(self._path(seq))
+        self._segments = []
+        self._pending = 0
+        try:
+            os.remove(os.path.join(self._dir, CHECKPOINT_NAME))
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._sync_close(self._writer)
+            self._writer = None
+        if self._reader is not None:
+            self._write_checkpoint()
+            self._reader.close()
+            self._reader = None
+        self._writer_seq = None
+        self._reader_seq = None
+
+
+class OverflowGuard:
+    """Puts payloads into a bounded queue and applies ``policy`` when it is full.
+
+    ``coalesce`` and ``spill`` keep a backlog that is replayed by :meth:`run`
+    in arrival order; while a backlog exists new payloads queue up behind it.
+    Must be used from the event loop thread.
+    """
+
+    def __init__(
+        self,
+        *,
+        queue: asyncio.Queue[Dict[str, Any]],
+        policy: str = "drop-newest",
+        name: str = "events",
+        key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+        spill: Optional[SpillLog] = None,
+        warn_on_drop: bool = True,
+        label: Optional[Callable[[Dict[str, Any]], str]] = None,
+    ) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy!r}")
+        if policy == "spill" and spill is None:
+            raise ValueError("Overflow policy 'spill' needs a SpillLog")
+
+        self._queue = queue
+        self._policy = policy
+        self._name = name
+        self._key = key or (lambda p: p.get("src_path"))
+        self._label = label or (lambda p: p.get("event", ""))
+        self._spill = spill
+        self._warn_on_drop = warn_on_drop
+        self._last_warning = 0.0
+        self._coalesced: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._in_flight = 0
+        self._backlog_ready = asyncio.Event()
+        if spill is not None and len(spill):
+            # Left over from a previous run: replay without waiting for new traffic.
+            self._backlog_ready.set()
+
+        self.dropped = 0
+        self.spilled = 0
+        self.coalesced = 0
+        self.replayed = 0
+        self.high_water = 0
+        self.dropped_by: Counter[str] = Counter()
+        self.coalesced_by: Counter[str] = Counter()
+
+    @property
+    def policy(self) -> str:
+        return self._policy
+
+    def backlog(self) -> int:
+        spilled = len(self._spill) if self._spill is not None else 0
+        return spilled + len(self._coalesced) + self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self._policy,
+            "depth": self._queue.qsize(),
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "coalesced": self.coalesced,
+            "replayed": self.replayed,
+            "spill_corrupt": self._spill.corrupt if self._spill is not None else 0,
+            "backlog": self.backlog(),
+            "high_water": self.high_water,
+        }
+
+    def _track_depth(self) -> None:
+        depth = self._queue.qsize()
+        if depth > self.high_water:
+            self.high_water = depth
+
+    def put(self, payload: Dict[str, Any]) -> None:
+        try:
+            if not self.backlog():
+                try:
+                    self._queue.put_nowait(payload)
+                    self._track_depth()
+                    return
+                except asyncio.QueueFull:
+                    pass
+            self._overflow(payload)
+        except Exception:
+            logger.exception("Failed to enqueue %s payload", self._name)
+
+    def _overflow(self, payload: Dict[str, Any]) -> None:
+        if self._policy == "spill":
+            self._spill.append(payload)
+            self.spilled += 1
+            self._backlog_ready.set()
+            return
+
+        if self._policy == "coalesce":
+            key = self._key(payload)
+            if key in self._coalesced:
+                self._coalesced[key] = payload
+                self.coalesced += 1
+                self.coalesced_by[self._label(payload)] += 1
+                return
+            if len(self._coalesced) < self._queue.maxsize:
+                self._coalesced[key] = payload
+                self._backlog_ready.set()
+                return
+
+        dropped = payload
+        if self._policy == "drop-oldest":
+            try:
+                dropped = self._queue.get_nowait()
+                self._queue.task_done()
+                self._queue.put_nowait(payload)
+            except (asyncio.QueueEmpty, asyncio.QueueFull):
+                pass
+
+        self.dropped += 1
+        self.dropped_by[self._label(dropped)] += 1
+        self._warn_drop()
+
+    def _warn_drop(self) -> None:
+        if not self._warn_on_drop:
+            return
+        now = time.monotonic()
+        if now - self._last_warning >= 1.0:
+            self._last_warning = now
+            logger.warning("%s queue is full, dropping event (dropped=%d)", self._name.capitalize(), self.dropped)
+
+    def _pop_backlog(self) -> Optional[Dict[str, Any]]:
+        if self._spill is not None and len(self._spill):
+            return self._spill.pop()
+        if self._coalesced:
+            return self._coalesced.popitem(last=False)[1]
+        return None
+
+    async def run(self) -> None:
+        while True:
+            await self._backlog_ready.wait()
+            self._backlog_ready.clear()
+            while True:
+                try:
+                    payload = self._pop_backlog()
+                except Exception:
+                    # Keep the task alive: a dead replayer would leave the backlog stuck forever.
+                    logger.exception("Failed to read %s backlog, retrying", self._name)
+                    await asyncio.sleep(1.0)
+                    continue
+                if payload is None:
+                    break
+                self._in_flight += 1
+                try:
+                    await self._queue.put(payload)
+                    self.replayed += 1
+                    self._track_depth()
+                finally:
+                    self._in_flight -= 1
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
@@ -0,0 +1,73 @@
+import re
+from typing import List, Pattern
+
+_GLOB_CHARS = frozenset("*?[")
+
+
+def normalize_path(path: str) -> str:
+    if "\\" in path:
+        path = path.replace("\\", "/")
+    if "//" in path:
+        path = re.sub(r"/+", "/", path)
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+    return path
+
+
+def split_path(path: str) -> List[str]:
+    norm = normalize_path(path)
+    if norm == "/":
+        return [""]
+    return norm.split("/")
+
+
+def has_magic(pattern: str) -> bool:
+    return any(c in _GLOB_CHARS for c in pattern)
+
+
+def glob_literal_prefix(pattern: str) -> List[str]:
+    prefix: List[str] = []
+    for part in split_path(pattern):
+        if has_magic(part):
+            break
+        prefix.append(part)
+    return prefix
+
+
+def translate_glob(pattern: str) -> str:
+    """Translate a path glob to a regex: ``*``/``?`` stop at ``/``, ``**`` crosses it."""
+    pat = normalize_path(pattern)
+    i, n = 0, len(pat)
+    out: List[str] = []
+    while i < n:
+        c = pat[i]
+        if c == "*":
+            if pat.startswith("**", i):
+                i += 2
+                if i < n and pat[i] == "/":
+                    i += 1
+                    out.append("(?:.*/)?")
+                else:
+                    out.append(".*")
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pat.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pat[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def compile_glob(pattern: str) -> Pattern[str]:
+    return re.compile(translate_glob(pattern) + r"\Z", re.DOTALL)
@@ -1,13 +1,37 @@
 import asyncio
+import heapq
 import logging
+import time
 import traceback
-from typing import Any, Awaitable, Callable, Dict
+from collections import Counter, OrderedDict
+from contextlib import nullcontext
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
+from app.aggregates import LiveAggregates
+from app.batching import drain_batch
+from app.enrichment import ContentEnricher
+from app.lanes import EVENTS_LANE, LaneScheduler
 from app.events import ChangeFileEvent
-from app.loggers.db_logger import insert_change_log
+from app.loggers.db_logger import insert_change_logs
+from app.loggers.log_sampling import ECHO_ATTR
+from app.metrics import (
+    COMMIT_TO_EMIT,
+    ENQUEUE_TO_COMMIT,
+    EVENTS_EMITTED,
+    EVENTS_IN,
+    SQLITE_COMMIT,
+    WATCHER_TO_ENQUEUE,
+)
+from app.overflow import OverflowGuard
 
 logger = logging.getLogger("hawkeye-pipeline")
 
+_ECHO = {ECHO_ATTR: True}
+
+# time.monotonic() of the moment a payload entered the loop; popped before emit.
+ENQUEUED_AT_KEY = "_enqueued_at"
+
 
 def log_payload(p: Dict[str, Any]) -> None:
     if p.get("event") == "moved":
@@ -17,6 +41,7 @@ def log_payload(p: Dict[str, Any]) -> None:
             p.get("is_directory"),
             p.get("src_path"),
             p.get("dest_path"),
+            extra=_ECHO,
         )
     else:
         logger.info(
@@ -24,28 +49,337 @@ def log_payload(p: Dict[str, Any]) -> None:
             p.get("event"),
             p.get("is_directory"),
             p.get("src_path"),
+            extra=_ECHO,
         )
 
 
+def put_event(queue: asyncio.Queue[Dict[str, Any]], payload: Dict[str, Any]) -> None:
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        logger.warning("Events queue is full, dropping event")
+    except Exception:
+        logger.exception("Failed to enqueue event")
+
+
+# (pending, incoming) -> merged event type; None cancels both events.
+_MERGE_RULES: Dict[Tuple[str, str], Optional[str]] = {
+    ("created", "created"): "created",
+    ("created", "modified"): "created",
+    ("created", "deleted"): None,
+    ("modified", "modified"): "modified",
+    ("modified", "deleted"): "deleted",
+    ("deleted", "created"): "modified",
+    ("deleted", "deleted"): "deleted",
+}
+
+
+class _Pending:
+    __slots__ = ("payload", "first_seen", "last_seen")
+
+    def __init__(self, payload: Dict[str, Any], now: float) -> None:
+        self.payload = payload
+        self.first_seen = now
+        self.last_seen = now
+
+
+class EventCoalescer:
+    """Holds file events per path until the path is quiet for ``quiet_window`` seconds.
+
+    Must be used from the event loop thread. Each path is flushed as soon as it
+    is due, whatever the state of the others; a busy path is flushed anyway
+    after ``max_hold``. Due times live in a lazily pruned heap.
+
+    A temp file moved into place folds into one event on the destination:
+    "modified" when the destination is known to exist (pending, or emitted in
+    the last ``max_known`` paths), "created" when it was created in the same
+    window. Otherwise the move is passed on as it happened.
+    """
+
+    def __init__(
+        self,
+        *,
+        loop: asyncio.AbstractEventLoop,
+        sink: Callable[[Dict[str, Any]], None],
+        quiet_window: float,
+        max_hold: Optional[float] = None,
+        max_known: int = 10000,
+    ) -> None:
+        self._loop = loop
+        self._sink = sink
+        self._quiet_window = quiet_window
+        self._max_hold = max_hold if max_hold is not None else quiet_window * 10
+        self._pending: "OrderedDict[str, _Pending]" = OrderedDict()
+        # (due_at, seq, path, entry); stale items are dropped when they reach the top.
+        self._due: List[Tuple[float, int, str, _Pending]] = []
+        self._seq = 0
+        # Paths last emitted as existing, oldest first.
+        self._known: "OrderedDict[str, None]" = OrderedDict()
+        self._max_known = max(0, max_known)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.received = 0
+        self.emitted = 0
+        self.merged = 0
+        self.merged_by: Counter[str] = Counter()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "received": self.received,
+            "emitted": self.emitted,
+            "merged": self.merged,
+            "pending": len(self._pending),
+        }
+
+    def push(self, payload: Dict[str, Any]) -> None:
+        self.received += 1
+        now = self._loop.time()
+
+        if payload.get("event") == "moved" and payload.get("dest_path"):
+            self._push_moved(payload, now)
+        else:
+            self._push_in_place(payload, now)
+
+        self._schedule()
+
+    def flush(self) -> None:
+        while self._pending:
+            _, entry = self._pending.popitem(last=False)
+            self._emit(entry.payload)
+        self._due.clear()
+        self._cancel_timer()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _push_in_place(self, payload: Dict[str, Any], now: float) -> None:
+        key = payload["src_path"]
+        entry = self._pending.get(key)
+        if entry is None:
+            self._hold(key, _Pending(payload, now))
+            return
+
+        rule = (entry.payload["event"], payload["event"])
+        if rule not in _MERGE_RULES:
+            self._emit_pending(key)
+            self._hold(key, _Pending(payload, now))
+            return
+
+        merged_event = _MERGE_RULES[rule]
+        if merged_event is None:
+            del self._pending[key]
+            self._count_merged(entry.payload, payload)
+            return
+
+        entry.payload = {**payload, "event": merged_event}
+        entry.last_seen = now
+        self._track(key, entry)
+        self._count_merged(payload)
+
+    def _push_moved(self, payload: Dict[str, Any], now: float) -> None:
+        src, dest = payload["src_path"], payload["dest_path"]
+        entry = self._pending.get(src)
+        if entry is not None and entry.payload["event"] == "created" and dest != src:
+            self._push_replace(entry, payload, now)
+            return
+
+        if dest in self._pending and dest != src:
+            self._emit_pending(dest)
+
+        if entry is None:
+            self._hold(dest, _Pending(payload, now))
+            return
+
+        prev = entry.payload
+        if prev["event"] == "moved":
+            if prev["src_path"] == dest:
+                del self._pending[src]
+                self._count_merged(prev, payload)
+                return
+            merged = {**payload, "src_path": prev["src_path"]}
+        else:
+            self._emit_pending(src)
+            self._hold(dest, _Pending(payload, now))
+            return
+
+        del self._pending[src]
+        self._fold(dest, merged, entry.first_seen, now)
+        self._count_merged(payload)
+
+    def _push_replace(self, entry: _Pending, payload: Dict[str, Any], now: float) -> None:
+        """A file created in this window was moved onto ``dest`` (temp file + rename)."""
+        src, dest = payload["src_path"], payload["dest_path"]
+        target = self._pending.get(dest)
+        first_seen = entry.first_seen
+        if target is not None and target.payload["event"] in ("created", "modified", "deleted"):
+            # Replacing a file that is new in this window keeps it new; anything else changed it.
+            event = "created" if target.payload["event"] == "created" else "modified"
+            del self._pending[dest]
+            self._count_merged(target.payload)
+            first_seen = min(first_seen, target.first_seen)
+        elif target is None and dest not in self._known:
+            # Nothing says whether ``dest`` existed, so neither "created" nor "modified" is safe.
+            self._emit_pending(src)
+            self._hold(dest, _Pending(payload, now))
+            return
+        else:
+            if target is not None:
+                self._emit_pending(dest)
+            event = "modified"
+
+        del self._pending[src]
+        self._fold(dest, {**payload, "event": event, "src_path": dest, "dest_path": None}, first_seen, now)
+        self._count_merged(payload)
+
+    def _fold(self, key: str, payload: Dict[str, Any], first_seen: float, now: float) -> None:
+        folded = _Pending(payload, first_seen)
+        folded.last_seen = now
+        self._hold(key, folded)
+
+    def _hold(self, key: str, entry: _Pending) -> None:
+        self._pending[key] = entry
+        self._track(key, entry)
+
+    def _track(self, key: str, entry: _Pending) -> None:
+        self._seq += 1
+        heapq.heappush(self._due, (self._due_at(entry), self._seq, key, entry))
+        if len(self._due) > 4 * len(self._pending) + 64:
+            self._due = []
+            for k, e in self._pending.items():
+                self._seq += 1
+                self._due.append((self._due_at(e), self._seq, k, e))
+            heapq.heapify(self._due)
+
+    def _is_current(self, item: Tuple[float, int, str, _Pending]) -> bool:
+        due, _, key, entry = item
+        return self._pending.get(key) is entry and self._due_at(entry) == due
+
+    def _count_merged(self, *payloads: Dict[str, Any]) -> None:
+        for payload in payloads:
+            self.merged += 1
+            self.merged_by[payload["event"]] += 1
+
+    def _due_at(self, entry: _Pending) -> float:
+        return min(entry.last_seen + self._quiet_window, entry.first_seen + self._max_hold)
+
+    def _emit(self, payload: Dict[str, Any]) -> None:
+        self._remember(payload)
+        self.emitted += 1
+        self._sink(payload)
+
+    def _remember(self, payload: Dict[str, Any]) -> None:
+        if not self._max_known:
+            return
+        event, src = payload["event"], payload["src_path"]
+        if event in ("deleted", "moved"):
+            self._known.pop(src, None)
+        path = payload.get("dest_path") if event == "moved" else src
+        if event == "deleted" or not path:
+            return
+        self._known[path] = None
+        self._known.move_to_end(path)
+        if len(self._known) > self._max_known:
+            self._known.popitem(last=False)
+
+    def _emit_pending(self, key: str) -> None:
+        self._emit(self._pending.pop(key).payload)
+
+    def _schedule(self) -> None:
+        due = self._due
+        while due and not self._is_current(due[0]):
+            heapq.heappop(due)
+        if not due:
+            self._cancel_timer()
+            return
+        when = due[0][0]
+        if self._timer is not None:
+            if self._timer.when() <= when:
+                return
+            self._timer.cancel()
+        self._timer = self._loop.call_at(when, self._on_timer)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        now = self._loop.time()
+        ready: List[Dict[str, Any]] = []
+        due = self._due
+        while due and due[0][0] <= now:
+            item = heapq.heappop(due)
+            if self._is_current(item):
+                del self._pending[item[2]]
+                ready.append(item[3].payload)
+
+        for payload in ready:
+            self._emit(payload)
+        self._schedule()
+
+
 def make_enqueue(
     *,
     loop: asyncio.AbstractEventLoop,
     queue: asyncio.Queue[Dict[str, Any]],
+    coalescer: Optional[EventCoalescer] = None,
+    enricher: Optional[ContentEnricher] = None,
+    overflow: Optional[OverflowGuard] = None,
 ) -> Callable[[ChangeFileEvent], None]:
-    def enqueue(evt: ChangeFileEvent) -> None:
+    if coalescer is not None:
+        sink = coalescer.push
+    elif enricher is not None:
+        sink = enricher.push
+    elif overflow is not None:
+        sink = overflow.put
+    else:
+        sink = partial(put_event, queue)
+
+    def receive(evt: ChangeFileEvent) -> None:
+        now_ns = time.monotonic_ns()
+        WATCHER_TO_ENQUEUE.observe((now_ns - evt.mono_ns) / 1e9)
         payload = evt.to_dict()
+        EVENTS_IN.inc(payload["event"])
+        payload[ENQUEUED_AT_KEY] = now_ns / 1e9
+        sink(payload)
+
+    # Runs on the observer thread: the payload dict is built on the loop in ``receive``.
+    def enqueue(evt: ChangeFileEvent) -> None:
+        loop.call_soon_threadsafe(receive, evt)
+
+    return enqueue
+
 
-        def _safe_put() -> None:
+async def _store_events(db_conn, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Inserts ``batch`` and returns the payloads that were stored, each with its ``seq``.
+
+    A failed batch is retried row by row so one bad payload only costs itself.
+    """
+    try:
+        ids = await insert_change_logs(db_conn, batch)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        if len(batch) == 1:
+            raise
+        logger.warning("Batch insert of %d file event(s) failed, retrying one by one", len(batch), exc_info=True)
+        stored: List[Dict[str, Any]] = []
+        for payload in batch:
             try:
-                queue.put_nowait(payload)
-            except asyncio.QueueFull:
-                logger.warning("Events queue is full, dropping event")
+                ids = await insert_change_logs(db_conn, [payload])
+            except asyncio.CancelledError:
+                raise
             except Exception:
-                logger.exception("Failed to enqueue event")
+                logger.exception("Failed to store file event: %s", payload)
+                continue
+            for seq in ids or ():
+                payload["seq"] = seq
+            stored.append(payload)
+        return stored
 
-        loop.call_soon_threadsafe(_safe_put)
-
-    return enqueue
+    for payload, seq in zip(batch, ids or ()):
+        payload["seq"] = seq
+    return batch
 
 
 async def events_consumer(
@@ -53,19 +387,53 @@ async def events_consumer(
     queue: asyncio.Queue[Dict[str, Any]],
     db_conn,
     emit_socket: Callable[[Dict[str, Any]], Awaitable[None]],
+    batch_size: int = 1,
+    flush_interval: float = 0.0,
+    scheduler: Optional[LaneScheduler] = None,
+    aggregates: Optional[LiveAggregates] = None,
 ) -> None:
     while True:
-        payload = await queue.get()
+        batch = await drain_batch(queue, max_size=batch_size, max_wait=flush_interval)
         try:
-            log_payload(payload)
-            await insert_change_log(db_conn, payload)
-            await emit_socket(payload)
+            for payload in batch:
+                log_payload(payload)
+            async with scheduler.turn(EVENTS_LANE) if scheduler is not None else nullcontext():
+                started = time.monotonic()
+                stored = await _store_events(db_conn, batch)
+                committed = time.monotonic()
+                SQLITE_COMMIT.observe(committed - started, "file_events")
+
+                if aggregates is not None:
+                    aggregates.observe_many(stored)
+                for payload in stored:
+                    enqueued_at = payload.pop(ENQUEUED_AT_KEY, None)
+                    if enqueued_at is not None and committed >= enqueued_at:
+                        ENQUEUE_TO_COMMIT.observe(committed - enqueued_at)
+                for payload in stored:
+                    # Already committed: one failed emit must not hold back the rest.
+                    try:
+                        await emit_socket(payload)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception:
+                        logger.exception("Failed to emit file event: %s", payload)
+                        continue
+                    EVENTS_EMITTED.inc(payload["event"])
+                    COMMIT_TO_EMIT.observe(time.monotonic() - committed)
 
         except asyncio.CancelledError:
             raise
 
         except Exception:
-            logger.exception("Failed to process file event: %s", payload)
+            logger.exception(
+                "Failed to process %d file event(s) from %s (%s) to %s (%s)",
+                len(batch),
+                batch[0].get("src_path"),
+                batch[0].get("timestamp_utc"),
+                batch[-1].get("src_path"),
+                batch[-1].get("timestamp_utc"),
+            )
 
         finally:
-            queue.task_done()
+            for _ in batch:
+                queue.task_done()
@@ -0,0 +1,484 @@
+import hashlib
+import heapq
+import json
+import logging
+import os
+import stat
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    DirModifiedEvent,
+    DirMovedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileSystemEvent,
+)
+from watchdog.observers.api import DEFAULT_EMITTER_TIMEOUT, BaseObserver, EventEmitter
+
+from app.filters import PathFilter
+
+logger = logging.getLogger("hawkeye-polling")
+
+INDEX_VERSION = 1
+
+# Directory mtimes newer than this are treated as "racy": an entry could have
+# changed within the same timestamp tick, so the directory is re-listed anyway.
+RACY_WINDOW_NS = 2_000_000_000
+
+# (inode, size, mtime_ns)
+FileStat = Tuple[int, int, int]
+
+
+def _file_stat(st: os.stat_result) -> FileStat:
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class StatBudget:
+    """Token bucket of stat calls per second, shared by every polled tree."""
+
+    def __init__(self, per_second: float) -> None:
+        self.per_second = per_second
+        self._tokens = per_second
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.deferred = 0
+
+    def take(self, cost: int, now: float, *, force: bool = False) -> bool:
+        with self._lock:
+            self._tokens = min(self.per_second, self._tokens + (now - self._updated) * self.per_second)
+            self._updated = now
+            if self._tokens < cost and not force:
+                self.deferred += 1
+                return False
+            self._tokens -= cost
+            return True
+
+
+@dataclass(frozen=True)
+class PollSchedule:
+    """Per-directory poll intervals: a directory that changed is polled every
+    ``min_interval``; each quiet poll multiplies its interval by ``backoff`` up to ``max_interval``."""
+
+    min_interval: float = 0.5
+    max_interval: float = 30.0
+    backoff: float = 2.0
+    budget: Optional[StatBudget] = None
+
+
+class _DirState:
+    __slots__ = ("stat", "files", "dirs", "interval", "due")
+
+    def __init__(self, st: FileStat, files: Dict[str, FileStat], dirs: Dict[str, int]) -> None:
+        self.stat = st
+        self.files = files
+        self.dirs = dirs
+        self.interval = 0.0
+        self.due = 0.0
+
+
+class _Changes:
+    __slots__ = ("created", "deleted", "modified")
+
+    def __init__(self) -> None:
+        self.created: List[Tuple[str, bool, int]] = []
+        self.deleted: List[Tuple[str, bool, int]] = []
+        self.modified: List[Tuple[str, bool]] = []
+
+    def __len__(self) -> int:
+        return len(self.created) + len(self.deleted) + len(self.modified)
+
+
+class DirectoryIndex:
+    """Compact per-directory index of a watched tree.
+
+    A directory whose mtime has not changed since the previous poll is not
+    listed again: only its known files are stat'ed (to catch in-place content
+    changes) and its known subdirectories are visited.
+
+    With a :class:`PollSchedule`, each :meth:`poll` only checks directories
+    that are due, most overdue first, and stops when the shared stat budget
+    runs out (at least one directory is always checked).
+    """
+
+    def __init__(
+        self,
+        root: str,
+        *,
+        recursive: bool = True,
+        path_filter: Optional[PathFilter] = None,
+        schedule: Optional[PollSchedule] = None,
+    ) -> None:
+        self.root = root
+        self.recursive = recursive
+        self._filter = path_filter
+        self._schedule = schedule
+        self._dirs: Dict[str, _DirState] = {}
+        # (due, path); entries whose due no longer matches the dir state are stale.
+        self._due: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._dirs)
+
+    @property
+    def is_built(self) -> bool:
+        return bool(self._dirs)
+
+    def file_count(self) -> int:
+        return sum(len(d.files) for d in self._dirs.values())
+
+    def build(self) -> None:
+        self._dirs.clear()
+        self._due.clear()
+        self._scan_new_dir(self.root, None)
+
+    def intervals(self) -> Dict[str, float]:
+        return {path: state.interval for path, state in self._dirs.items()}
+
+    def poll(self, now: Optional[float] = None) -> List[FileSystemEvent]:
+        changes = _Changes()
+        root_state = self._dirs.get(self.root)
+        if root_state is None:
+            self._scan_new_dir(self.root, changes)
+        elif self._schedule is None:
+            racy_before = time.time_ns() - RACY_WINDOW_NS
+            self._poll_dir(self.root, root_state, changes, racy_before)
+        else:
+            self._poll_due(time.monotonic() if now is None else now, changes)
+        return self._to_events(changes)
+
+    def _poll_due(self, now: float, changes: _Changes) -> None:
+        schedule = self._schedule
+        racy_before = time.time_ns() - RACY_WINDOW_NS
+        polled = 0
+        while self._due and self._due[0][0] <= now:
+            due, path = heapq.heappop(self._due)
+            state = self._dirs.get(path)
+            if state is None or state.due != due:
+                continue
+            if schedule.budget is not None and not schedule.budget.take(1 + len(state.files), now, force=not polled):
+                heapq.heappush(self._due, (due, path))
+                break
+            polled += 1
+
+            before = len(changes)
+            self._check_dir(path, state, changes, racy_before)
+            if len(changes) > before:
+                state.interval = schedule.min_interval
+            else:
+                backed_off = max(schedule.min_interval, state.interval * schedule.backoff)
+                state.interval = min(schedule.max_interval, backed_off)
+            self._set_due(path, state, now + state.interval)
+
+    def _set_due(self, path: str, state: _DirState, due: float) -> None:
+        state.due = due
+        if self._schedule is not None:
+            heapq.heappush(self._due, (due, path))
+
+    def _list_dir(self, path: str) -> Tuple[Dict[str, FileStat], Dict[str, int]]:
+        files: Dict[str, FileStat] = {}
+        dirs: Dict[str, int] = {}
+        with os.scandir(path) as it:
+            for entry in it:
+                if self._filter is not None and not self._filter.allows(
+                    entry.path, entry.is_dir(follow_symlinks=False)
+                ):
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    dirs[entry.name] = st.st_ino
+                else:
+                    files[entry.name] = _file_stat(st)
+        return files, dirs
+
+    def _scan_new_dir(self, path: str, changes: Optional[_Changes]) -> None:
+        try:
+            st = os.lstat(path)
+            files, dirs = self._list_dir(path)
+        except OSError:
+            return
+
+        state = self._dirs[path] = _DirState(_file_stat(st), files, dirs)
+        self._set_due(path, state, 0.0)
+        if changes is not None:
+            for name, fstat in files.items():
+                changes.created.append((os.path.join(path, name), False, fstat[0]))
+
+        if not self.recursive:
+            return
+        for name, ino in dirs.items():
+            sub = os.path.join(path, name)
+            if changes is not None:
+                changes.created.append((sub, True, ino))
+            self._scan_new_dir(sub, changes)
+
+    def _forget_dir(self, path: str, changes: _Changes) -> None:
+        state = self._dirs.pop(path, None)
+        if state is None:
+            return
+        for name, fstat in state.files.items():
+            changes.deleted.append((os.path.join(path, name), False, fstat[0]))
+        for name, ino in state.dirs.items():
+            sub = os.path.join(path, name)
+            changes.deleted.append((sub, True, ino))
+            self._forget_dir(sub, changes)
+
+    def _poll_dir(self, path: str, old: _DirState, changes: _Changes, racy_before: int) -> None:
+        new_dirs = self._check_dir(path, old, changes, racy_before)
+        if new_dirs is None or not self.recursive:
+            return
+        for name in new_dirs:
+            sub = os.path.join(path, name)
+            sub_state = self._dirs.get(sub)
+            if sub_state is not None:
+                self._poll_dir(sub, sub_state, changes, racy_before)
+
+    def _check_dir(
+        self, path: str, old: _DirState, changes: _Changes, racy_before: int
+    ) -> Optional[Dict[str, int]]:
+        """Updates one directory's own entries; returns its subdirectories, or None if it is gone."""
+        try:
+            st = _file_stat(os.lstat(path))
+        except OSError:
+            return None
+
+        unchanged = st[0] == old.stat[0] and st[2] == old.stat[2] and st[2] < racy_before
+        if unchanged and self._stat_known_files(path, old, changes):
+            new_dirs = old.dirs
+        else:
+            try:
+                files, new_dirs = self._list_dir(path)
+            except OSError:
+                return None
+            self._diff_listing(path, old, files, new_dirs, changes)
+            if old.stat[2] != st[2]:
+                changes.modified.append((path, True))
+            old.files = files
+            old.dirs = new_dirs
+        old.stat = st
+        return new_dirs
+
+    def _stat_known_files(self, path: str, state: _DirState, changes: _Changes) -> bool:
+        updated: List[Tuple[str, FileStat]] = []
+        for name, fstat in state.files.items():
+            try:
+                st = _file_stat(os.lstat(os.path.join(path, name)))
+            except OSError:
+                return False
+            if st[0] != fstat[0]:
+                return False
+            if st != fstat:
+                updated.append((name, st))
+
+        for name, st in updated:
+            state.files[name] = st
+            changes.modified.append((os.path.join(path, name), False))
+        return True
+
+    def _diff_listing(
+        self,
+        path: str,
+        old: _DirState,
+        files: Dict[str, FileStat],
+        dirs: Dict[str, int],
+        changes: _Changes,
+    ) -> None:
+        for name, fstat in old.files.items():
+            new = files.get(name)
+            full = os.path.join(path, name)
+            if new is None or new[0] != fstat[0]:
+                changes.deleted.append((full, False, fstat[0]))
+            elif new != fstat:
+                changes.modified.append((full, False))
+        for name, fstat in files.items():
+            prev = old.files.get(name)
+            if prev is None or prev[0] != fstat[0]:
+                changes.created.append((os.path.join(path, name), False, fstat[0]))
+
+        for name, ino in old.dirs.items():
+            if dirs.get(name) != ino:
+                sub = os.path.join(path, name)
+                changes.deleted.append((sub, True, ino))
+                self._forget_dir(sub, changes)
+        for name, ino in dirs.items():
+            if old.dirs.get(name) != ino:
+                sub = os.path.join(path, name)
+                changes.created.append((sub, True, ino))
+                if self.recursive:
+                    self._scan_new_dir(sub, changes)
+
+    def _to_events(self, changes: _Changes) -> List[FileSystemEvent]:
+        deleted_by_inode = {
+            (ino, is_dir): src for src, is_dir, ino in changes.deleted if ino
+        }
+        moved: Dict[str, str] = {}
+        created: List[Tuple[str, bool]] = []
+        for dest, is_dir, ino in changes.created:
+            src = deleted_by_inode.pop((ino, is_dir), None) if ino else None
+            if src is not None:
+                moved[src] = dest
+            else:
+                created.append((dest, is_dir))
+
+        events: List[FileSystemEvent] = []
+        for src, is_dir, _ in changes.deleted:
+            if src not in moved:
+                events.append(DirDeletedEvent(src) if is_dir else FileDeletedEvent(src))
+        for src, is_dir, _ in changes.deleted:
+            dest = moved.get(src)
+            if dest is not None:
+                events.append(DirMovedEvent(src, dest) if is_dir else FileMovedEvent(src, dest))
+        for src, is_dir in created:
+            events.append(DirCreatedEvent(src) if is_dir else FileCreatedEvent(src))
+        for src, is_dir in changes.modified:
+            events.append(DirModifiedEvent(src) if is_dir else FileModifiedEvent(src))
+        return events
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "root": self.root,
+            "recursive": self.recursive,
+            "dirs": {
+                path: [list(state.stat), {n: list(f) for n, f in state.files.items()}, state.dirs]
+                for path, state in self._dirs.items()
+            },
+        }
+
+    def load_dict(self, data: Dict[str, Any]) -> bool:
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return False
+        if data.get("recursive") != self.recursive:
+            return False
+        self._dirs = {
+            path: _DirState(tuple(st), {n: tuple(f) for n, f in files.items()}, dict(dirs))
+            for path, (st, files, dirs) in data["dirs"].items()
+        }
+        self._due.clear()
+        for path, state in self._dirs.items():
+            self._set_due(path, state, 0.0)
+        return True
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> bool:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return self.load_dict(json.load(f))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, TypeError, KeyError):
+            logger.warning("Ignoring unreadable polling index: %s", path)
+            return False
+
+
+def index_file_for(index_dir: str, watch_path: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(watch_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(index_dir, f"polling-index-{digest}.json")
+
+
+class IndexedPollingEmitter(EventEmitter):
+    def __init__(
+        self,
+        event_queue,
+        watch,
+        *,
+        timeout: float = DEFAULT_EMITTER_TIMEOUT,
+        event_filter: Optional[Iterable[type]] = None,
+        index_dir: Optional[str] = None,
+        save_interval: float = 300.0,
+        path_filters: Optional[Dict[str, PathFilter]] = None,
+        schedule: Optional[PollSchedule] = None,
+    ) -> None:
+        super().__init__(event_queue, watch, timeout=timeout, event_filter=event_filter)
+        path_filter = (path_filters or {}).get(watch.path)
+        self._index = DirectoryIndex(
+            watch.path, recursive=watch.is_recursive, path_filter=path_filter, schedule=schedule
+        )
+        self._index_file = index_file_for(index_dir, watch.path) if index_dir else None
+        self._save_interval = save_interval
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _prepare_index(self) -> None:
+        if self._index_file and self._index.load(self._index_file):
+            logger.info("Loaded polling index for %s (%d dirs)", self.watch.path, len(self._index))
+            for event in self._index.poll():
+                self.queue_event(event)
+            return
+        self._index.build()
+        logger.info("Built polling index for %s (%d dirs)", self.watch.path, len(self._index))
+
+    def _save_index(self) -> None:
+        if not self._index_file or not self._index.is_built:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._index_file) or ".", exist_ok=True)
+            self._index.save(self._index_file)
+            self._last_save = time.monotonic()
+        except OSError:
+            logger.exception("Failed to save polling index: %s", self._index_file)
+
+    def queue_events(self, timeout: float) -> None:
+        with self._lock:
+            if not self._index.is_built:
+                self._prepare_index()
+                return
+
+        if self.stopped_event.wait(timeout):
+            return
+
+        with self._lock:
+            if not self.should_keep_running():
+                return
+            if not os.path.isdir(self.watch.path):
+                self.queue_event(DirDeletedEvent(self.watch.path))
+                self.stop()
+                return
+
+            for event in self._index.poll():
+                self.queue_event(event)
+
+            if self._index_file and time.monotonic() - self._last_save >= self._save_interval:
+                self._save_index()
+
+    def on_thread_stop(self) -> None:
+        with self._lock:
+            self._save_index()
+
+
+class IndexedPollingObserver(BaseObserver):
+    def __init__(
+        self,
+        *,
+        timeout: float = 1,
+        index_dir: Optional[str] = None,
+        save_interval: float = 300.0,
+        path_filters: Optional[Dict[str, PathFilter]] = None,
+        schedule: Optional[PollSchedule] = None,
+    ) -> None:
+        emitter_cls = partial(
+            IndexedPollingEmitter,
+            index_dir=index_dir,
+            save_interval=save_interval,
+            path_filters=path_filters,
+            schedule=schedule,
+        )
+        # With a schedule the emitter wakes every min_interval and polls only the due directories.
+        if schedule is not None:
+            timeout = schedule.min_interval
+        super().__init__(emitter_cls, timeout=timeout)  # type: ignore[arg-type]
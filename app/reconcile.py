@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import os
+import stat
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import aiosqlite
+
+from app.events import ChangeFileEvent
+from app.filters import PathFilter
+from app.loggers.retention import open_maintenance_connection
+
+logger = logging.getLogger("hawkeye-reconcile")
+
+# (is_directory, inode, size, mtime_ns)
+Entry = Tuple[bool, int, int, int]
+Snapshot = Dict[str, Entry]
+
+PROGRESS_LOG_INTERVAL = 5.0
+EMIT_CHUNK = 1000
+# Rows per snapshot transaction, so a first scan of a large tree never holds the
+# write lock anywhere near the writers' busy_timeout.
+SAVE_CHUNK = 5000
+
+SELECT_SNAPSHOT_SQL = "SELECT path, is_directory, inode, size, mtime_ns FROM tree_snapshot WHERE root = ?"
+UPSERT_SNAPSHOT_SQL = """
+INSERT OR REPLACE INTO tree_snapshot(root, path, is_directory, inode, size, mtime_ns)
+VALUES(?, ?, ?, ?, ?, ?)
+"""
+DELETE_SNAPSHOT_SQL = "DELETE FROM tree_snapshot WHERE root = ? AND path = ?"
+DELETE_SUBTREE_SQL = "DELETE FROM tree_snapshot WHERE root = ? AND (path = ? OR (path >= ? AND path < ?))"
+
+
+def _entry(st: os.stat_result) -> Entry:
+    return stat.S_ISDIR(st.st_mode), st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _subtree_bounds(path: str) -> Tuple[str, str]:
+    # Every path under ``path`` sorts between "<path>/" and "<path>0" ('0' follows '/').
+    return path + os.sep, path + chr(ord(os.sep) + 1)
+
+
+def scan_dir(path: str, path_filter: Optional[PathFilter]) -> Tuple[Snapshot, List[str]]:
+    """Entries of one directory and its subdirectories; runs on a pool thread."""
+    entries: Snapshot = {}
+    subdirs: List[str] = []
+    try:
+        with os.scandir(path) as it:
+            for item in it:
+                try:
+                    entry = _entry(item.stat(follow_symlinks=False))
+                except OSError:
+                    continue
+                if path_filter is not None and not path_filter.allows(item.path, entry[0]):
+                    continue
+                entries[item.path] = entry
+                if entry[0]:
+                    subdirs.append(item.path)
+    except OSError as exc:
+        logger.debug("Cannot list %s: %s", path, exc)
+    return entries, subdirs
+
+
+def walk_tree(root: str, path_filter: Optional[PathFilter], recursive: bool = True) -> Snapshot:
+    snapshot: Snapshot = {}
+    todo = [root]
+    while todo:
+        entries, subdirs = scan_dir(todo.pop(), path_filter)
+        snapshot.update(entries)
+        if recursive:
+            todo.extend(subdirs)
+    return snapshot
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> List[Tuple[str, str, bool]]:
+    """(event, path, is_directory) that turn ``old`` into ``new``; parents are created first."""
+    changes: List[Tuple[str, str, bool]] = []
+    for path in sorted(old.keys() - new.keys(), reverse=True):
+        changes.append(("deleted", path, old[path][0]))
+    for path in sorted(new.keys() - old.keys()):
+        changes.append(("created", path, new[path][0]))
+    for path in sorted(old.keys() & new.keys()):
+        before, after = old[path], new[path]
+        if before[0] != after[0]:
+            changes.append(("deleted", path, before[0]))
+            changes.append(("created", path, after[0]))
+        elif not after[0] and before[1:] != after[1:]:
+            changes.append(("modified", path, False))
+    return changes
+
+
+class ScanProgress:
+    __slots__ = ("root", "state", "dirs_scanned", "entries", "changes", "started", "finished")
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.state = "pending"
+        self.dirs_scanned = 0
+        self.entries = 0
+        self.changes = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished if self.finished is not None else time.monotonic()
+        return {
+            "state": self.state,
+            "dirs_scanned": self.dirs_scanned,
+            "entries": self.entries,
+            "changes": self.changes,
+            "elapsed_s": round(end - self.started, 3) if self.started is not None else None,
+        }
+
+
+async def scan_tree(
+    root: str,
+    *,
+    executor: ThreadPoolExecutor,
+    concurrency: int,
+    path_filter: Optional[PathFilter] = None,
+    recursive: bool = True,
+    progress: Optional[ScanProgress] = None,
+) -> Snapshot:
+    """Walks ``root`` with one ``os.scandir`` per directory, ``concurrency`` directories at a time."""
+    loop = asyncio.get_running_loop()
+    progress = progress or ScanProgress(root)
+    snapshot: Snapshot = {}
+    todo: Deque[str] = deque([root])
+    running: Set[asyncio.Future] = set()
+    while todo or running:
+        while todo and len(running) < concurrency:
+            running.add(loop.run_in_executor(executor, scan_dir, todo.popleft(), path_filter))
+        done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            entries, subdirs = future.result()
+            snapshot.update(entries)
+            progress.dirs_scanned += 1
+            progress.entries += len(entries)
+            if recursive:
+                todo.extend(subdirs)
+    return snapshot
+
+
+class Reconciler:
+    """Finds changes made while the service was down by diffing each watch dir
+    against a snapshot persisted in ``tree_snapshot``.
+
+    :meth:`run` scans in the background while live events already flow, emits
+    synthetic created/deleted/modified events for the differences, then keeps
+    the snapshot current by re-stat'ing paths touched by live events
+    (:meth:`observe`) every ``flush_interval`` seconds and on :meth:`close`.
+    Live events and synthetic ones can overlap for paths changed during the scan.
+    """
+
+    def __init__(
+        self,
+        *,
+        db_path: str,
+        roots: Dict[str, Optional[PathFilter]],
+        emit: Callable[[ChangeFileEvent], None],
+        recursive: bool = True,
+        workers: int = 4,
+        flush_interval: float = 60.0,
+    ) -> None:
+        self._db_path = db_path
+        self._roots = roots
+        self._emit = emit
+        self._recursive = recursive
+        self._workers = max(1, workers)
+        self._flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="hawkeye-scan")
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._progress = {root: ScanProgress(root) for root in roots}
+        # path -> whether the whole subtree must be re-walked; filled from the observer thread
+        self._dirty: Dict[str, bool] = {}
+        self._dirty_lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._dirty_lock:
+            dirty = len(self._dirty)
+        return {"roots": {root: p.to_dict() for root, p in self._progress.items()}, "dirty": dirty}
+
+    def observe(self, evt: ChangeFileEvent) -> None:
+        self.observe_many((evt,))
+
+    def observe_many(self, events: Iterable[ChangeFileEvent]) -> None:
+        with self._dirty_lock:
+            for evt in events:
+                if evt.event == "moved":
+                    self._dirty[evt.src_path] = False
+                    if evt.dest_path:
+                        self._dirty[evt.dest_path] = True
+                else:
+                    walk = evt.is_directory and evt.event == "created"
+                    self._dirty[evt.src_path] = self._dirty.get(evt.src_path, False) or walk
+
+    async def run(self) -> None:
+        self._conn = await open_maintenance_connection(self._db_path)
+        for root in self._roots:
+            try:
+                await self._reconcile(root)
+            except Exception:
+                self._progress[root].state = "failed"
+                logger.exception("Reconciliation of %s failed", root)
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        try:
+            if self._conn is not None:
+                await self.flush()
+                await self._conn.close()
+                self._conn = None
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _reconcile(self, root: str) -> None:
+        progress = self._progress[root]
+        progress.started = time.monotonic()
+        progress.state = "loading"
+        old = await self._load(root)
+        # The root's row is saved last, so without it the previous save did not finish.
+        first_run = root not in old
+
+        progress.state = "scanning"
+        reporter = asyncio.create_task(self._report(progress), name="hawkeye-reconcile-progress")
+        try:
+            new = await scan_tree(
+                root,
+                executor=self._executor,
+                concurrency=self._workers * 2,
+                path_filter=self._roots[root],
+                recursive=self._recursive,
+                progress=progress,
+            )
+        finally:
+            reporter.cancel()
+        # The root's own row marks the tree as scanned, even when it is empty.
+        new[root] = _entry(os.lstat(root))
+
+        # The first run only records a baseline: everything would otherwise be "created".
+        changes = [] if first_run else diff_snapshots(old, new)
+        progress.changes = len(changes)
+        progress.state = "emitting"
+        for i, (event, path, is_directory) in enumerate(changes, 1):
+            self._emit(ChangeFileEvent(event=event, src_path=path, dest_path=None, is_directory=is_directory))
+            if i % EMIT_CHUNK == 0:
+                await asyncio.sleep(0)
+
+        progress.state = "saving"
+        await self._save(root, old, new)
+        progress.state = "done"
+        progress.finished = time.monotonic()
+        logger.info(
+            "Reconciled %s: %d entries in %d dirs, %d change(s)%s in %.1fs",
+            root,
+            progress.entries,
+            progress.dirs_scanned,
+            len(changes),
+            " (baseline)" if first_run else "",
+            progress.finished - progress.started,
+        )
+
+    async def _report(self, progress: ScanProgress) -> None:
+        while True:
+            await asyncio.sleep(PROGRESS_LOG_INTERVAL)
+            logger.info(
+                "Scanning %s: %d dirs, %d entries so far", progress.root, progress.dirs_scanned, progress.entries
+            )
+
+    async def _load(self, root: str) -> Snapshot:
+        async with self._conn.execute(SELECT_SNAPSHOT_SQL, (root,)) as cur:
+            rows = await cur.fetchall()
+        return {path: (bool(is_dir), inode, size, mtime_ns) for path, is_dir, inode, size, mtime_ns in rows}
+
+    async def _save(self, root: str, old: Snapshot, new: Snapshot) -> None:
+        """Writes the difference between ``old`` and ``new`` in ``SAVE_CHUNK``-row transactions.
+
+        The root's row goes last: a save cut short leaves the snapshot without it,
+        and the next run redoes it as a baseline instead of reporting stale rows.
+        """
+        deletes = [(root, path) for path in old.keys() - new.keys()]
+        upserts = [(root, path, int(e[0]), *e[1:]) for path, e in new.items() if path != root and old.get(path) != e]
+        marker = new[root]
+        upserts.append((root, root, int(marker[0]), *marker[1:]))
+        for sql, rows in ((DELETE_SNAPSHOT_SQL, deletes), (UPSERT_SNAPSHOT_SQL, upserts)):
+            for i in range(0, len(rows), SAVE_CHUNK):
+                try:
+                    await self._conn.executemany(sql, rows[i:i + SAVE_CHUNK])
+                    await self._conn.commit()
+                except Exception:
+                    await self._conn.rollback()
+                    raise
+
+    async def flush(self) -> None:
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty or self._conn is None:
+            return
+        loop = asyncio.get_running_loop()
+        deletes, upserts = await loop.run_in_executor(self._executor, self._refresh, dirty)
+        try:
+            await self._conn.executemany(DELETE_SUBTREE_SQL, deletes)
+            await self._conn.executemany(UPSERT_SNAPSHOT_SQL, upserts)
+            await self._conn.commit()
+        except Exception:
+            await self._conn.rollback()
+            raise
+
+    def _root_of(self, path: str) -> Optional[str]:
+        best = None
+        for root in self._roots:
+            inside = path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+            if inside and (best is None or len(root) > len(best)):
+                best = root
+        return best
+
+    def _refresh(self, dirty: Dict[str, bool]) -> Tuple[List[Tuple[str, ...]], List[Tuple[Any, ...]]]:
+        deletes: List[Tuple[str, ...]] = []
+        upserts: List[Tuple[Any, ...]] = []
+        for path, walk in dirty.items():
+            root = self._root_of(path)
+            if root is None or path == root:
+                continue
+            try:
+                entry = _entry(os.lstat(path))
+            except OSError:
+                deletes.append((root, path, *_subtree_bounds(path)))
+                continue
+            path_filter = self._roots[root]
+            if path_filter is not None and not path_filter.allows(path, entry[0]):
+                continue
+            upserts.append((root, path, int(entry[0]), *entry[1:]))
+            if entry[0] and walk and self._recursive:
+                deletes.append((root, path, *_subtree_bounds(path)))
+                upserts.extend(
+                    (root, sub, int(e[0]), *e[1:]) for sub, e in walk_tree(path, path_filter).items()
+                )
+        return deletes, upserts
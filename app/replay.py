@@ -0,0 +1,96 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.history import MAX_LIMIT, Page
+
+SEQ_KEY = "seq"
+
+Fetch = Callable[[int, int], Awaitable[Page]]
+
+
+class ReplayBuffer:
+    """Bounded ring of the most recent payloads, ordered by ``seq``.
+
+    Must be used from the event loop thread.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._items: Deque[Dict[str, Any]] = deque(maxlen=max(1, capacity))
+        self.capacity = max(1, capacity)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def first_seq(self) -> Optional[int]:
+        return self._items[0][SEQ_KEY] if self._items else None
+
+    @property
+    def last_seq(self) -> Optional[int]:
+        return self._items[-1][SEQ_KEY] if self._items else None
+
+    def append(self, payload: Dict[str, Any]) -> None:
+        seq = payload.get(SEQ_KEY)
+        if seq is None:
+            return
+        if self._items and seq <= self._items[-1][SEQ_KEY]:
+            return
+        self._items.append(payload)
+
+    def since(self, last_seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Payloads after ``last_seq``, or None when the gap starts before the buffer."""
+        if not self._items:
+            return None
+        if last_seq >= self._items[-1][SEQ_KEY]:
+            return []
+        if last_seq < self._items[0][SEQ_KEY] - 1:
+            return None
+
+        gap: List[Dict[str, Any]] = []
+        for payload in reversed(self._items):
+            if payload[SEQ_KEY] <= last_seq:
+                break
+            gap.append(payload)
+        gap.reverse()
+        return gap
+
+
+async def read_gap(
+    buffer: ReplayBuffer,
+    fetch: Fetch,
+    last_seq: int,
+    *,
+    max_items: int,
+    accept: Callable[[Dict[str, Any]], bool] = lambda p: True,
+) -> Tuple[List[Dict[str, Any]], str, bool]:
+    """Returns (payloads, source, truncated) for everything after ``last_seq``.
+
+    Served from ``buffer`` when it covers the gap, otherwise paged from SQLite
+    by primary key via ``fetch(cursor, limit)``; the buffered tail is reused
+    once the pages reach it.
+    """
+    buffered = buffer.since(last_seq)
+    if buffered is not None:
+        items = [p for p in buffered if accept(p)]
+        return items[:max_items], "memory", len(items) > max_items
+
+    items: List[Dict[str, Any]] = []
+    cursor = last_seq
+    stop_at = buffer.first_seq
+    reached_buffer = False
+    while not reached_buffer and len(items) <= max_items:
+        page = await fetch(cursor, MAX_LIMIT)
+        for row in page.items:
+            row[SEQ_KEY] = row.pop("id")
+            if stop_at is not None and row[SEQ_KEY] >= stop_at:
+                reached_buffer = True
+                break
+            if accept(row):
+                items.append(row)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+
+    if stop_at is not None and len(items) <= max_items:
+        items.extend(p for p in buffer.since(stop_at - 1) or () if accept(p))
+    return items[:max_items], "sqlite", len(items) > max_items
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from app.batching import drain_batch
+from app.loggers.log_sampling import ECHO_ATTR
+
+logger = logging.getLogger("hawkeye-socket-batcher")
+
+
+class SocketBatcher:
+    def __init__(
+        self,
+        *,
+        emit_batch: Callable[[List[Any]], Awaitable[None]],
+        max_size: int,
+        max_wait: float,
+        maxsize: int = 0,
+    ) -> None:
+        self._emit_batch = emit_batch
+        self._max_size = max_size
+        self._max_wait = max_wait
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=maxsize)
+        self._last_warning = 0.0
+        self.dropped = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "dropped": self.dropped}
+
+    def add(self, item: Any) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self._warn_drop()
+
+    def _warn_drop(self) -> None:
+        # Throttled and tagged as an echo: every log line may itself become a
+        # frame for the log batcher, so one warning per drop would feed itself.
+        now = time.monotonic()
+        if now - self._last_warning >= 1.0:
+            self._last_warning = now
+            logger.warning(
+                "Socket batch queue is full, dropping frame item (dropped=%d)",
+                self.dropped,
+                extra={ECHO_ATTR: True},
+            )
+
+    async def flush(self, timeout: float) -> bool:
+        """Wait until ``run`` has emitted everything queued so far; False on timeout."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Socket batcher flush timed out with %d item(s) queued", self._queue.qsize())
+            return False
+        return True
+
+    async def run(self) -> None:
+        while True:
+            batch = await drain_batch(self._queue, max_size=self._max_size, max_wait=self._max_wait)
+            try:
+                await self._emit_batch(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to emit batch of %d item(s)", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
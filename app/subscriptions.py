@@ -0,0 +1,253 @@
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple
+
+from app.pathglob import compile_glob, glob_literal_prefix, normalize_path, split_path
+
+logger = logging.getLogger("hawkeye-subscriptions")
+
+
+def _string_list(value: Any, name: str) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"Subscription field {name!r} must be a string or a list of strings")
+    return list(value)
+
+
+def _optional_set(value: Any, name: str, transform=str) -> Optional[FrozenSet[str]]:
+    if value is None:
+        return None
+    return frozenset(transform(v) for v in _string_list(value, name))
+
+
+@dataclass(frozen=True)
+class Subscription:
+    paths: Tuple[str, ...] = ()
+    globs: Tuple[str, ...] = ()
+    events: Optional[FrozenSet[str]] = None
+    levels: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "Subscription":
+        """Raises ValueError for fields that are not a string or a list of strings."""
+        if not isinstance(data, dict):
+            return cls()
+        return cls(
+            paths=tuple(sorted({normalize_path(p) for p in _string_list(data.get("paths"), "paths") if p})),
+            globs=tuple(sorted({normalize_path(g) for g in _string_list(data.get("globs"), "globs") if g})),
+            events=_optional_set(data.get("events"), "events"),
+            levels=_optional_set(data.get("levels"), "levels", str.upper),
+        )
+
+    def key(self) -> str:
+        raw = json.dumps(
+            [
+                self.paths,
+                self.globs,
+                sorted(self.events) if self.events is not None else None,
+                sorted(self.levels) if self.levels is not None else None,
+            ]
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def accepts_event(self, event: Optional[str]) -> bool:
+        return self.events is None or event in self.events
+
+    def accepts_level(self, level: Optional[str]) -> bool:
+        return self.levels is None or level in self.levels
+
+
+@dataclass
+class _TrieNode:
+    children: Dict[str, "_TrieNode"] = field(default_factory=dict)
+    rooms: Set[str] = field(default_factory=set)
+    globs: Dict[str, List[Pattern[str]]] = field(default_factory=dict)
+
+
+class SubscriptionIndex:
+    """Routes file events and log records to rooms through a path-component trie.
+
+    Literal path prefixes and the literal head of each glob are stored in the
+    trie, so routing a path only visits the nodes along that path.
+    """
+
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+        self._subs: Dict[str, Subscription] = {}
+        self._log_rooms_all: Set[str] = set()
+        self._log_rooms_by_level: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def add(self, room: str, sub: Subscription) -> None:
+        if room in self._subs:
+            return
+        self._subs[room] = sub
+
+        if not sub.paths and not sub.globs:
+            self._root.rooms.add(room)
+        for p in sub.paths:
+            self._node(split_path(p), create=True).rooms.add(room)
+        for g in sub.globs:
+            node = self._node(glob_literal_prefix(g), create=True)
+            node.globs.setdefault(room, []).append(compile_glob(g))
+
+        if sub.levels is None:
+            self._log_rooms_all.add(room)
+        else:
+            for level in sub.levels:
+                self._log_rooms_by_level.setdefault(level, set()).add(room)
+
+    def remove(self, room: str) -> None:
+        sub = self._subs.pop(room, None)
+        if sub is None:
+            return
+
+        self._root.rooms.discard(room)
+        for p in sub.paths:
+            parts = split_path(p)
+            node = self._node(parts)
+            if node is not None:
+                node.rooms.discard(room)
+                self._prune(parts)
+        for g in sub.globs:
+            parts = glob_literal_prefix(g)
+            node = self._node(parts)
+            if node is not None:
+                node.globs.pop(room, None)
+                self._prune(parts)
+
+        self._log_rooms_all.discard(room)
+        for level in sub.levels or ():
+            rooms = self._log_rooms_by_level.get(level)
+            if rooms is not None:
+                rooms.discard(room)
+                if not rooms:
+                    del self._log_rooms_by_level[level]
+
+    def match_file_event(self, payload: Dict[str, Any]) -> Set[str]:
+        matched: Set[str] = set()
+        event = payload.get("event")
+        for path in (payload.get("src_path"), payload.get("dest_path")):
+            if path:
+                self._match_path(path, event, matched)
+        return matched
+
+    def match_log(self, payload: Dict[str, Any]) -> Set[str]:
+        return self._log_rooms_all | self._log_rooms_by_level.get(payload.get("level"), set())
+
+    def _node(self, parts: Iterable[str], create: bool = False) -> Optional[_TrieNode]:
+        node = self._root
+        for part in parts:
+            child = node.children.get(part)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[part] = _TrieNode()
+            node = child
+        return node
+
+    def _prune(self, parts: List[str]) -> None:
+        """Drops the nodes along ``parts`` that no longer hold rooms, globs or children."""
+        trail: List[Tuple[_TrieNode, str]] = []
+        node = self._root
+        for part in parts:
+            child = node.children.get(part)
+            if child is None:
+                return
+            trail.append((node, part))
+            node = child
+        for parent, part in reversed(trail):
+            child = parent.children[part]
+            if child.children or child.rooms or child.globs:
+                return
+            del parent.children[part]
+
+    def _match_path(self, path: str, event: Optional[str], matched: Set[str]) -> None:
+        norm = normalize_path(path)
+        node: Optional[_TrieNode] = self._root
+        parts = split_path(norm)
+        i = 0
+        while node is not None:
+            for room in node.rooms:
+                if room not in matched and self._subs[room].accepts_event(event):
+                    matched.add(room)
+            for room, patterns in node.globs.items():
+                if room in matched or not self._subs[room].accepts_event(event):
+                    continue
+                if any(p.match(norm) for p in patterns):
+                    matched.add(room)
+            if i == len(parts):
+                break
+            node = node.children.get(parts[i])
+            i += 1
+
+
+class SubscriptionRouter:
+    """Tracks which room each socket client is in; clients sharing a filter share a room."""
+
+    def __init__(self) -> None:
+        self._index = SubscriptionIndex()
+        self._client_rooms: Dict[str, str] = {}
+        self._room_members: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def room_name(mode: str, sub: Subscription, wire: str = "json") -> str:
+        if wire == "json":
+            return f"sub:{mode}:{sub.key()}"
+        return f"sub:{mode}:{sub.key()}:{wire}"
+
+    @staticmethod
+    def room_mode(room: str) -> str:
+        return room.split(":", 2)[1]
+
+    @staticmethod
+    def room_wire(room: str) -> str:
+        parts = room.split(":", 3)
+        return parts[3] if len(parts) > 3 else "json"
+
+    def attach(self, sid: str, mode: str, sub: Subscription, wire: str = "json") -> Tuple[Optional[str], str]:
+        room = self.room_name(mode, sub, wire)
+        old = self._client_rooms.get(sid)
+        if old == room:
+            return old, room
+
+        if old is not None:
+            self._release(sid, old)
+        self._client_rooms[sid] = room
+        self._room_members.setdefault(room, set()).add(sid)
+        self._index.add(room, sub)
+        return old, room
+
+    def detach(self, sid: str) -> Optional[str]:
+        room = self._client_rooms.pop(sid, None)
+        if room is not None:
+            self._release(sid, room)
+        return room
+
+    def room_of(self, sid: str) -> Optional[str]:
+        return self._client_rooms.get(sid)
+
+    def members(self, room: str) -> Set[str]:
+        return self._room_members.get(room, set())
+
+    def rooms_for_file_event(self, payload: Dict[str, Any]) -> Set[str]:
+        return self._index.match_file_event(payload)
+
+    def rooms_for_log(self, payload: Dict[str, Any]) -> Set[str]:
+        return self._index.match_log(payload)
+
+    def _release(self, sid: str, room: str) -> None:
+        members = self._room_members.get(room)
+        if members is not None:
+            members.discard(sid)
+            if members:
+                return
+            del self._room_members[room]
+        self._index.remove(room)
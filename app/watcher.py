@@ -1,12 +1,18 @@
 import os
 import logging
-from typing import Iterable, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
 
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
 from watchdog.observers import Observer
+from watchdog.observers.api import BaseObserver
 from watchdog.observers.polling import PollingObserver
 
 from app.events import EventEmitter, ChangeFileEvent, EventType
+from app.filters import PathFilter, build_path_filters
+from app.polling import IndexedPollingObserver, PollSchedule
 
 logger = logging.getLogger("hawkeye-watcher")
 
@@ -18,11 +24,15 @@ def _parse_watch_dirs(env_value: str | None) -> List[str]:
 
 
 class _FileCoreHandler(FileSystemEventHandler):
-    def __init__(self, emitter: EventEmitter) -> None:
+    def __init__(self, emitter: EventEmitter, path_filter: Optional[PathFilter] = None) -> None:
         super().__init__()
         self._emitter = emitter
+        self._filter = path_filter
 
     def _emit(self, event_type: EventType, event: FileSystemEvent) -> None:
+        if self._filter is not None and not self._filter.allows(event.src_path, event.is_directory):
+            if not (event_type == "moved" and self._filter.allows(event.dest_path, event.is_directory)):
+                return
         self._emitter.emit(
             ChangeFileEvent(
                 event=event_type,
@@ -45,29 +55,250 @@ class _FileCoreHandler(FileSystemEventHandler):
         self._emit("moved", event)
 
 
+POLLING_ENGINES = ("indexed", "watchdog")
+
+
+def _make_observer(
+    use_polling: bool,
+    polling_engine: str,
+    polling_index_dir: Optional[str],
+    path_filters: Dict[str, PathFilter],
+    poll_schedule: Optional[PollSchedule] = None,
+):
+    if not use_polling:
+        return Observer()
+    if polling_engine == "watchdog":
+        return PollingObserver(timeout=1)
+    if polling_engine != "indexed":
+        logger.warning("Unknown polling engine %r, using 'indexed'", polling_engine)
+    return IndexedPollingObserver(
+        timeout=1, index_dir=polling_index_dir, path_filters=path_filters, schedule=poll_schedule
+    )
+
+
+WATCH_STATES = ("pending", "scheduling", "watching", "polling", "missing", "failed", "stopped")
+_DONE_STATES = frozenset(("watching", "polling", "missing", "failed", "stopped"))
+
+INOTIFY_MAX_WATCHES_PATH = "/proc/sys/fs/inotify/max_user_watches"
+
+
+def inotify_watch_limit() -> Optional[int]:
+    try:
+        with open(INOTIFY_MAX_WATCHES_PATH, "r", encoding="ascii") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def count_dirs(root: str, limit: int) -> int:
+    """Directories under ``root`` (itself included), counting stops once above ``limit``."""
+    count = 0
+    todo = [root]
+    while todo and count <= limit:
+        path = todo.pop()
+        count += 1
+        try:
+            with os.scandir(path) as it:
+                todo.extend(e.path for e in it if e.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+    return count
+
+
+class _WatchBudget:
+    """Inotify watches this process may still use; other processes share the same limit."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        with self._lock:
+            return max(0, self.limit - self._used)
+
+    def reserve(self, count: int) -> bool:
+        with self._lock:
+            if self._used + count > self.limit:
+                return False
+            self._used += count
+            return True
+
+    def release(self, count: int) -> None:
+        with self._lock:
+            self._used = max(0, self._used - count)
+
+
+class _WatchStatus:
+    __slots__ = ("state", "started", "finished", "error")
+
+    def __init__(self) -> None:
+        self.state = "pending"
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"state": self.state}
+        if self.started is not None:
+            end = self.finished if self.finished is not None else time.monotonic()
+            result["elapsed_s"] = round(end - self.started, 3)
+        if self.error:
+            result["error"] = self.error
+        return result
+
+
 class HawkeyWatcher:
-    def __init__(self, watch_dirs: Iterable[str],  use_polling: bool, recursive: bool = True) -> None:
+    """Watches each dir with its own observer, scheduled in the background.
+
+    A recursive inotify watch walks the whole tree while it is registered, so
+    :meth:`start` returns immediately and dirs are registered on a small pool
+    in parallel. A dir that would exceed ``fs.inotify.max_user_watches``, or
+    whose native watch fails, is polled instead.
+    """
+
+    def __init__(
+        self,
+        watch_dirs: Iterable[str],
+        use_polling: bool = False,
+        recursive: bool = True,
+        polling_engine: str = "indexed",
+        polling_index_dir: Optional[str] = None,
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        schedule_workers: int = 4,
+        poll_schedule: Optional[PollSchedule] = None,
+    ) -> None:
         self.emitter = EventEmitter()
-        self._observer = PollingObserver(timeout=1) if use_polling else Observer()
-        self._handler = _FileCoreHandler(self.emitter)
         self._watch_dirs = list(watch_dirs)
+        self._use_polling = use_polling
         self._recursive = recursive
+        self._polling_engine = polling_engine
+        self._polling_index_dir = polling_index_dir
+        self._schedule_workers = max(1, schedule_workers)
+        self._poll_schedule = poll_schedule
+        self._path_filters = build_path_filters(self._watch_dirs, include, exclude)
+        self._status = {d: _WatchStatus() for d in self._watch_dirs}
+        self._observers: Dict[str, BaseObserver] = {}
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._ready = threading.Event()
+        self._budget: Optional[_WatchBudget] = None
+
+    @property
+    def recursive(self) -> bool:
+        return self._recursive
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "dirs": {d: st.to_dict() for d, st in self._status.items()}}
+
+    def watch_roots(self) -> Dict[str, Optional[PathFilter]]:
+        return {d: self._path_filters.get(d) for d in self._watch_dirs if os.path.isdir(d)}
 
     def start(self) -> None:
         if not self._watch_dirs:
             logger.warning("No watch dirs configured. Set WATCH_DIRS env var.")
+            self._ready.set()
             return
 
+        if not self._use_polling and self._recursive:
+            limit = inotify_watch_limit()
+            if limit is not None:
+                self._budget = _WatchBudget(limit)
+
+        pool = ThreadPoolExecutor(
+            max_workers=min(self._schedule_workers, len(self._watch_dirs)),
+            thread_name_prefix="hawkeye-watch",
+        )
         for d in self._watch_dirs:
+            pool.submit(self._schedule, d)
+        # Queued dirs still run; the pool threads exit once all are scheduled.
+        pool.shutdown(wait=False)
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopping = True
+            observers = list(self._observers.values())
+            self._observers.clear()
+        for observer in observers:
+            if observer.is_alive():
+                observer.stop()
+
+    def _schedule(self, d: str) -> None:
+        status = self._status[d]
+        try:
+            if self._stopping:
+                status.state = "stopped"
+                return
+            status.state = "scheduling"
+            status.started = time.monotonic()
             if not os.path.exists(d):
                 logger.warning("Watch dir does not exist: %s", d)
-                continue
-            self._observer.schedule(self._handler, d, recursive=self._recursive)
-            logger.info("Start watching: %s (recursive=%s)", d, self._recursive)
+                status.state = "missing"
+                return
 
-        self._observer.start()
+            handler = _FileCoreHandler(self.emitter, self._path_filters.get(d))
+            reserved = None if self._use_polling else self._reserve_watches(d)
+            if reserved is not None:
+                try:
+                    self._run_observer(d, Observer(), handler)
+                    status.state = "watching"
+                    logger.info("Start watching: %s (recursive=%s)", d, self._recursive)
+                    return
+                except OSError as exc:
+                    if self._budget is not None:
+                        self._budget.release(reserved)
+                    logger.warning("Native watch failed for %s (%s), polling it instead", d, exc)
 
-    def stop(self) -> None:
-        if self._observer.is_alive():
-            self._observer.stop()
+            observer = _make_observer(
+                True, self._polling_engine, self._polling_index_dir, self._path_filters, self._poll_schedule
+            )
+            self._run_observer(d, observer, handler)
+            status.state = "polling"
+            logger.info("Start polling: %s (recursive=%s)", d, self._recursive)
+        except Exception as exc:
+            status.state = "failed"
+            status.error = str(exc)
+            logger.exception("Failed to watch %s", d)
+        finally:
+            status.finished = time.monotonic()
+            if all(st.state in _DONE_STATES for st in self._status.values()):
+                self._ready.set()
+
+    def _reserve_watches(self, d: str) -> Optional[int]:
+        """Watches reserved for ``d`` (0 without a budget), or None if it does not fit."""
+        if self._budget is None:
+            return 0
+        needed = count_dirs(d, self._budget.remaining)
+        if self._budget.reserve(needed):
+            return needed
+        logger.warning(
+            "Watching %s needs about %d inotify watches, but only %d of fs.inotify.max_user_watches=%d are left "
+            "(raise it with sysctl); polling it instead",
+            d,
+            needed,
+            self._budget.remaining,
+            self._budget.limit,
+        )
+        return None
 
+    def _run_observer(self, d: str, observer: BaseObserver, handler: FileSystemEventHandler) -> None:
+        observer.start()
+        try:
+            observer.schedule(handler, d, recursive=self._recursive)
+        except BaseException:
+            observer.stop()
+            raise
+        with self._lock:
+            if not self._stopping:
+                self._observers[d] = observer
+                return
+        observer.stop()
@@ -0,0 +1,185 @@
+import json
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+WIRE_FORMATS = ("json", "compact", "msgpack")
+AVAILABLE_WIRE_FORMATS = tuple(f for f in WIRE_FORMATS if f != "msgpack" or msgpack is not None)
+
+EVENT_CODES = {"created": 0, "deleted": 1, "modified": 2, "moved": 3}
+
+FILE_EVENT_KEYS = frozenset(("event", "src_path", "dest_path", "is_directory", "timestamp_utc", "seq"))
+LOG_KEYS = frozenset(("timestamp_utc", "level", "logger_name", "message", "repeat_count", "seq"))
+
+# First byte of every binary frame.
+FLAG_ZLIB = 0x01
+
+COMPRESS_MIN_BYTES = 1024
+MAX_PREFIXES = 4096
+
+
+def negotiate_wire(requested: Any) -> str:
+    return requested if requested in AVAILABLE_WIRE_FORMATS else "json"
+
+
+def _split_prefix(path: str) -> Tuple[str, str]:
+    idx = max(path.rfind("/"), path.rfind("\\")) + 1
+    return path[:idx], path[idx:]
+
+
+def _extra(payload: Dict[str, Any], known: frozenset) -> Optional[Dict[str, Any]]:
+    extra = {k: v for k, v in payload.items() if k not in known and not k.startswith("_") and v is not None}
+    return extra or None
+
+
+def _trim(row: List[Any]) -> List[Any]:
+    while row and row[-1] is None:
+        row.pop()
+    return row
+
+
+class PathDictionary:
+    """Per-connection table of directory prefixes already sent to the client."""
+
+    def __init__(self, max_entries: int = MAX_PREFIXES) -> None:
+        self._ids: Dict[str, int] = {}
+        self.max_entries = max_entries
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def ref(self, prefix: str, defs: List[List[Any]]) -> int:
+        pid = self._ids.get(prefix)
+        if pid is None:
+            pid = self._ids[prefix] = len(self._ids)
+            defs.append([pid, prefix])
+        return pid
+
+    def reset(self) -> None:
+        self._ids.clear()
+
+
+class WireEncoder:
+    """Encodes socket payloads for one client in the ``compact`` or ``msgpack`` wire format.
+
+    File frames are ``{"p": [[id, prefix], ...], "e": [row, ...]}`` where a row is
+    ``[event, prefix_id, name, is_directory, timestamp_utc, seq, dest_prefix_id, dest_name, extra]``
+    with trailing nulls dropped and ``event`` as an index into ``EVENT_CODES``.
+    ``"p"`` only carries prefixes the client has not seen yet; ``"r": 1`` means
+    the client must forget its table first. Log frames are ``{"l": [row, ...]}``
+    with ``[timestamp_utc, level, logger_name, message, repeat_count, seq, extra]``.
+
+    ``msgpack`` frames, and batch frames when compression is on, are bytes
+    whose first byte holds flags (``FLAG_ZLIB``); small frames are not compressed.
+    """
+
+    def __init__(self, wire: str, *, compress: bool = False, max_prefixes: int = MAX_PREFIXES) -> None:
+        if wire not in AVAILABLE_WIRE_FORMATS or wire == "json":
+            raise ValueError(f"Unsupported wire format: {wire!r}")
+        self.wire = wire
+        self.compress = compress
+        self._prefixes = PathDictionary(max_prefixes)
+
+    def encode_file_events(self, payloads: Iterable[Dict[str, Any]], *, batch: bool = False) -> Any:
+        payloads = list(payloads)
+        frame: Dict[str, Any] = {}
+        # Reset before the frame rather than mid-frame so every row's prefix is defined.
+        if len(self._prefixes) + 2 * len(payloads) > self._prefixes.max_entries:
+            self._prefixes.reset()
+            frame["r"] = 1
+        defs: List[List[Any]] = []
+        rows = [self._file_row(payload, defs) for payload in payloads]
+        if defs:
+            frame["p"] = defs
+        frame["e"] = rows
+        return self._finish(frame, batch)
+
+    def encode_logs(self, payloads: Iterable[Dict[str, Any]], *, batch: bool = False) -> Any:
+        rows = [
+            _trim([
+                p.get("timestamp_utc"),
+                p.get("level"),
+                p.get("logger_name"),
+                p.get("message"),
+                p.get("repeat_count", 1),
+                p.get("seq"),
+                _extra(p, LOG_KEYS),
+            ])
+            for p in payloads
+        ]
+        return self._finish({"l": rows}, batch)
+
+    def _file_row(self, payload: Dict[str, Any], defs: List[List[Any]]) -> List[Any]:
+        event = payload.get("event")
+        prefix, name = _split_prefix(payload.get("src_path") or "")
+        row: List[Any] = [
+            EVENT_CODES.get(event, event),
+            self._prefixes.ref(prefix, defs),
+            name,
+            bool(payload.get("is_directory")),
+            payload.get("timestamp_utc"),
+            payload.get("seq"),
+            None,
+            None,
+            _extra(payload, FILE_EVENT_KEYS),
+        ]
+        dest = payload.get("dest_path")
+        if dest:
+            dest_prefix, dest_name = _split_prefix(dest)
+            row[6] = self._prefixes.ref(dest_prefix, defs)
+            row[7] = dest_name
+        return _trim(row)
+
+    def _finish(self, frame: Dict[str, Any], batch: bool) -> Any:
+        compress = batch and self.compress
+        if self.wire == "compact" and not compress:
+            return frame
+        if self.wire == "msgpack":
+            body = msgpack.packb(frame, use_bin_type=True)
+        else:
+            body = json.dumps(frame, separators=(",", ":")).encode("utf-8")
+        if compress and len(body) >= COMPRESS_MIN_BYTES:
+            return bytes((FLAG_ZLIB,)) + zlib.compress(body)
+        return b"\x00" + body
+
+
+def decode_frame(data: Any, wire: str) -> Dict[str, Any]:
+    """Reference decoder for clients and tests; returns the frame dict."""
+    if not isinstance(data, (bytes, bytearray)):
+        return data
+    flags, body = data[0], bytes(data[1:])
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    if wire == "msgpack":
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+
+def expand_file_frame(frame: Dict[str, Any], prefixes: Dict[int, str]) -> List[Dict[str, Any]]:
+    """Turns a file frame back into payload dicts, updating the client's ``prefixes`` table."""
+    codes = {v: k for k, v in EVENT_CODES.items()}
+    if frame.get("r"):
+        prefixes.clear()
+    for pid, prefix in frame.get("p", ()):
+        prefixes[pid] = prefix
+
+    payloads = []
+    for row in frame["e"]:
+        row = list(row) + [None] * (9 - len(row))
+        code, pid, name, is_dir, ts, seq, dest_pid, dest_name, extra = row
+        payload = {
+            "event": codes.get(code, code),
+            "src_path": prefixes[pid] + name,
+            "dest_path": prefixes[dest_pid] + dest_name if dest_pid is not None else None,
+            "is_directory": is_dir,
+            "timestamp_utc": ts,
+        }
+        if seq is not None:
+            payload["seq"] = seq
+        payload.update(extra or {})
+        payloads.append(payload)
+    return payloads
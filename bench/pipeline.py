@@ -0,0 +1,392 @@
+"""End-to-end benchmark: filesystem -> watcher -> queue -> SQLite -> Socket.IO clients.
+
+    python -m bench.pipeline --workload all --backend all --clients 4 --output bench.json
+
+Every run uses a fresh process, temp directory and database, so ``peak_rss_mb``
+is that run's own peak. Latency is measured from the moment the workload
+touches a path until a client receives the first event for it; with
+``--clients 0`` it is measured at the server-side emit instead. Paths the
+backend legitimately never reports (a polling pass folds a chain of renames
+into one move) show up in ``paths_missing``; ``drop_rate`` only counts
+overflow drops.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import socketio
+import uvicorn
+
+from app.loggers.db_logger import init_db
+from app.metrics import EVENTS_EMITTED, EVENTS_IN
+from app.overflow import OVERFLOW_POLICIES, OverflowGuard
+from app.pipeline import events_consumer, make_enqueue
+from app.watcher import HawkeyWatcher
+
+WORKLOADS = ("create-storm", "modify-burst", "deep-rename")
+BACKENDS = ("inotify", "polling")
+
+EVENT_NAME = "file_change"
+
+Mark = Callable[[str], None]
+
+
+@dataclass(frozen=True)
+class BenchConfig:
+    workload: str
+    backend: str
+    ops: int = 2000
+    clients: int = 4
+    batch_size: int = 500
+    flush_interval: float = 0.05
+    queue_maxsize: int = 10000
+    overflow_policy: str = "drop-newest"
+    timeout: float = 30.0
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+class LatencyTracker:
+    """First-notice latency per path. ``mark`` may be called from the workload thread."""
+
+    def __init__(self) -> None:
+        self._pending: Dict[str, float] = {}
+        self.samples: List[float] = []
+        self.received = 0
+        self.expected = 0
+        self.last_seen = 0.0
+
+    def mark(self, path: str) -> None:
+        if path not in self._pending:
+            self.expected += 1
+            self._pending[path] = time.monotonic()
+
+    def seen(self, payload: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        self.received += 1
+        self.last_seen = now
+        for path in (payload.get("src_path"), payload.get("dest_path")):
+            started = self._pending.pop(path, None) if path else None
+            if started is not None:
+                self.samples.append(now - started)
+
+    def missing(self) -> int:
+        return len(self._pending)
+
+
+# Workloads: ``setup`` runs before the watcher starts, ``run`` while it is watching.
+
+def _setup_create_storm(root: str, ops: int) -> None:
+    for i in range(16):
+        os.makedirs(os.path.join(root, f"d{i:02d}"), exist_ok=True)
+
+
+def _run_create_storm(root: str, ops: int, mark: Mark) -> None:
+    for i in range(ops):
+        path = os.path.join(root, f"d{i % 16:02d}", f"f{i:06d}.txt")
+        mark(path)
+        with open(path, "w") as f:
+            f.write("x")
+
+
+def _modify_targets(root: str, ops: int) -> List[str]:
+    return [os.path.join(root, f"m{i:05d}.log") for i in range(max(1, ops // 10))]
+
+
+def _setup_modify_burst(root: str, ops: int) -> None:
+    for path in _modify_targets(root, ops):
+        with open(path, "w") as f:
+            f.write("seed\n")
+
+
+def _run_modify_burst(root: str, ops: int, mark: Mark) -> None:
+    targets = _modify_targets(root, ops)
+    for i in range(ops):
+        path = targets[i % len(targets)]
+        mark(path)
+        with open(path, "a") as f:
+            f.write(f"{i}\n")
+
+
+RENAME_DEPTH = 8
+RENAME_FANOUT = 4
+
+
+def _setup_deep_rename(root: str, ops: int) -> None:
+    current = os.path.join(root, "tree-0")
+    for depth in range(RENAME_DEPTH):
+        current = os.path.join(current, f"level{depth}")
+        os.makedirs(current, exist_ok=True)
+        for i in range(RENAME_FANOUT):
+            with open(os.path.join(current, f"f{i}.txt"), "w") as f:
+                f.write("x")
+
+
+def _run_deep_rename(root: str, ops: int, mark: Mark) -> None:
+    for i in range(max(1, ops // 100)):
+        src = os.path.join(root, f"tree-{i}")
+        dest = os.path.join(root, f"tree-{i + 1}")
+        mark(dest)
+        os.rename(src, dest)
+
+
+_WORKLOADS = {
+    "create-storm": (_setup_create_storm, _run_create_storm),
+    "modify-burst": (_setup_modify_burst, _run_modify_burst),
+    "deep-rename": (_setup_deep_rename, _run_deep_rename),
+}
+
+
+def peak_rss_mb() -> float:
+    # VmHWM belongs to the current address space, so it starts over in a spawned
+    # child; ru_maxrss on Linux carries the parent's peak across fork and exec.
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _listen_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+async def _start_server(sio: socketio.AsyncServer):
+    sock = _listen_socket()
+    config = uvicorn.Config(socketio.ASGIApp(sio), log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task, sock.getsockname()[1]
+
+
+async def _connect_clients(n: int, port: int, trackers: List[LatencyTracker]) -> List[socketio.AsyncClient]:
+    clients: List[socketio.AsyncClient] = []
+    for tracker in trackers[:n]:
+        client = socketio.AsyncClient()
+
+        async def on_event(payload: Dict[str, Any], tracker: LatencyTracker = tracker) -> None:
+            tracker.seen(payload)
+
+        client.on(EVENT_NAME, on_event)
+        await client.connect(f"http://127.0.0.1:{port}", transports=["websocket"])
+        clients.append(client)
+    return clients
+
+
+async def _cancel(task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def run_benchmark(cfg: BenchConfig) -> Dict[str, Any]:
+    setup, workload = _WORKLOADS[cfg.workload]
+    loop = asyncio.get_running_loop()
+    workdir = tempfile.mkdtemp(prefix="hawkeye-bench-")
+    root = os.path.realpath(os.path.join(workdir, "watched"))
+    os.makedirs(root)
+    setup(root, cfg.ops)
+
+    trackers = [LatencyTracker() for _ in range(max(1, cfg.clients))]
+
+    def mark(path: str) -> None:
+        for tracker in trackers:
+            tracker.mark(path)
+
+    sio = socketio.AsyncServer(async_mode="asgi")
+    server, server_task, port = await _start_server(sio)
+    clients = await _connect_clients(cfg.clients, port, trackers)
+
+    async def emit_socket(payload: Dict[str, Any]) -> None:
+        await sio.emit(EVENT_NAME, payload)
+        if not cfg.clients:
+            trackers[0].seen(payload)
+
+    db_conn = await init_db(os.path.join(workdir, "bench.db"))
+    queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=cfg.queue_maxsize)
+    guard = OverflowGuard(queue=queue, policy=cfg.overflow_policy, warn_on_drop=False)
+    watcher = HawkeyWatcher([root], use_polling=cfg.backend == "polling")
+    watcher.emitter.add(make_enqueue(loop=loop, queue=queue, overflow=guard))
+
+    events_in = EVENTS_IN.total()
+    events_emitted = EVENTS_EMITTED.total()
+
+    tasks = [
+        asyncio.create_task(guard.run()),
+        asyncio.create_task(
+            events_consumer(
+                queue=queue,
+                db_conn=db_conn,
+                emit_socket=emit_socket,
+                batch_size=cfg.batch_size,
+                flush_interval=cfg.flush_interval,
+            )
+        ),
+    ]
+    watcher.start()
+    await asyncio.to_thread(watcher.wait_ready, 60)
+    if cfg.backend == "polling":
+        # Let the first poll build its index so setup files are not reported.
+        await asyncio.sleep(1.5)
+
+    started = time.monotonic()
+    await loop.run_in_executor(None, workload, root, cfg.ops, mark)
+    workload_done = time.monotonic()
+
+    # Wait for every touched path to be reported and for the queue to drain;
+    # extra events for a path (e.g. modified after created) still count.
+    deadline = workload_done + cfg.timeout
+    while time.monotonic() < deadline:
+        if not any(t.missing() for t in trackers) and not guard.backlog() and queue.empty():
+            break
+        await asyncio.sleep(0.05)
+    try:
+        await asyncio.wait_for(queue.join(), timeout=max(0.1, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        pass
+    await asyncio.sleep(0.1)
+
+    watcher.stop()
+    for task in tasks:
+        await _cancel(task)
+    for client in clients:
+        await client.disconnect()
+    server.should_exit = True
+    await server_task
+    guard.close()
+    await db_conn.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    received_in = EVENTS_IN.total() - events_in
+    emitted = EVENTS_EMITTED.total() - events_emitted
+    last_seen = max(t.last_seen for t in trackers)
+    duration = max(last_seen, workload_done) - started
+    samples = [s for t in trackers for s in t.samples]
+    expected = trackers[0].expected
+    missing = sum(t.missing() for t in trackers)
+
+    return {
+        "config": asdict(cfg),
+        "duration_s": round(duration, 4),
+        "workload_s": round(workload_done - started, 4),
+        "paths_expected": expected,
+        "paths_missing": missing,
+        "events_in": int(received_in),
+        "events_emitted": int(emitted),
+        "events_dropped": guard.dropped,
+        "drop_rate": round(guard.dropped / received_in, 6) if received_in else 0.0,
+        "throughput_eps": round(emitted / duration, 2) if duration > 0 else None,
+        "latency_ms": {
+            "p50": _ms(percentile(samples, 0.50)),
+            "p99": _ms(percentile(samples, 0.99)),
+            "max": _ms(max(samples) if samples else None),
+            "samples": len(samples),
+        },
+        "queue_high_water": guard.high_water,
+        "peak_rss_mb": round(peak_rss_mb(), 2),
+    }
+
+
+def _run_in_child(cfg: BenchConfig) -> Dict[str, Any]:
+    return asyncio.run(run_benchmark(cfg))
+
+
+async def run_isolated(cfg: BenchConfig) -> Dict[str, Any]:
+    """Runs ``cfg`` in a fresh (spawned) process, so ``peak_rss_mb`` is this run's own peak."""
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return await loop.run_in_executor(pool, _run_in_child, cfg)
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 3) if value is not None else None
+
+
+def _expand(value: str, choices) -> List[str]:
+    return list(choices) if value == "all" else [value]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Hawkeye end-to-end pipeline benchmark")
+    parser.add_argument("--workload", choices=(*WORKLOADS, "all"), default="all")
+    parser.add_argument("--backend", choices=(*BACKENDS, "all"), default="inotify")
+    parser.add_argument("--ops", type=int, default=2000, help="filesystem operations per run")
+    parser.add_argument("--clients", type=int, default=4, help="simulated Socket.IO clients")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval-ms", type=int, default=50)
+    parser.add_argument("--queue-maxsize", type=int, default=10000)
+    parser.add_argument("--overflow-policy", choices=OVERFLOW_POLICIES[:3], default="drop-newest")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for stragglers")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    results = []
+    for backend in _expand(args.backend, BACKENDS):
+        for workload in _expand(args.workload, WORKLOADS):
+            cfg = BenchConfig(
+                workload=workload,
+                backend=backend,
+                ops=args.ops,
+                clients=args.clients,
+                batch_size=args.batch_size,
+                flush_interval=args.flush_interval_ms / 1000,
+                queue_maxsize=args.queue_maxsize,
+                overflow_policy=args.overflow_policy,
+                timeout=args.timeout,
+            )
+            results.append(await run_isolated(cfg))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
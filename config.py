@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List
 
 
 def parse_watch_dirs(value: str | None) -> List[str]:
@@ -9,6 +9,20 @@ def parse_watch_dirs(value: str | None) -> List[str]:
     return [p.strip() for p in value.split(";") if p.strip()]
 
 
+def parse_patterns(value: str | None) -> List[str]:
+    return parse_watch_dirs(value)
+
+
+def parse_mapping(value: str | None) -> Dict[str, float]:
+    result: Dict[str, float] = {}
+    for item in parse_watch_dirs(value):
+        name, sep, number = item.partition("=")
+        if not sep:
+            raise ValueError(f"Expected name=value, got {item!r}")
+        result[name.strip()] = float(number)
+    return result
+
+
 @dataclass(frozen=True)
 class Settings:
     watch_dirs: List[str]
@@ -18,6 +32,60 @@ class Settings:
     socket_file_change_event_name: str
     socket_log_event_name: str
     use_polling: bool
+    db_batch_size: int
+    db_flush_interval_ms: int
+    db_journal_mode: str
+    db_synchronous: str
+    db_partition_by: str
+    coalesce_window_ms: int
+    socket_file_change_batch_event_name: str
+    socket_log_batch_event_name: str
+    socket_batch_size: int
+    socket_batch_interval_ms: int
+    polling_engine: str
+    polling_index_dir: str
+    polling_min_interval_s: float
+    polling_max_interval_s: float
+    polling_stat_budget: int
+    watch_include: List[str]
+    watch_exclude: List[str]
+    queue_overflow_policy: str
+    log_queue_overflow_policy: str
+    queue_spill_dir: str
+    queue_spill_segment_mb: int
+    retention_max_age_hours: float
+    retention_max_db_mb: int
+    retention_interval_s: float
+    retention_chunk_size: int
+    retention_vacuum_pages: int
+    log_journal_rate_limits: Dict[str, float]
+    log_journal_sample_rates: Dict[str, float]
+    log_journal_dedup_window_ms: int
+    log_journal_skip_event_echo: bool
+    replay_buffer_size: int
+    replay_max_items: int
+    role: str
+    content_hash_enabled: bool
+    watch_schedule_workers: int
+    emitter_dispatch: str
+    emitter_queue_size: int
+    emitter_overflow_policy: str
+    lane_weights: Dict[str, float]
+    stats_enabled: bool
+    stats_top_k: int
+    stats_max_dirs: int
+    stats_emit_interval_s: float
+    socket_stats_event_name: str
+    lane_log_max_batch: int
+    reconcile_on_start: bool
+    reconcile_workers: int
+    reconcile_flush_interval_s: float
+    content_hash_max_kb: int
+    content_hash_workers: int
+    content_hash_max_pending: int
+    content_hash_cache_size: int
+    broker_socket: str
+    broker_max_buffer_kb: int
 
 
 def load_settings() -> Settings:
@@ -28,5 +96,61 @@ def load_settings() -> Settings:
         queue_maxsize=int(os.getenv("QUEUE_MAXSIZE", "10000")),
         socket_file_change_event_name=os.getenv("SOCKET_FILE_CHANGE_EVENT_NAME", "file_change_event"),
         socket_log_event_name=os.getenv("SOCKET_LOG_EVENT_NAME", "log_event"),
-        use_polling=os.getenv("WATCHDOG_POLLING", "false").lower() == "true"
+        use_polling=os.getenv("WATCHDOG_POLLING", "false").lower() == "true",
+        db_batch_size=int(os.getenv("DB_BATCH_SIZE", "500")),
+        db_flush_interval_ms=int(os.getenv("DB_FLUSH_INTERVAL_MS", "50")),
+        db_journal_mode=os.getenv("DB_JOURNAL_MODE", "WAL"),
+        db_synchronous=os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+        db_partition_by=os.getenv("DB_PARTITION_BY", "none").lower(),
+        coalesce_window_ms=int(os.getenv("COALESCE_WINDOW_MS", "0")),
+        socket_file_change_batch_event_name=os.getenv("SOCKET_FILE_CHANGE_BATCH_EVENT_NAME", "file_change_batch"),
+        socket_log_batch_event_name=os.getenv("SOCKET_LOG_BATCH_EVENT_NAME", "log_batch"),
+        socket_batch_size=int(os.getenv("SOCKET_BATCH_SIZE", "200")),
+        socket_batch_interval_ms=int(os.getenv("SOCKET_BATCH_INTERVAL_MS", "100")),
+        polling_engine=os.getenv("WATCHDOG_POLLING_ENGINE", "indexed").lower(),
+        polling_index_dir=os.getenv("POLLING_INDEX_DIR", ""),
+        polling_min_interval_s=float(os.getenv("POLLING_MIN_INTERVAL_S", "0.5")),
+        polling_max_interval_s=float(os.getenv("POLLING_MAX_INTERVAL_S", "0.5")),
+        polling_stat_budget=int(os.getenv("POLLING_STAT_BUDGET", "0")),
+        watch_include=parse_patterns(os.getenv("WATCH_INCLUDE")),
+        watch_exclude=parse_patterns(os.getenv("WATCH_EXCLUDE")),
+        queue_overflow_policy=os.getenv("QUEUE_OVERFLOW_POLICY", "drop-newest").lower(),
+        log_queue_overflow_policy=os.getenv("LOG_QUEUE_OVERFLOW_POLICY", "drop-newest").lower(),
+        queue_spill_dir=os.getenv("QUEUE_SPILL_DIR", "spill"),
+        queue_spill_segment_mb=int(os.getenv("QUEUE_SPILL_SEGMENT_MB", "16")),
+        retention_max_age_hours=float(os.getenv("RETENTION_MAX_AGE_HOURS", "0")),
+        retention_max_db_mb=int(os.getenv("RETENTION_MAX_DB_MB", "0")),
+        retention_interval_s=float(os.getenv("RETENTION_INTERVAL_S", "300")),
+        retention_chunk_size=int(os.getenv("RETENTION_CHUNK_SIZE", "1000")),
+        retention_vacuum_pages=int(os.getenv("RETENTION_VACUUM_PAGES", "500")),
+        log_journal_rate_limits=parse_mapping(os.getenv("LOG_JOURNAL_RATE_LIMITS")),
+        log_journal_sample_rates={
+            level.upper(): rate for level, rate in parse_mapping(os.getenv("LOG_JOURNAL_SAMPLE_RATES")).items()
+        },
+        log_journal_dedup_window_ms=int(os.getenv("LOG_JOURNAL_DEDUP_WINDOW_MS", "0")),
+        log_journal_skip_event_echo=os.getenv("LOG_JOURNAL_SKIP_EVENT_ECHO", "false").lower() == "true",
+        replay_buffer_size=int(os.getenv("REPLAY_BUFFER_SIZE", "10000")),
+        replay_max_items=int(os.getenv("REPLAY_MAX_ITEMS", "10000")),
+        role=os.getenv("HAWKEYE_ROLE", "standalone").lower(),
+        emitter_dispatch=os.getenv("EMITTER_DISPATCH", "sync").lower(),
+        emitter_queue_size=int(os.getenv("EMITTER_QUEUE_SIZE", "10000")),
+        emitter_overflow_policy=os.getenv("EMITTER_OVERFLOW_POLICY", "drop-oldest").lower(),
+        lane_weights=parse_mapping(os.getenv("LANE_WEIGHTS", "")),
+        lane_log_max_batch=int(os.getenv("LANE_LOG_MAX_BATCH", "100")),
+        stats_enabled=os.getenv("STATS_ENABLED", "true").lower() == "true",
+        stats_top_k=int(os.getenv("STATS_TOP_K", "20")),
+        stats_max_dirs=int(os.getenv("STATS_MAX_DIRS", "10000")),
+        stats_emit_interval_s=float(os.getenv("STATS_EMIT_INTERVAL_S", "0")),
+        socket_stats_event_name=os.getenv("SOCKET_STATS_EVENT_NAME", "stats"),
+        watch_schedule_workers=int(os.getenv("WATCH_SCHEDULE_WORKERS", "4")),
+        reconcile_on_start=os.getenv("RECONCILE_ON_START", "false").lower() == "true",
+        reconcile_workers=int(os.getenv("RECONCILE_WORKERS", "4")),
+        reconcile_flush_interval_s=float(os.getenv("RECONCILE_FLUSH_INTERVAL_S", "60")),
+        content_hash_enabled=os.getenv("CONTENT_HASH_ENABLED", "false").lower() == "true",
+        content_hash_max_kb=int(os.getenv("CONTENT_HASH_MAX_KB", "16384")),
+        content_hash_workers=int(os.getenv("CONTENT_HASH_WORKERS", "2")),
+        content_hash_max_pending=int(os.getenv("CONTENT_HASH_MAX_PENDING", "256")),
+        content_hash_cache_size=int(os.getenv("CONTENT_HASH_CACHE_SIZE", "65536")),
+        broker_socket=os.getenv("BROKER_SOCKET", "/tmp/hawkeye-broker.sock"),
+        broker_max_buffer_kb=int(os.getenv("BROKER_MAX_BUFFER_KB", "8192")),
     )
@@ -1,18 +1,39 @@
 import asyncio
 import logging
+import os
+import time
+from collections import defaultdict
 from contextlib import asynccontextmanager
+from datetime import timedelta
 from pathlib import Path
-from typing import Any, AsyncIterator, Dict, Optional, Awaitable, Callable
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Set, Tuple, Awaitable, Callable
 
 import socketio
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 
 from config import load_settings
+from app.polling import PollSchedule, StatBudget
 from app.watcher import HawkeyWatcher
-from app.pipeline import make_enqueue, events_consumer
-from app.loggers.db_logger import init_db
+from app.aggregates import LiveAggregates
+from app.enrichment import ContentEnricher
+from app.lanes import EVENTS_LANE, LOGS_LANE, LaneScheduler
+from app.reconcile import Reconciler
+from app.pipeline import EventCoalescer, make_enqueue, events_consumer
+from app.overflow import OverflowGuard, SpillLog
+from app.history import MAX_LIMIT, query_file_events, query_log_journal
+from app.metrics import SOCKET_EMIT, registry
+from app.replay import ReplayBuffer, read_gap
+from app.broker import BrokerClient, EventBroker
+from app.loggers.db_logger import PartitionCatalog, PartitionedLane, init_db, open_read_connection
+from app.loggers.db_writer import WriteLane
 from app.loggers.log_journal_handler import LogJournalQueueHandler
 from app.loggers.log_journal_pipeline import log_journal_consumer
+from app.loggers.log_sampling import LogSampler, SamplingPolicy
+from app.loggers.retention import RetentionPolicy, open_maintenance_connection, retention_worker
+from app.socket_batcher import SocketBatcher
+from app.subscriptions import Subscription, SubscriptionRouter
+from app.wire import AVAILABLE_WIRE_FORMATS, WireEncoder, negotiate_wire
 
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(name)s | %(message)s")
@@ -29,22 +50,334 @@ sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
 events_queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=settings.queue_maxsize)
 logs_queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=settings.queue_maxsize)
 
-watcher = HawkeyWatcher(watch_dirs=settings.watch_dirs, use_polling=settings.use_polling, recursive=settings.watch_recursive)
+# POLLING_MAX_INTERVAL_S <= POLLING_MIN_INTERVAL_S keeps the fixed 1s rescan of every directory.
+poll_schedule = (
+    PollSchedule(
+        min_interval=settings.polling_min_interval_s,
+        max_interval=settings.polling_max_interval_s,
+        budget=StatBudget(settings.polling_stat_budget) if settings.polling_stat_budget > 0 else None,
+    )
+    if settings.polling_max_interval_s > settings.polling_min_interval_s
+    else None
+)
+
+watcher = HawkeyWatcher(
+    watch_dirs=settings.watch_dirs,
+    use_polling=settings.use_polling,
+    recursive=settings.watch_recursive,
+    polling_engine=settings.polling_engine,
+    polling_index_dir=settings.polling_index_dir or None,
+    include=settings.watch_include,
+    exclude=settings.watch_exclude,
+    schedule_workers=settings.watch_schedule_workers,
+    poll_schedule=poll_schedule,
+)
+
+coalescer: Optional[EventCoalescer] = None
+enricher: Optional[ContentEnricher] = None
+reconciler: Optional[Reconciler] = None
+# One write connection and thread per table, so log floods do not delay file events.
+write_lanes: Dict[str, WriteLane] = {}
+# Time partitions of the journal tables; None unless DB_PARTITION_BY is day or hour.
+partitions: Optional[PartitionCatalog] = None
+events_overflow: Optional[OverflowGuard] = None
+read_conn = None
+read_conn_lock = asyncio.Lock()
+logs_overflow: Optional[OverflowGuard] = None
+log_sampler: Optional[LogSampler] = None
+
+STREAM_MODES = ("event", "batch")
+# How long shutdown waits for the socket batchers to emit what is still queued.
+BATCHER_FLUSH_TIMEOUT_S = 5.0
+# How long shutdown waits for the journal consumer to store the last log records.
+LOG_DRAIN_TIMEOUT_S = 5.0
+
+# standalone: everything in one process; writer: standalone plus publishing to
+# workers over the broker socket; worker: Socket.IO fan-out only.
+ROLES = ("standalone", "writer", "worker")
+broker: Optional[EventBroker] = None
+broker_client: Optional[BrokerClient] = None
+
+router = SubscriptionRouter()
+# sid -> encoder for clients that negotiated a non-JSON wire format
+wire_encoders: Dict[str, WireEncoder] = {}
+
+events_replay = ReplayBuffer(settings.replay_buffer_size)
+logs_replay = ReplayBuffer(settings.replay_buffer_size)
+
+# Rolling counts of stored file events for /stats; None when STATS_ENABLED=false.
+aggregates = (
+    LiveAggregates(top_k=settings.stats_top_k, max_dirs=settings.stats_max_dirs)
+    if settings.stats_enabled
+    else None
+)
+
+file_batcher: Optional[SocketBatcher] = None
+log_batcher: Optional[SocketBatcher] = None
+# Weighted turns between file-event and log work; None when LANE_WEIGHTS is empty.
+lanes: Optional[LaneScheduler] = None
+
+
+def _queue_guards() -> Dict[str, OverflowGuard]:
+    guards = {"events": events_overflow, "logs": logs_overflow}
+    return {name: guard for name, guard in guards.items() if guard is not None}
+
+
+def _collect_queue_depth():
+    return [((name,), guard.stats()["depth"]) for name, guard in _queue_guards().items()]
+
+
+def _collect_queue_high_water():
+    return [((name,), guard.high_water) for name, guard in _queue_guards().items()]
+
+
+def _collect_queue_dropped():
+    return [((name, label), n) for name, guard in _queue_guards().items() for label, n in guard.dropped_by.items()]
+
+
+def _collect_coalesced():
+    samples = []
+    if coalescer is not None:
+        samples.extend((("window", event), n) for event, n in coalescer.merged_by.items())
+    if events_overflow is not None:
+        samples.extend((("overflow", event), n) for event, n in events_overflow.coalesced_by.items())
+    return samples
+
+
+registry.callback("hawkeye_queue_depth", "Current queue depth.", ("queue",), _collect_queue_depth)
+registry.callback("hawkeye_queue_high_water", "Highest queue depth seen.", ("queue",), _collect_queue_high_water)
+registry.callback(
+    "hawkeye_queue_dropped_total",
+    "Payloads dropped by the overflow policy, by event type or log level.",
+    ("queue", "label"),
+    _collect_queue_dropped,
+    kind="counter",
+)
+registry.callback(
+    "hawkeye_events_coalesced_total",
+    "File events folded into another event.",
+    ("stage", "event"),
+    _collect_coalesced,
+    kind="counter",
+)
+
+
+def _client_mode(auth: Any) -> str:
+    mode = auth.get("mode") if isinstance(auth, dict) else None
+    return mode if mode in STREAM_MODES else "event"
+
+
+def _client_subscription(auth: Any) -> Subscription:
+    return Subscription.from_dict(auth.get("subscribe") if isinstance(auth, dict) else None)
+
+
+def _client_last_seq(auth: Any) -> Dict[str, int]:
+    value = auth.get("last_seq") if isinstance(auth, dict) else None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return {"events": value}
+    if isinstance(value, dict):
+        return {
+            k: v for k, v in value.items()
+            if k in ("events", "logs") and isinstance(v, int) and not isinstance(v, bool)
+        }
+    return {}
+
+
+def _client_wire(auth: Any) -> str:
+    return negotiate_wire(auth.get("wire") if isinstance(auth, dict) else None)
+
+
+async def _attach_client(sid: str, mode: str, sub: Subscription, wire: str = "json") -> str:
+    old_room, room = router.attach(sid, mode, sub, wire)
+    if old_room is not None and old_room != room:
+        await sio.leave_room(sid, old_room)
+    await sio.enter_room(sid, room)
+    return room
 
 
 @sio.event
 async def connect(sid, environ, auth):
-    logger.info("Socket connected: %s", sid)
-    await sio.emit("hello", {"status": "connected"}, to=sid)
+    mode = _client_mode(auth)
+    wire = _client_wire(auth)
+    if wire != "json":
+        wire_encoders[sid] = WireEncoder(wire, compress=bool(auth.get("compress")))
+    try:
+        sub = _client_subscription(auth)
+    except ValueError as exc:
+        wire_encoders.pop(sid, None)
+        raise socketio.exceptions.ConnectionRefusedError(str(exc))
+    room = await _attach_client(sid, mode, sub, wire)
+
+    logger.info("Socket connected: %s (mode=%s, wire=%s)", sid, mode, wire)
+    await sio.emit(
+        "hello",
+        {"status": "connected", "mode": mode, "wire": wire, "wire_formats": list(AVAILABLE_WIRE_FORMATS)},
+        to=sid,
+    )
+
+    last_seq = _client_last_seq(auth)
+    if last_seq:
+        await _replay(sid, room, last_seq)
+
+
+@sio.event
+async def subscribe(sid, data):
+    room = router.room_of(sid)
+    mode = SubscriptionRouter.room_mode(room) if room else "event"
+    wire = SubscriptionRouter.room_wire(room) if room else "json"
+    try:
+        sub = Subscription.from_dict(data)
+    except ValueError as exc:
+        return {"status": "error", "error": str(exc)}
+    await _attach_client(sid, mode, sub, wire)
+    return {"status": "subscribed"}
 
 
 @sio.event
 async def disconnect(sid):
+    router.detach(sid)
+    wire_encoders.pop(sid, None)
     logger.info("Socket disconnected: %s", sid)
 
 
-async def _emit_socket(event_name: str, payload: Dict[str, Any]) -> None:
-    await sio.emit(event_name, payload)
+async def _emit_encoded(event_name: str, room: str, payloads: List[Dict[str, Any]], batch: bool) -> None:
+    file_frame = event_name in (settings.socket_file_change_event_name, settings.socket_file_change_batch_event_name)
+    for sid in list(router.members(room)):
+        encoder = wire_encoders.get(sid)
+        if encoder is None:
+            continue
+        if file_frame:
+            frame = encoder.encode_file_events(payloads, batch=batch)
+        else:
+            frame = encoder.encode_logs(payloads, batch=batch)
+        await sio.emit(event_name, frame, to=sid)
+
+
+async def _send_to_client(sid: str, room: str, event_name: str, batch_event_name: str, items: List[Dict[str, Any]]) -> None:
+    encoder = wire_encoders.get(sid)
+    is_file = event_name == settings.socket_file_change_event_name
+
+    def encode(payloads: List[Dict[str, Any]], batch: bool) -> Any:
+        if encoder is None:
+            return payloads if batch else payloads[0]
+        if is_file:
+            return encoder.encode_file_events(payloads, batch=batch)
+        return encoder.encode_logs(payloads, batch=batch)
+
+    if SubscriptionRouter.room_mode(room) == "batch":
+        for i in range(0, len(items), settings.socket_batch_size):
+            await sio.emit(batch_event_name, encode(items[i:i + settings.socket_batch_size], True), to=sid)
+    else:
+        for payload in items:
+            await sio.emit(event_name, encode([payload], False), to=sid)
+
+
+async def _replay(sid: str, room: str, last_seq: Dict[str, int]) -> None:
+    # Live events keep flowing while the gap is sent, so clients should drop
+    # anything with a seq they have already seen.
+    summary: Dict[str, Any] = {}
+    conn = await _get_read_conn()
+    if "events" in last_seq:
+        items, source, truncated = await read_gap(
+            events_replay,
+            lambda cursor, limit: query_file_events(conn, cursor=cursor, limit=limit, descending=False),
+            last_seq["events"],
+            max_items=settings.replay_max_items,
+            accept=lambda p: room in router.rooms_for_file_event(p),
+        )
+        await _send_to_client(
+            sid, room, settings.socket_file_change_event_name, settings.socket_file_change_batch_event_name, items
+        )
+        summary["events"] = {"count": len(items), "source": source, "truncated": truncated}
+    if "logs" in last_seq:
+        items, source, truncated = await read_gap(
+            logs_replay,
+            lambda cursor, limit: query_log_journal(conn, cursor=cursor, limit=limit, descending=False),
+            last_seq["logs"],
+            max_items=settings.replay_max_items,
+            accept=lambda p: room in router.rooms_for_log(p),
+        )
+        await _send_to_client(sid, room, settings.socket_log_event_name, settings.socket_log_batch_event_name, items)
+        summary["logs"] = {"count": len(items), "source": source, "truncated": truncated}
+    await sio.emit("replay", summary, to=sid)
+
+
+async def _emit_routed(
+    event_name: str,
+    payload: Dict[str, Any],
+    rooms: Set[str],
+    batcher: Optional[SocketBatcher],
+) -> None:
+    event_rooms: List[str] = []
+    encoded_rooms: List[str] = []
+    batch_rooms: List[str] = []
+    for room in rooms:
+        if SubscriptionRouter.room_mode(room) == "batch":
+            batch_rooms.append(room)
+        elif SubscriptionRouter.room_wire(room) != "json":
+            encoded_rooms.append(room)
+        else:
+            event_rooms.append(room)
+
+    started = time.monotonic()
+    if event_rooms:
+        await sio.emit(event_name, payload, room=event_rooms)
+    for room in encoded_rooms:
+        await _emit_encoded(event_name, room, [payload], batch=False)
+    if event_rooms or encoded_rooms:
+        SOCKET_EMIT.observe(time.monotonic() - started, event_name)
+    if batch_rooms and batcher is not None:
+        batcher.add((batch_rooms, payload))
+
+
+async def _emit_file_event(payload: Dict[str, Any]) -> None:
+    events_replay.append(payload)
+    if broker is not None:
+        broker.publish("events", payload)
+    rooms = router.rooms_for_file_event(payload)
+    await _emit_routed(settings.socket_file_change_event_name, payload, rooms, file_batcher)
+
+
+async def _emit_log_event(payload: Dict[str, Any]) -> None:
+    logs_replay.append(payload)
+    if broker is not None:
+        broker.publish("logs", payload)
+    rooms = router.rooms_for_log(payload)
+    await _emit_routed(settings.socket_log_event_name, payload, rooms, log_batcher)
+
+
+async def _reconcile_when_ready(rec: Reconciler) -> None:
+    # The scan must not start before every watch is scheduled, or changes made
+    # in between are neither seen by the scan nor reported by the observer.
+    # Short waits keep the thread from outliving a shutdown during startup.
+    while not await asyncio.to_thread(watcher.wait_ready, 1.0):
+        pass
+    await rec.run()
+
+
+async def _in_lane(lane: str, coro: Awaitable[None]) -> None:
+    if lanes is None:
+        await coro
+        return
+    try:
+        async with lanes.turn(lane):
+            await coro
+    finally:
+        coro.close()  # never started if the wait for a turn was cancelled
+
+
+async def _emit_socket_batch(event_name: str, items: List[Tuple[List[str], Dict[str, Any]]]) -> None:
+    frames: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for rooms, payload in items:
+        for room in rooms:
+            frames[room].append(payload)
+    for room, frame in frames.items():
+        started = time.monotonic()
+        if SubscriptionRouter.room_wire(room) == "json":
+            await sio.emit(event_name, frame, room=room)
+        else:
+            await _emit_encoded(event_name, room, frame, batch=True)
+        SOCKET_EMIT.observe(time.monotonic() - started, event_name)
 
 
 async def _cancel_task(task: Optional[asyncio.Task]) -> None:
@@ -62,9 +395,11 @@ def _attach_global_log_handler(
     loop: asyncio.AbstractEventLoop,
     queue: asyncio.Queue[Dict[str, Any]],
     level: int = logging.INFO,
+    overflow: Optional[OverflowGuard] = None,
+    sampler: Optional[LogSampler] = None,
 ) -> LogJournalQueueHandler:
     root_logger = logging.getLogger()
-    handler = LogJournalQueueHandler(loop=loop, queue=queue)
+    handler = LogJournalQueueHandler(loop=loop, queue=queue, overflow=overflow, sampler=sampler)
     handler.setLevel(level)
     root_logger.addHandler(handler)
     logging.captureWarnings(True)
@@ -86,57 +421,352 @@ def _force_propagate_to_root(
 
 
 
+def _make_overflow_guard(
+    queue: asyncio.Queue[Dict[str, Any]],
+    policy: str,
+    name: str,
+    key: Callable[[Dict[str, Any]], Any],
+    label: Callable[[Dict[str, Any]], str],
+    warn_on_drop: bool,
+) -> OverflowGuard:
+    spill = None
+    if policy == "spill":
+        spill = SpillLog(
+            os.path.join(settings.queue_spill_dir, name),
+            segment_bytes=settings.queue_spill_segment_mb * 1024 * 1024,
+        )
+    return OverflowGuard(
+        queue=queue,
+        policy=policy,
+        name=name,
+        key=key,
+        label=label,
+        spill=spill,
+        warn_on_drop=warn_on_drop,
+    )
+
+
 def _detach_global_log_handler(handler: LogJournalQueueHandler) -> None:
     root_logger = logging.getLogger()
     root_logger.removeHandler(handler)
     handler.close()
 
 
+async def _drain_log_journal(
+    handler: LogJournalQueueHandler,
+    queue: asyncio.Queue[Dict[str, Any]],
+    timeout: float,
+) -> None:
+    # Records reach the queue through call_soon_threadsafe; let those land before the
+    # close below flushes the pending repeat summaries behind them.
+    await asyncio.sleep(0)
+    # Runs while the journal consumer is still alive, so the summaries get stored.
+    _detach_global_log_handler(handler)
+    try:
+        await asyncio.wait_for(queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Log journal not drained on shutdown: %d records left", queue.qsize())
+
+
+async def _get_read_conn():
+    # Workers start before the writer may have created the database, so this is opened on first use.
+    global read_conn
+    async with read_conn_lock:
+        if read_conn is None:
+            read_conn = await open_read_connection(settings.db_path, partitions)
+    return read_conn
+
+
+def _replay_positions() -> Dict[str, int]:
+    positions = {"events": events_replay.last_seq, "logs": logs_replay.last_seq}
+    return {stream: seq for stream, seq in positions.items() if seq is not None}
+
+
+async def _on_broker_payload(stream: str, payload: Dict[str, Any]) -> None:
+    if stream == "events":
+        if aggregates is not None:
+            aggregates.observe(payload)
+        await _in_lane(EVENTS_LANE, _emit_file_event(payload))
+    elif stream == "logs":
+        await _in_lane(LOGS_LANE, _emit_log_event(payload))
+
+
+async def _emit_stats(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await sio.emit(settings.socket_stats_event_name, aggregates.snapshot(limit=settings.stats_top_k))
+
+
+async def _forward_logs(queue: asyncio.Queue[Dict[str, Any]], client: BrokerClient) -> None:
+    while True:
+        payload = await queue.get()
+        try:
+            client.send_log(payload)
+        finally:
+            queue.task_done()
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    global coalescer, enricher, file_batcher, log_batcher, events_overflow, logs_overflow, read_conn, log_sampler
+    global broker, broker_client, reconciler, lanes, partitions
     loop = asyncio.get_running_loop()
 
-    if not settings.watch_dirs:
-        logger.warning("WATCH_DIRS is empty. Nothing will be watched.")
+    if settings.role not in ROLES:
+        raise ValueError(f"Unknown HAWKEYE_ROLE: {settings.role!r} (expected one of {', '.join(ROLES)})")
+    is_worker = settings.role == "worker"
+    if settings.emitter_dispatch not in ("sync", "queued"):
+        raise ValueError(f"Unknown EMITTER_DISPATCH: {settings.emitter_dispatch!r} (expected sync or queued)")
 
-    db_conn = await init_db(settings.db_path)
+    if settings.db_partition_by != "none":
+        partitions = PartitionCatalog(settings.db_path, settings.db_partition_by)
 
-    watcher.emitter.add(make_enqueue(loop=loop, queue=events_queue))
-    watcher.start()
+    if not is_worker and not settings.watch_dirs:
+        logger.warning("WATCH_DIRS is empty. Nothing will be watched.")
 
-    journal_handler = _attach_global_log_handler(loop=loop, queue=logs_queue, level=logging.DEBUG)
-    _force_propagate_to_root(["uvicorn", "uvicorn.error", "fastapi", "watchdog", "asyncio"], logging.INFO)
+    maintenance_conn = None
+    retention_task = None
+    if not is_worker:
+        schema_conn = await init_db(
+            settings.db_path,
+            journal_mode=settings.db_journal_mode,
+            synchronous=settings.db_synchronous,
+        )
+        await schema_conn.close()
+        synchronous = settings.db_synchronous.strip().upper()
+        for table in ("file_events", "log_journal"):
+            if partitions is not None:
+                lane = PartitionedLane(
+                    table,
+                    settings.db_path,
+                    partitions,
+                    journal_mode=settings.db_journal_mode.strip().upper(),
+                    synchronous=synchronous,
+                )
+            else:
+                lane = WriteLane(table, settings.db_path, synchronous=synchronous)
+            lane.start()
+            write_lanes[table] = lane
+        await _get_read_conn()
+
+        retention_policy = RetentionPolicy(
+            max_age=timedelta(hours=settings.retention_max_age_hours) if settings.retention_max_age_hours > 0 else None,
+            max_bytes=settings.retention_max_db_mb * 1024 * 1024 if settings.retention_max_db_mb > 0 else None,
+            chunk_size=settings.retention_chunk_size,
+            interval=settings.retention_interval_s,
+            vacuum_pages=settings.retention_vacuum_pages,
+        )
+        if retention_policy.enabled:
+            maintenance_conn = await open_maintenance_connection(settings.db_path)
+            retention_task = asyncio.create_task(
+                retention_worker(conn=maintenance_conn, policy=retention_policy, partitions=partitions),
+                name="hawkeye-retention",
+            )
+    flush_interval = settings.db_flush_interval_ms / 1000
+
+    logs_overflow = _make_overflow_guard(
+        logs_queue,
+        settings.log_queue_overflow_policy,
+        "logs",
+        key=lambda p: (p.get("logger_name"), p.get("message")),
+        label=lambda p: p.get("level", ""),
+        warn_on_drop=False,
+    )
 
-    events_task = asyncio.create_task(
-        events_consumer(
-            queue=events_queue,
-            db_conn=db_conn,
-            emit_socket=lambda p: _emit_socket(settings.socket_file_change_event_name, p),
-        ),
-        name="hawkeye-events-consumer",
+    if not is_worker:
+        events_overflow = _make_overflow_guard(
+            events_queue,
+            settings.queue_overflow_policy,
+            "events",
+            key=lambda p: p.get("src_path"),
+            label=lambda p: p.get("event", ""),
+            warn_on_drop=True,
+        )
+
+        if settings.content_hash_enabled:
+            enricher = ContentEnricher(
+                loop=loop,
+                sink=events_overflow.put,
+                max_bytes=settings.content_hash_max_kb * 1024,
+                workers=settings.content_hash_workers,
+                max_pending=settings.content_hash_max_pending,
+                cache_size=settings.content_hash_cache_size,
+            )
+
+        if settings.coalesce_window_ms > 0:
+            coalescer = EventCoalescer(
+                loop=loop,
+                sink=enricher.push if enricher is not None else events_overflow.put,
+                quiet_window=settings.coalesce_window_ms / 1000,
+            )
+
+        enqueue = make_enqueue(
+            loop=loop, queue=events_queue, coalescer=coalescer, enricher=enricher, overflow=events_overflow
+        )
+        queued_dispatch = settings.emitter_dispatch == "queued"
+        if queued_dispatch:
+            watcher.emitter.add_queued(
+                enqueue,
+                name="enqueue",
+                maxsize=settings.emitter_queue_size,
+                overflow=settings.emitter_overflow_policy,
+            )
+        else:
+            watcher.emitter.add(enqueue)
+        if settings.reconcile_on_start:
+            reconciler = Reconciler(
+                db_path=settings.db_path,
+                roots=watcher.watch_roots(),
+                emit=enqueue,
+                recursive=watcher.recursive,
+                workers=settings.reconcile_workers,
+                flush_interval=settings.reconcile_flush_interval_s,
+            )
+            if queued_dispatch:
+                watcher.emitter.add_queued(
+                    reconciler.observe_many,
+                    name="reconcile",
+                    maxsize=settings.emitter_queue_size,
+                    overflow=settings.emitter_overflow_policy,
+                    batch_size=256,
+                    max_wait=0.05,
+                )
+            else:
+                watcher.emitter.add(reconciler.observe)
+        watcher.start()
+
+    if settings.role == "writer":
+        broker = EventBroker(
+            settings.broker_socket,
+            replay={"events": events_replay, "logs": logs_replay},
+            on_log=logs_overflow.put,
+            max_buffer_bytes=settings.broker_max_buffer_kb * 1024,
+        )
+        await broker.start()
+
+    lanes = LaneScheduler(settings.lane_weights) if settings.lane_weights else None
+
+    socket_batch_interval = settings.socket_batch_interval_ms / 1000
+    file_batcher = SocketBatcher(
+        emit_batch=lambda b: _in_lane(EVENTS_LANE, _emit_socket_batch(settings.socket_file_change_batch_event_name, b)),
+        max_size=settings.socket_batch_size,
+        max_wait=socket_batch_interval,
+        maxsize=settings.queue_maxsize,
+    )
+    log_batcher = SocketBatcher(
+        emit_batch=lambda b: _in_lane(LOGS_LANE, _emit_socket_batch(settings.socket_log_batch_event_name, b)),
+        max_size=settings.socket_batch_size,
+        max_wait=socket_batch_interval,
+        maxsize=settings.queue_maxsize,
     )
 
-    logs_task = asyncio.create_task(
-        log_journal_consumer(
-            queue=logs_queue,
-            db_conn=db_conn,
-            emit_socket=lambda p: _emit_socket(settings.socket_log_event_name, p),
-        ),
-        name="hawkeye-logs-consumer",
+    sampling_policy = SamplingPolicy(
+        rate_limits=settings.log_journal_rate_limits,
+        sample_rates=settings.log_journal_sample_rates,
+        dedup_window=settings.log_journal_dedup_window_ms / 1000,
+        skip_event_echo=settings.log_journal_skip_event_echo,
     )
+    log_sampler = LogSampler(sampling_policy) if sampling_policy.enabled else None
+    journal_handler = _attach_global_log_handler(
+        loop=loop,
+        queue=logs_queue,
+        level=logging.DEBUG,
+        overflow=logs_overflow,
+        sampler=log_sampler,
+    )
+    _force_propagate_to_root(["uvicorn", "uvicorn.error", "fastapi", "watchdog", "asyncio"], logging.INFO)
 
-    logger.info("Startup complete")
+    tasks: List[asyncio.Task] = []
+    if is_worker:
+        # Worker: no watcher and no DB writes; payloads come from the writer's broker
+        # and records logged here are sent back to be journaled.
+        broker_client = BrokerClient(
+            settings.broker_socket,
+            on_payload=_on_broker_payload,
+            last_seq=_replay_positions,
+        )
+        tasks.append(asyncio.create_task(broker_client.run(), name="hawkeye-broker-client"))
+        tasks.append(asyncio.create_task(_forward_logs(logs_queue, broker_client), name="hawkeye-log-forwarder"))
+    else:
+        tasks.append(asyncio.create_task(
+            events_consumer(
+                queue=events_queue,
+                db_conn=write_lanes["file_events"],
+                emit_socket=_emit_file_event,
+                batch_size=settings.db_batch_size,
+                flush_interval=flush_interval,
+                scheduler=lanes,
+                aggregates=aggregates,
+            ),
+            name="hawkeye-events-consumer",
+        ))
+        tasks.append(asyncio.create_task(
+            log_journal_consumer(
+                queue=logs_queue,
+                db_conn=write_lanes["log_journal"],
+                emit_socket=_emit_log_event,
+                # Smaller log batches keep each logs turn short next to file events.
+                batch_size=min(settings.db_batch_size, settings.lane_log_max_batch) if lanes else settings.db_batch_size,
+                flush_interval=flush_interval,
+                scheduler=lanes,
+            ),
+            name="hawkeye-logs-consumer",
+        ))
+        tasks.append(asyncio.create_task(events_overflow.run(), name="hawkeye-events-overflow"))
+        if reconciler is not None:
+            tasks.append(asyncio.create_task(_reconcile_when_ready(reconciler), name="hawkeye-reconcile"))
+
+    tasks.append(asyncio.create_task(logs_overflow.run(), name="hawkeye-logs-overflow"))
+    batcher_tasks = [
+        asyncio.create_task(file_batcher.run(), name="hawkeye-file-batcher"),
+        asyncio.create_task(log_batcher.run(), name="hawkeye-log-batcher"),
+    ]
+    if aggregates is not None and settings.stats_emit_interval_s > 0:
+        tasks.append(asyncio.create_task(_emit_stats(settings.stats_emit_interval_s), name="hawkeye-stats"))
+
+    logger.info("Startup complete (role=%s)", settings.role)
 
     yield
 
-    await _cancel_task(events_task)
-    await _cancel_task(logs_task)
-
-    _detach_global_log_handler(journal_handler)
-
-    watcher.stop()
-    await db_conn.close()
-    logger.info("SQLite closed")
+    if not is_worker:
+        watcher.stop()
+        await asyncio.to_thread(watcher.emitter.close)
+    if coalescer is not None:
+        coalescer.close()
+        logger.info("Coalescer stats: %s", coalescer.stats())
+    if enricher is not None:
+        enricher.close()
+        logger.info("Enricher stats: %s", enricher.stats())
+
+    await _drain_log_journal(journal_handler, logs_queue, LOG_DRAIN_TIMEOUT_S)
+
+    for task in tasks:
+        await _cancel_task(task)
+    # Batchers go last so frames produced by the consumers above still get out.
+    for batcher in (file_batcher, log_batcher):
+        await batcher.flush(BATCHER_FLUSH_TIMEOUT_S)
+    for task in batcher_tasks:
+        await _cancel_task(task)
+    if events_overflow is not None:
+        events_overflow.close()
+    logs_overflow.close()
+
+    if reconciler is not None:
+        await reconciler.close()
+
+    if broker is not None:
+        await broker.close()
+    await _cancel_task(retention_task)
+    if maintenance_conn is not None:
+        await maintenance_conn.close()
+    if read_conn is not None:
+        await read_conn.close()
+        read_conn = None
+    if write_lanes:
+        for lane in write_lanes.values():
+            await asyncio.to_thread(lane.close)
+        write_lanes.clear()
+        logger.info("SQLite closed")
 
 
 fastapi_app = FastAPI(lifespan=lifespan)
@@ -147,13 +777,113 @@ async def root():
     return {
         "app": "Hawkeye",
         "socket_file_change_event": settings.socket_file_change_event_name,
-        "socket_log_event": settings.socket_log_event_name
+        "socket_log_event": settings.socket_log_event_name,
+        "socket_file_change_batch_event": settings.socket_file_change_batch_event_name,
+        "socket_log_batch_event": settings.socket_log_batch_event_name,
+        "socket_stats_event": settings.socket_stats_event_name,
     }
 
 
 @fastapi_app.get("/health")
 async def health():
-    return {"status": "OK"}
+    result: Dict[str, Any] = {"status": "OK", "role": settings.role}
+    if settings.role != "worker":
+        result["watch"] = watcher.status()
+        if watcher.emitter.stats():
+            result["emitter"] = watcher.emitter.stats()
+    if broker is not None:
+        result["broker"] = broker.stats()
+    if lanes is not None:
+        result["lanes"] = lanes.stats()
+    if broker_client is not None:
+        result["broker"] = broker_client.stats()
+    if file_batcher is not None and log_batcher is not None:
+        result["socket_batchers"] = {"files": file_batcher.stats(), "logs": log_batcher.stats()}
+    if coalescer is not None:
+        result["coalescer"] = coalescer.stats()
+    if enricher is not None:
+        result["enricher"] = enricher.stats()
+    if reconciler is not None:
+        result["reconcile"] = reconciler.stats()
+    if write_lanes:
+        result["db_lanes"] = {name: lane.stats() for name, lane in write_lanes.items()}
+    if logs_overflow is not None:
+        result["queues"] = {name: guard.stats() for name, guard in _queue_guards().items()}
+    if log_sampler is not None:
+        result["log_sampling"] = log_sampler.stats()
+    return result
+
+
+@fastapi_app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@fastapi_app.get("/stats")
+async def stats(
+    window: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+):
+    if aggregates is None:
+        raise HTTPException(status_code=404, detail="Live stats are disabled (STATS_ENABLED=false)")
+    if window is not None and window not in aggregates.window_names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown window: {window!r} (expected one of {', '.join(aggregates.window_names)})",
+        )
+    return aggregates.snapshot(window=window, limit=limit)
+
+
+@fastapi_app.get("/history/file-events")
+async def history_file_events(
+    path_prefix: Optional[str] = None,
+    event: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    order: Literal["desc", "asc"] = "desc",
+):
+    try:
+        page = await query_file_events(
+            await _get_read_conn(),
+            path_prefix=path_prefix,
+            event=event,
+            since=since,
+            until=until,
+            cursor=cursor,
+            limit=limit,
+            descending=order == "desc",
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return page.to_dict()
+
+
+@fastapi_app.get("/history/logs")
+async def history_logs(
+    level: Optional[str] = None,
+    logger_name: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    order: Literal["desc", "asc"] = "desc",
+):
+    try:
+        page = await query_log_journal(
+            await _get_read_conn(),
+            level=level,
+            logger_name=logger_name,
+            since=since,
+            until=until,
+            cursor=cursor,
+            limit=limit,
+            descending=order == "desc",
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return page.to_dict()
 
 
 socketio_app = socketio.ASGIApp(sio, other_asgi_app=fastapi_app)
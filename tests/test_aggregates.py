@@ -0,0 +1,62 @@
+from collections import Counter
+
+from app.aggregates import OTHER_DIR, LiveAggregates, SpaceSaving
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _evt(path, event="modified"):
+    return {"event": event, "src_path": path, "dest_path": None, "is_directory": False}
+
+
+def test_space_saving_keeps_heavy_hitters_within_error_bound():
+    sketch = SpaceSaving(5)
+    stream = [f"/hot/{i % 3}" for i in range(300)] + [f"/cold/{i}" for i in range(200)]
+    truth = Counter(stream)
+    for key in stream:
+        sketch.add(key)
+
+    assert len(sketch) == 5
+    items = {key: (count, error) for key, count, error in sketch.items()}
+    for key in ("/hot/0", "/hot/1", "/hot/2"):
+        count, error = items[key]
+        assert count - error <= truth[key] <= count
+
+
+def test_windows_count_by_directory_and_event_and_slide():
+    clock = FakeClock()
+    agg = LiveAggregates(windows=(("1m", 60.0), ("5m", 300.0)), clock=clock)
+    agg.observe_many([_evt("/w/a/f1"), _evt("/w/a/f2", "created"), _evt("/w/b/f3")])
+    agg.observe(_evt("/w/a/f1"))
+
+    snap = agg.snapshot()
+    one = snap["windows"]["1m"]
+    assert one["events"] == 4
+    assert one["by_event"] == {"modified": 3, "created": 1}
+    assert one["hot_dirs"][0] == {"dir": "/w/a", "count": 3, "events": {"modified": 2, "created": 1}}
+    assert one["top_paths"][0] == {"path": "/w/a/f1", "count": 2, "error": 0}
+
+    clock.now += 70
+    agg.observe(_evt("/w/b/f3"))
+    snap = agg.snapshot()
+    assert snap["windows"]["1m"]["events"] == 1
+    assert snap["windows"]["1m"]["top_paths"] == [{"path": "/w/b/f3", "count": 1, "error": 0}]
+    assert snap["windows"]["5m"]["events"] == 5
+
+    clock.now += 400
+    assert agg.snapshot()["windows"]["5m"]["events"] == 0
+    assert agg.snapshot(window="1m")["windows"].keys() == {"1m"}
+
+
+def test_directories_past_the_cap_are_folded():
+    agg = LiveAggregates(windows=(("1m", 60.0),), max_dirs=2, clock=FakeClock())
+    agg.observe_many(_evt(f"/w/d{i}/f") for i in range(5))
+
+    dirs = {d["dir"]: d["count"] for d in agg.snapshot()["windows"]["1m"]["hot_dirs"]}
+    assert dirs == {"/w/d0": 1, "/w/d1": 1, OTHER_DIR: 3}
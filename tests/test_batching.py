@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+
+from app.batching import drain_batch
+
+
+@pytest.mark.asyncio
+async def test_drain_batch_caps_size():
+    q: asyncio.Queue = asyncio.Queue()
+    for i in range(5):
+        q.put_nowait(i)
+
+    assert await drain_batch(q, max_size=3, max_wait=1) == [0, 1, 2]
+    assert await drain_batch(q, max_size=3, max_wait=0) == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_drain_batch_waits_for_late_items_within_window():
+    q: asyncio.Queue = asyncio.Queue()
+    q.put_nowait("a")
+
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.01, q.put_nowait, "b")
+
+    assert await drain_batch(q, max_size=10, max_wait=0.2) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_drain_batch_single_item_mode():
+    q: asyncio.Queue = asyncio.Queue()
+    q.put_nowait("a")
+    q.put_nowait("b")
+
+    assert await drain_batch(q, max_size=1, max_wait=1) == ["a"]
@@ -0,0 +1,37 @@
+import pytest
+
+from bench.pipeline import BenchConfig, LatencyTracker, peak_rss_mb, percentile, run_benchmark, run_isolated
+
+
+def test_percentile_and_tracker():
+    assert percentile([], 0.5) is None
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.99) == 4.0
+
+    tracker = LatencyTracker()
+    tracker.mark("/a")
+    tracker.mark("/a")
+    tracker.mark("/b")
+    tracker.seen({"src_path": "/x", "dest_path": "/a"})
+    assert tracker.expected == 2
+    assert tracker.missing() == 1
+    assert len(tracker.samples) == 1
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark_reports_machine_readable_result():
+    result = await run_benchmark(BenchConfig(workload="create-storm", backend="inotify", ops=20, clients=0, timeout=5.0))
+    assert result["paths_expected"] == 20
+    assert result["paths_missing"] == 0
+    assert result["events_dropped"] == 0
+    assert result["latency_ms"]["p99"] is not None
+    assert result["peak_rss_mb"] > 0
+
+
+@pytest.mark.asyncio
+async def test_run_isolated_reports_its_own_peak_rss():
+    blob = b"x" * (200 * 1024 * 1024)  # raise this process's peak well above a bench run's
+    del blob
+    result = await run_isolated(BenchConfig(workload="create-storm", backend="inotify", ops=20, clients=0, timeout=5.0))
+    assert result["paths_missing"] == 0
+    assert 0 < result["peak_rss_mb"] < peak_rss_mb() - 100
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import pytest
+
+import app.broker
+from app.broker import BrokerClient, EventBroker, encode_frame
+from app.replay import ReplayBuffer
+
+
+def _evt(seq):
+    return {"event": "created", "src_path": f"/w/f{seq}", "seq": seq}
+
+
+async def _wait_for(predicate, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_worker_catches_up_then_receives_live_payloads_and_sends_logs(tmp_path):
+    path = str(tmp_path / "broker.sock")
+    events = ReplayBuffer(10)
+    for seq in range(1, 6):
+        events.append(_evt(seq))
+    logs_in = []
+    broker = EventBroker(path, replay={"events": events, "logs": ReplayBuffer(10)}, on_log=logs_in.append)
+    await broker.start()
+
+    received = []
+
+    async def on_payload(stream, payload):
+        received.append((stream, payload["seq"]))
+
+    client = BrokerClient(path, on_payload=on_payload, last_seq=lambda: {"events": 3}, retry_interval=0.01)
+    task = asyncio.create_task(client.run())
+    try:
+        await asyncio.wait_for(client.connected.wait(), 2)
+        await _wait_for(lambda: broker.stats()["subscribers"] == 1)
+        broker.publish("events", _evt(6))
+        broker.publish("logs", {"message": "hi", "seq": 1})
+        await _wait_for(lambda: len(received) == 4)
+        assert received == [("events", 4), ("events", 5), ("events", 6), ("logs", 1)]
+
+        client.send_log({"message": "from worker"})
+        await _wait_for(lambda: logs_in)
+        assert logs_in == [{"message": "from worker"}]
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_waits_for_broker_and_drops_logs_meanwhile(tmp_path):
+    path = str(tmp_path / "broker.sock")
+
+    async def on_payload(stream, payload):
+        pass
+
+    client = BrokerClient(path, on_payload=on_payload, last_seq=dict, retry_interval=0.01)
+    task = asyncio.create_task(client.run())
+    broker = EventBroker(path, replay={})
+    try:
+        await asyncio.sleep(0.05)
+        client.send_log({"message": "lost"})
+        assert client.stats() == {"connected": False, "received": 0, "logs_dropped": 1, "bad_frames": 0}
+
+        await broker.start()
+        await asyncio.wait_for(client.connected.wait(), 2)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_skips_malformed_frames_and_reconnects_after_oversized_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(app.broker, "LINE_LIMIT", 1024)
+    path = str(tmp_path / "broker.sock")
+    sessions = []
+
+    async def handle(reader, writer):
+        sessions.append(await reader.readline())
+        if len(sessions) == 1:
+            writer.write(b"not json\n" + encode_frame("events", _evt(1)) + b"x" * 4096 + b"\n")
+        else:
+            writer.write(encode_frame("events", _evt(2)))
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_unix_server(handle, path=path)
+    received = []
+
+    async def on_payload(stream, payload):
+        received.append(payload["seq"])
+
+    client = BrokerClient(path, on_payload=on_payload, last_seq=dict, retry_interval=0.01)
+    task = asyncio.create_task(client.run())
+    try:
+        await _wait_for(lambda: received == [1, 2])
+        assert client.stats()["bad_frames"] == 1
+        assert len(sessions) == 2
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hello", [b"[1]\n", b'{"hello": 5}\n', b'{"hello": {"last_seq": [3]}}\n'])
+async def test_broker_accepts_subscriber_with_malformed_hello(tmp_path, hello):
+    path = str(tmp_path / "broker.sock")
+    broker = EventBroker(path, replay={"events": ReplayBuffer(10)})
+    await broker.start()
+    writer = None
+    try:
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(hello)
+        await writer.drain()
+        await _wait_for(lambda: broker.stats()["subscribers"] == 1)
+        broker.publish("events", _evt(1))
+        assert json.loads(await asyncio.wait_for(reader.readline(), 2))["p"]["seq"] == 1
+    finally:
+        if writer is not None:
+            writer.close()
+        await broker.close()
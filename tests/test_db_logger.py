@@ -1,6 +1,12 @@
 import pytest
 
-from app.loggers.db_logger import init_db, insert_change_log, insert_log_journal
+from app.loggers.db_logger import (
+    init_db,
+    insert_change_log,
+    insert_change_logs,
+    insert_log_journal,
+    insert_log_journals,
+)
 
 
 @pytest.mark.asyncio
@@ -61,3 +67,65 @@ async def test_insert_log_journal(tmp_path):
 
     assert row == (payload["timestamp_utc"], "INFO", "Hello", "hawkeye")
     await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_init_db_enables_wal(tmp_path):
+    conn = await init_db(str(tmp_path / "test.db"), journal_mode="wal", synchronous="normal")
+
+    async with conn.execute("PRAGMA journal_mode") as cur:
+        assert (await cur.fetchone())[0] == "wal"
+    async with conn.execute("PRAGMA synchronous") as cur:
+        assert (await cur.fetchone())[0] == 1
+
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_init_db_rejects_unknown_pragma(tmp_path):
+    with pytest.raises(ValueError):
+        await init_db(str(tmp_path / "test.db"), synchronous="NORMAL; DROP TABLE file_events")
+
+
+@pytest.mark.asyncio
+async def test_insert_change_logs_and_log_journals_batch(tmp_path):
+    conn = await init_db(str(tmp_path / "test.db"))
+
+    await insert_change_logs(conn, [
+        {"event": "created", "src_path": f"f{i}", "dest_path": None, "is_directory": False, "timestamp_utc": "t"}
+        for i in range(3)
+    ])
+    await insert_log_journals(conn, [
+        {"timestamp_utc": "t", "level": "INFO", "message": f"m{i}", "logger_name": "x"}
+        for i in range(2)
+    ])
+    await insert_change_logs(conn, [])
+
+    async with conn.execute("SELECT src_path FROM file_events ORDER BY id") as cur:
+        assert [r[0] for r in await cur.fetchall()] == ["f0", "f1", "f2"]
+    async with conn.execute("SELECT COUNT(*) FROM log_journal") as cur:
+        assert (await cur.fetchone())[0] == 2
+
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_init_db_adds_repeat_count_to_existing_journal(tmp_path):
+    import sqlite3
+
+    db_path = str(tmp_path / "old.db")
+    with sqlite3.connect(db_path) as old:
+        old.execute(
+            "CREATE TABLE log_journal (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp_utc TEXT NOT NULL, "
+            "level TEXT NOT NULL, message TEXT NOT NULL, logger_name TEXT NOT NULL)"
+        )
+        old.execute("INSERT INTO log_journal(timestamp_utc, level, message, logger_name) VALUES('t', 'INFO', 'm', 'x')")
+
+    conn = await init_db(db_path)
+    await insert_log_journals(conn, [
+        {"timestamp_utc": "t", "level": "INFO", "message": "m", "logger_name": "x", "repeat_count": 7},
+    ])
+    async with conn.execute("SELECT repeat_count FROM log_journal ORDER BY id") as cur:
+        assert [r[0] for r in await cur.fetchall()] == [1, 7]
+
+    await conn.close()
@@ -0,0 +1,81 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.loggers.db_logger import PartitionCatalog, PartitionedLane, init_db, insert_change_logs, insert_log_journals
+from app.loggers.db_writer import WriteLane
+
+
+def _evt(i):
+    return {"event": "created", "src_path": f"f{i}", "dest_path": None, "is_directory": False, "timestamp_utc": "t"}
+
+
+def _log(i):
+    return {"timestamp_utc": "t", "level": "INFO", "message": f"m{i}", "logger_name": "x"}
+
+
+@pytest.mark.asyncio
+async def test_lanes_write_tables_concurrently_and_return_ids(tmp_path):
+    db_path = str(tmp_path / "w.db")
+    await (await init_db(db_path)).close()
+    events, logs = WriteLane("file_events", db_path), WriteLane("log_journal", db_path)
+    events.start()
+    logs.start()
+    try:
+        results = await asyncio.gather(
+            *(insert_change_logs(events, [_evt(i), _evt(i)]) for i in range(5)),
+            *(insert_log_journals(logs, [_log(i)]) for i in range(5)),
+        )
+        assert [list(r) for r in results[:5]] == [[1, 2], [3, 4], [5, 6], [7, 8], [9, 10]]
+        assert [list(r) for r in results[5:]] == [[1], [2], [3], [4], [5]]
+        assert events.stats() == {"pending": 0, "batches": 5}
+
+        with pytest.raises(sqlite3.OperationalError):
+            await events.call(lambda conn: conn.execute("SELECT * FROM missing"))
+        assert list(await insert_change_logs(events, [_evt(99)])) == [11]
+    finally:
+        events.close()
+        logs.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM file_events").fetchone() == (11,)
+    conn.close()
+
+
+def _day_evt(i, day):
+    return {**_evt(i), "timestamp_utc": f"2026-01-0{day}T12:00:00.000+00:00"}
+
+
+@pytest.mark.asyncio
+async def test_partitioned_lane_routes_by_timestamp_and_keeps_ids_growing(tmp_path):
+    db_path = str(tmp_path / "w.db")
+    conn = await init_db(db_path)
+    await insert_change_logs(conn, [_evt(0), _evt(1)])
+    await conn.close()
+    catalog = PartitionCatalog(db_path, "day")
+
+    lane = PartitionedLane("file_events", db_path, catalog)
+    lane.start()
+    try:
+        assert list(await insert_change_logs(lane, [_day_evt(2, 1), _day_evt(3, 1), _day_evt(4, 2)])) == [3, 4, 5]
+        # Late for a closed day: stays in the current partition.
+        assert list(await insert_change_logs(lane, [_day_evt(5, 1)])) == [6]
+        assert lane.stats()["partition"] == "2026-01-02"
+    finally:
+        lane.close()
+
+    assert catalog.keys() == ["2026-01-01", "2026-01-02"]
+    day1 = sqlite3.connect(catalog.path_of("2026-01-01"))
+    day2 = sqlite3.connect(catalog.path_of("2026-01-02"))
+    assert day1.execute("SELECT id FROM file_events ORDER BY id").fetchall() == [(3,), (4,)]
+    assert day2.execute("SELECT id FROM file_events ORDER BY id").fetchall() == [(5,), (6,)]
+    day1.close()
+    day2.close()
+
+    restarted = PartitionedLane("file_events", db_path, catalog)
+    restarted.start()
+    try:
+        assert list(await insert_change_logs(restarted, [_day_evt(6, 3)])) == [7]
+    finally:
+        restarted.close()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+
+import pytest
+
+from app.enrichment import ContentEnricher, HashCache, fingerprint
+
+
+def _evt(event, path, dest=None, is_directory=False):
+    return {"event": event, "src_path": path, "dest_path": dest, "is_directory": is_directory}
+
+
+async def _settle(enricher):
+    for _ in range(200):
+        if not enricher.stats()["in_flight"]:
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_fingerprint_uses_cache_until_stat_changes(tmp_path, monkeypatch):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"hello")
+    cache = HashCache(16)
+
+    size, digest = fingerprint(str(path), 1024, cache)
+    assert size == 5 and len(digest) == 32
+    monkeypatch.setattr("app.enrichment._hash_file", lambda p: pytest.fail("re-read an unchanged file"))
+    assert fingerprint(str(path), 1024, cache) == (5, digest)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    assert fingerprint(str(path), 4, cache) == (5, None)
+    assert fingerprint(str(tmp_path / "missing"), 1024, cache) is None
+    assert fingerprint(str(tmp_path), 1024, cache) is None
+
+
+@pytest.mark.asyncio
+async def test_enricher_suppresses_unchanged_content_and_keeps_order(tmp_path):
+    out = []
+    enricher = ContentEnricher(loop=asyncio.get_running_loop(), sink=out.append, max_bytes=1024)
+    path = str(tmp_path / "a.txt")
+    try:
+        with open(path, "w") as f:
+            f.write("one")
+        enricher.push(_evt("created", path))
+        await _settle(enricher)
+
+        os.utime(path, ns=(1, 1))
+        enricher.push(_evt("modified", path))
+        enricher.push(_evt("created", str(tmp_path), is_directory=True))
+        await _settle(enricher)
+
+        with open(path, "w") as f:
+            f.write("two")
+        enricher.push(_evt("modified", path))
+        await _settle(enricher)
+    finally:
+        enricher.close()
+
+    assert [(p["event"], p.get("size")) for p in out] == [("created", 3), ("created", None), ("modified", 3)]
+    assert out[0]["hash"] != out[2]["hash"]
+    assert enricher.stats()["suppressed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_enricher_passes_events_through_when_pool_is_saturated(tmp_path):
+    out = []
+    enricher = ContentEnricher(loop=asyncio.get_running_loop(), sink=out.append, max_bytes=1024, max_pending=1)
+    paths = [str(tmp_path / f"f{i}") for i in range(3)]
+    try:
+        for path in paths:
+            open(path, "w").close()
+            enricher.push(_evt("created", path))
+        await _settle(enricher)
+    finally:
+        enricher.close()
+
+    assert [p["src_path"] for p in out] == paths
+    assert "hash" in out[0] and "hash" not in out[1]
+    assert enricher.stats()["passed_busy"] == 2
@@ -1,3 +1,9 @@
+import dataclasses
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
 from app.events import EventEmitter, ChangeFileEvent
 
 
@@ -25,3 +31,59 @@ def test_change_file_event_to_dict_contains_fields():
     assert d["dest_path"] == "b"
     assert d["is_directory"] is True
     assert "timestamp_utc" in d
+
+
+def test_change_file_event_captures_observation_time():
+
+    evt = ChangeFileEvent(event="modified", src_path="x", dest_path=None, is_directory=False, wall_ns=1_700_000_000_123_456_789)
+    expected = datetime.fromtimestamp(1_700_000_000.123, tz=timezone.utc).isoformat(timespec="milliseconds")
+    assert evt.to_dict()["timestamp_utc"] == expected
+    assert evt.mono_ns > 0
+
+
+def test_change_file_event_is_frozen_and_compares_by_fields():
+    a = ChangeFileEvent(event="created", src_path="a", dest_path=None, is_directory=False, wall_ns=1, mono_ns=1)
+    b = ChangeFileEvent(event="created", src_path="a", dest_path=None, is_directory=False, wall_ns=2, mono_ns=2)
+
+    assert a == b
+    assert hash(a) == hash(b)
+    assert a != ChangeFileEvent(event="modified", src_path="a", dest_path=None, is_directory=False)
+    assert not hasattr(a, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        a.event = "deleted"
+
+
+def test_queued_handler_does_not_block_emit_and_drops_per_policy():
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def slow(evt):
+        started.set()
+        release.wait(5)
+        seen.append(evt.src_path)
+
+    emitter = EventEmitter()
+    queued = emitter.add_queued(slow, name="slow", maxsize=2, overflow="drop-oldest")
+    for i in range(5):
+        emitter.emit(ChangeFileEvent(event="created", src_path=f"f{i}", dest_path=None, is_directory=False))
+        if i == 0:
+            assert started.wait(5)
+
+    release.set()
+    emitter.close()
+    # f0 was already taken by the worker; f1 and f2 were evicted by newer events.
+    assert seen == ["f0", "f3", "f4"]
+    assert queued.stats()["dropped"] == 2
+    assert emitter.stats()["slow"]["handled"] == 3
+
+
+def test_batch_consumer_receives_lists():
+    batches = []
+    emitter = EventEmitter()
+    emitter.add_queued(lambda evts: batches.append([e.src_path for e in evts]), name="batch", batch_size=3, max_wait=1)
+    for i in range(4):
+        emitter.emit(ChangeFileEvent(event="created", src_path=f"f{i}", dest_path=None, is_directory=False))
+    emitter.close()
+
+    assert [p for batch in batches for p in batch] == ["f0", "f1", "f2", "f3"]
+    assert all(len(batch) <= 3 for batch in batches)
@@ -0,0 +1,41 @@
+from app.filters import PathFilter, build_path_filters, patterns_for
+
+
+def test_exclude_names_match_any_component():
+    f = PathFilter("/w", exclude=[".git", "node_modules", "*.swp", "__pycache__"])
+
+    assert not f.allows("/w/.git/HEAD")
+    assert not f.allows("/w/src/node_modules", is_directory=True)
+    assert not f.allows("/w/src/node_modules/pkg/index.js")
+    assert not f.allows("/w/src/.main.py.swp")
+    assert f.allows("/w/src/main.py")
+    assert f.allows("/w/src/git.txt")
+
+
+def test_relative_path_patterns_are_anchored_at_root():
+    f = PathFilter("/w", exclude=["build/**", "docs/tmp"])
+
+    assert not f.allows("/w/build/out.o")
+    assert f.allows("/w/src/build/out.o")
+    assert not f.allows("/w/docs/tmp/a.md")
+    assert f.allows("/w/docs/tmp2/a.md")
+
+
+def test_include_applies_to_files_only():
+    f = PathFilter("/w", include=["*.py", "conf/*.yaml"], exclude=["venv"])
+
+    assert f.allows("/w/pkg/app.py")
+    assert f.allows("/w/conf/a.yaml")
+    assert not f.allows("/w/pkg/app.js")
+    assert f.allows("/w/pkg", is_directory=True)
+    assert not f.allows("/w/venv/lib/x.py")
+
+
+def test_patterns_can_be_scoped_to_watch_dir():
+    entries = ["*.tmp", "/w1|logs", "\\w2\\|cache"]
+
+    assert patterns_for("/w1", entries) == ["*.tmp", "logs"]
+    assert patterns_for("/w2", entries) == ["*.tmp", "cache"]
+
+    filters = build_path_filters(["/w1", "/w3"], exclude=["/w1|logs"])
+    assert list(filters) == ["/w1"]
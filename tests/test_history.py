@@ -0,0 +1,153 @@
+import os
+import pytest
+
+from app.history import _prefix_clause, normalize_timestamp, query_file_events, query_log_journal
+from app.loggers.db_logger import (
+    PartitionCatalog,
+    PartitionedLane,
+    init_db,
+    insert_change_logs,
+    insert_log_journals,
+    open_read_connection,
+)
+
+
+def _path(*parts):
+    return os.sep + os.sep.join(parts)
+
+
+@pytest.fixture
+async def db(tmp_path):
+    db_path = str(tmp_path / "h.db")
+    conn = await init_db(db_path)
+    await insert_change_logs(conn, [
+        {"event": "created", "src_path": _path("w", "a", "1.txt"), "dest_path": None, "is_directory": False,
+         "timestamp_utc": "2025-01-01T00:00:01.000+00:00"},
+        {"event": "modified", "src_path": _path("w", "a", "1.txt"), "dest_path": None, "is_directory": False,
+         "timestamp_utc": "2025-01-01T00:00:02.000+00:00"},
+        {"event": "created", "src_path": _path("w", "ab", "2.txt"), "dest_path": None, "is_directory": False,
+         "timestamp_utc": "2025-01-01T00:00:03.000+00:00"},
+        {"event": "created", "src_path": _path("w", "a"), "dest_path": None, "is_directory": True,
+         "timestamp_utc": "2025-01-01T00:00:04.000+00:00"},
+    ])
+    await insert_log_journals(conn, [
+        {"timestamp_utc": f"2025-01-01T00:00:0{i}.000+00:00", "level": lvl, "message": f"m{i}", "logger_name": name}
+        for i, (lvl, name) in enumerate([("INFO", "x"), ("ERROR", "x"), ("ERROR", "y")])
+    ])
+    read_conn = await open_read_connection(db_path)
+    yield read_conn
+    await read_conn.close()
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_file_events_prefix_does_not_match_sibling(db):
+    page = await query_file_events(db, path_prefix=_path("w", "a"))
+
+    assert [item["id"] for item in page.items] == [4, 2, 1]
+    assert page.items[0]["is_directory"] is True
+    assert page.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_file_events_keyset_pagination(db):
+    first = await query_file_events(db, limit=3)
+    assert [i["id"] for i in first.items] == [4, 3, 2]
+    assert first.next_cursor == 2
+
+    second = await query_file_events(db, limit=3, cursor=first.next_cursor)
+    assert [i["id"] for i in second.items] == [1]
+    assert second.next_cursor is None
+
+    ascending = await query_file_events(db, limit=2, descending=False, event="created")
+    assert [i["id"] for i in ascending.items] == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_file_events_time_range(db):
+    page = await query_file_events(db, since="2025-01-01T00:00:02Z", until="2025-01-01T00:00:04+00:00")
+    assert [i["id"] for i in page.items] == [3, 2]
+
+
+@pytest.mark.asyncio
+async def test_log_journal_filters(db):
+    page = await query_log_journal(db, level="error")
+    assert [i["message"] for i in page.items] == ["m2", "m1"]
+
+    page = await query_log_journal(db, level="ERROR", logger_name="x")
+    assert [i["message"] for i in page.items] == ["m1"]
+
+
+def test_normalize_timestamp_rejects_garbage():
+    assert normalize_timestamp("2025-01-01T02:00:00+02:00") == "2025-01-01T00:00:00.000+00:00"
+    with pytest.raises(ValueError):
+        normalize_timestamp("yesterday")
+
+
+@pytest.mark.asyncio
+async def test_history_queries_use_indexes(db):
+    async def plan(sql, params):
+        async with db.execute("EXPLAIN QUERY PLAN " + sql, params) as cur:
+            return " ".join(str(r[-1]) for r in await cur.fetchall())
+
+    for table, column, index in (
+        ("file_events", "event", "idx_file_events_event_id"),
+        ("file_events", "src_path", "idx_file_events_src_path_id"),
+        ("log_journal", "level", "idx_log_journal_level_id"),
+        ("log_journal", "logger_name", "idx_log_journal_logger_id"),
+    ):
+        text = await plan(f"SELECT id FROM {table} WHERE {column} = ? AND id < ? ORDER BY id DESC LIMIT 10", ("x", 100))
+        assert index in text
+        assert "TEMP B-TREE" not in text
+
+    clause, params = _prefix_clause("src_path", _path("w", "a"))
+    text = await plan(f"SELECT id FROM file_events WHERE {clause}", params)
+    assert "idx_file_events_src_path_id" in text
+    assert "MULTI-INDEX OR" not in text
+
+
+@pytest.mark.asyncio
+async def test_partitioned_pages_span_partitions_and_prune_by_time(tmp_path):
+    db_path = str(tmp_path / "p.db")
+    conn = await init_db(db_path)
+    await insert_change_logs(conn, [
+        {"event": "created", "src_path": _path("w", "old"), "dest_path": None, "is_directory": False,
+         "timestamp_utc": "2024-12-31T10:00:00.000+00:00"},
+    ])
+    await conn.close()
+    catalog = PartitionCatalog(db_path, "day")
+    lane = PartitionedLane("file_events", db_path, catalog)
+    lane.start()
+    try:
+        for day in range(1, 5):
+            await insert_change_logs(lane, [
+                {"event": "modified", "src_path": _path("w", f"{day}-{i}"), "dest_path": None,
+                 "is_directory": False, "timestamp_utc": f"2025-01-0{day}T0{i}:00:00.000+00:00"}
+                for i in range(2)
+            ])
+    finally:
+        lane.close()
+
+    reader = await open_read_connection(db_path, catalog)
+    try:
+        first = await query_file_events(reader, limit=3)
+        assert [item["id"] for item in first.items] == [9, 8, 7]
+        rest = await query_file_events(reader, limit=10, cursor=first.next_cursor)
+        assert [item["id"] for item in rest.items] == [6, 5, 4, 3, 2, 1]
+        assert rest.next_cursor is None
+
+        ascending = await query_file_events(reader, limit=4, descending=False, cursor=2)
+        assert [item["id"] for item in ascending.items] == [3, 4, 5, 6]
+    finally:
+        await reader.close()
+
+    reader = await open_read_connection(db_path, catalog)
+    try:
+        page = await query_file_events(reader, since="2025-01-02T01:00:00Z", until="2025-01-03T00:00:00Z")
+        assert [item["id"] for item in page.items] == [5]
+        async with reader.conn.execute("PRAGMA database_list") as cur:
+            attached = [row[1] for row in await cur.fetchall()]
+        # Day 2 plus the day after ``until`` for late rows; days 1 and 4 are never opened.
+        assert attached == ["main", "p_2025_01_03", "p_2025_01_02"]
+    finally:
+        await reader.close()
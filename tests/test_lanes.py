@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app.lanes import EVENTS_LANE, LOGS_LANE, LaneScheduler
+
+
+async def _worker(scheduler: LaneScheduler, lane: str, duration: float, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        async with scheduler.turn(lane):
+            await asyncio.sleep(duration)
+
+
+async def test_busy_time_follows_weights_under_contention():
+    scheduler = LaneScheduler({EVENTS_LANE: 3, LOGS_LANE: 1})
+    stop = asyncio.Event()
+    workers = [
+        asyncio.create_task(_worker(scheduler, EVENTS_LANE, 0.005, stop)),
+        asyncio.create_task(_worker(scheduler, LOGS_LANE, 0.005, stop)),
+    ]
+    await asyncio.sleep(0.4)
+    stop.set()
+    await asyncio.gather(*workers)
+
+    stats = scheduler.stats()
+    ratio = stats[EVENTS_LANE]["turns"] / stats[LOGS_LANE]["turns"]
+    assert 2 <= ratio <= 4
+
+
+async def test_idle_lane_does_not_bank_credit():
+    scheduler = LaneScheduler({EVENTS_LANE: 1, LOGS_LANE: 1})
+    for _ in range(20):
+        async with scheduler.turn(EVENTS_LANE):
+            await asyncio.sleep(0.001)
+
+    order = []
+
+    async def run(lane: str) -> None:
+        for _ in range(4):
+            async with scheduler.turn(lane):
+                order.append(lane)
+                await asyncio.sleep(0.001)
+
+    await asyncio.gather(run(LOGS_LANE), run(EVENTS_LANE))
+
+    # Logs were idle while events ran alone, so they alternate rather than run four times in a row.
+    assert order[:4] != [LOGS_LANE] * 4
+    assert order.count(LOGS_LANE) == order.count(EVENTS_LANE) == 4
+
+
+async def test_cancelled_waiter_is_removed():
+    scheduler = LaneScheduler({EVENTS_LANE: 1, LOGS_LANE: 1})
+    release = asyncio.Event()
+
+    async def hold() -> None:
+        async with scheduler.turn(EVENTS_LANE):
+            await release.wait()
+
+    async def wait_turn() -> None:
+        async with scheduler.turn(LOGS_LANE):
+            pass
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(wait_turn())
+    await asyncio.sleep(0)
+    assert scheduler.stats()[LOGS_LANE]["waiting"] == 1
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.stats()[LOGS_LANE]["waiting"] == 0
+
+    release.set()
+    await holder
+    async with scheduler.turn(LOGS_LANE):
+        pass
+    assert scheduler.stats()[LOGS_LANE]["turns"] == 1
+
+
+async def test_cancel_after_grant_passes_the_turn_on():
+    scheduler = LaneScheduler({EVENTS_LANE: 1, LOGS_LANE: 1})
+    release = asyncio.Event()
+
+    async def hold() -> None:
+        async with scheduler.turn(EVENTS_LANE):
+            await release.wait()
+
+    async def wait_turn(lane: str) -> None:
+        async with scheduler.turn(lane):
+            pass
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    granted = asyncio.create_task(wait_turn(LOGS_LANE))
+    other = asyncio.create_task(wait_turn(EVENTS_LANE))
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    # The turn went to the logs waiter, which has not resumed yet.
+    assert holder.done()
+    assert scheduler.stats()[LOGS_LANE]["waiting"] == 0
+    granted.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await granted
+    await asyncio.wait_for(other, 1)
+
+
+async def test_unknown_lane_and_bad_weights_are_rejected():
+    scheduler = LaneScheduler({EVENTS_LANE: 1})
+    with pytest.raises(KeyError):
+        async with scheduler.turn("bulk"):
+            pass
+    with pytest.raises(ValueError):
+        LaneScheduler({EVENTS_LANE: 0})
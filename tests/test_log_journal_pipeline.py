@@ -17,8 +17,8 @@ async def test_log_journal_consumer_writes_and_emits(monkeypatch):
 
     calls = {"db": 0, "socket": 0}
 
-    async def fake_insert_log_journal(db_conn, p):
-        assert p is payload
+    async def fake_insert_log_journals(db_conn, batch):
+        assert batch == [payload]
         calls["db"] += 1
 
     async def fake_emit_socket(p):
@@ -26,7 +26,7 @@ async def test_log_journal_consumer_writes_and_emits(monkeypatch):
         calls["socket"] += 1
         raise asyncio.CancelledError()
 
-    monkeypatch.setattr("app.loggers.log_journal_pipeline.insert_log_journal", fake_insert_log_journal)
+    monkeypatch.setattr("app.loggers.log_journal_pipeline.insert_log_journals", fake_insert_log_journals)
 
     task = asyncio.create_task(
         log_journal_consumer(queue=q, db_conn=object(), emit_socket=fake_emit_socket)
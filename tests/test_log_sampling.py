@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import pytest
+
+from app.loggers.log_journal_handler import LogJournalQueueHandler
+from app.loggers.log_sampling import ECHO_ATTR, LogSampler, SamplingPolicy
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _record(msg="hello", name="lib", level=logging.INFO, **extra):
+    record = logging.LogRecord(name=name, level=level, pathname=__file__, lineno=1, msg=msg, args=(), exc_info=None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_rate_limit_applies_to_logger_prefix_and_spares_warnings():
+    clock = _Clock()
+    sampler = LogSampler(SamplingPolicy(rate_limits={"uvicorn": 2, "noisy": 0}), clock=clock)
+
+    kept = [sampler.admit(_record(f"m{i}", name="uvicorn.access")) for i in range(5)]
+    assert kept == [True, True, False, False, False]
+    assert sampler.admit(_record("boom", name="uvicorn.access", level=logging.ERROR))
+    assert not sampler.admit(_record("x", name="noisy"))
+    assert sampler.admit(_record("x", name="other"))
+
+    clock.now = 1.0
+    assert sampler.admit(_record("later", name="uvicorn.access"))
+    assert sampler.stats()["rate_limited"] == 4
+
+
+def test_level_sampling_keeps_every_nth_record():
+    sampler = LogSampler(SamplingPolicy(sample_rates={"DEBUG": 0.25}))
+    kept = [sampler.admit(_record(f"m{i}", level=logging.DEBUG)) for i in range(8)]
+    assert kept.count(True) == 2
+    assert all(sampler.admit(_record(f"i{i}")) for i in range(3))
+
+
+def test_dedup_collapses_repeats_into_summary():
+    clock = _Clock()
+    sampler = LogSampler(SamplingPolicy(dedup_window=1.0), clock=clock)
+
+    assert sampler.admit(_record())
+    assert not sampler.admit(_record())
+    assert not sampler.admit(_record())
+    assert sampler.admit(_record("different"))
+    assert sampler.expired() == []
+
+    clock.now = 1.5
+    summaries = sampler.expired()
+    assert [(r.getMessage(), n) for r, n in summaries] == [("hello", 2)]
+    assert not sampler.pending_repeats()
+
+
+def test_echo_records_can_be_skipped():
+    sampler = LogSampler(SamplingPolicy(skip_event_echo=True))
+    assert not sampler.admit(_record(**{ECHO_ATTR: True}))
+    assert sampler.admit(_record())
+    assert sampler.stats()["echo_skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_handler_emits_repeat_summary_after_window():
+    loop = asyncio.get_running_loop()
+    q: asyncio.Queue = asyncio.Queue()
+    sampler = LogSampler(SamplingPolicy(dedup_window=0.05))
+    handler = LogJournalQueueHandler(loop=loop, queue=q, sampler=sampler)
+
+    for _ in range(4):
+        handler.emit(_record("again"))
+    await asyncio.sleep(0.15)
+
+    payloads = [q.get_nowait() for _ in range(q.qsize())]
+    assert [(p["message"], p["repeat_count"]) for p in payloads] == [("again", 1), ("again", 3)]
+    handler.close()
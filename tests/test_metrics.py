@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+
+from app.events import ChangeFileEvent
+from app.metrics import EVENTS_EMITTED, EVENTS_IN, Registry
+from app.overflow import OverflowGuard
+from app.pipeline import ENQUEUED_AT_KEY, events_consumer, make_enqueue
+
+
+def test_counter_and_histogram_render_prometheus_text():
+    registry = Registry()
+    counter = registry.counter("x_total", "Things.", ("kind",))
+    hist = registry.histogram("x_seconds", "Latency.")
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    hist.observe(0.0007)
+    hist.observe(20.0)
+
+    text = registry.render()
+    assert "# TYPE x_total counter" in text
+    assert 'x_total{kind="a"} 3' in text
+    assert 'x_seconds_bucket{le="0.0005"} 0' in text
+    assert 'x_seconds_bucket{le="0.001"} 1' in text
+    assert 'x_seconds_bucket{le="+Inf"} 2' in text
+    assert "x_seconds_count 2" in text
+    assert hist.count() == 2
+
+
+def test_callback_metric_and_label_escaping():
+    registry = Registry()
+    registry.callback("q_depth", "Depth.", ("queue",), lambda: [(('ev"ents',), 4)])
+    assert 'q_depth{queue="ev\\"ents"} 4' in registry.render()
+
+
+@pytest.mark.asyncio
+async def test_overflow_guard_tracks_high_water_and_drops_per_label():
+    q: asyncio.Queue = asyncio.Queue(maxsize=2)
+    guard = OverflowGuard(queue=q, policy="drop-newest", warn_on_drop=False)
+    for event in ("created", "modified", "deleted", "deleted"):
+        guard.put({"event": event, "src_path": event})
+    assert guard.high_water == 2
+    assert guard.dropped_by == {"deleted": 2}
+
+
+@pytest.mark.asyncio
+async def test_enqueue_stamp_is_consumed_before_emit(monkeypatch):
+    q: asyncio.Queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    before_in = EVENTS_IN.value("created")
+    before_emitted = EVENTS_EMITTED.value("created")
+
+    make_enqueue(loop=loop, queue=q)(ChangeFileEvent(event="created", src_path="a", dest_path=None, is_directory=False))
+    await asyncio.sleep(0)
+    assert ENQUEUED_AT_KEY in q._queue[0]
+
+    async def fake_insert(db_conn, batch):
+        return None
+
+    emitted = []
+
+    async def emit(payload):
+        emitted.append(payload)
+
+    monkeypatch.setattr("app.pipeline.insert_change_logs", fake_insert)
+    task = asyncio.create_task(events_consumer(queue=q, db_conn=None, emit_socket=emit))
+    await q.join()
+    task.cancel()
+
+    assert ENQUEUED_AT_KEY not in emitted[0]
+    assert EVENTS_IN.value("created") == before_in + 1
+    assert EVENTS_EMITTED.value("created") == before_emitted + 1
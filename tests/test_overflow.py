@@ -0,0 +1,145 @@
+import asyncio
+import pytest
+
+from app.overflow import OverflowGuard, SpillLog
+
+
+def _p(n, path=None):
+    return {"n": n, "src_path": path or f"f{n}"}
+
+
+@pytest.mark.asyncio
+async def test_drop_newest_and_drop_oldest():
+    q: asyncio.Queue = asyncio.Queue(maxsize=2)
+    guard = OverflowGuard(queue=q, policy="drop-newest", warn_on_drop=False)
+    for i in range(4):
+        guard.put(_p(i))
+    assert [q.get_nowait()["n"] for _ in range(2)] == [0, 1]
+    assert guard.dropped == 2
+
+    q = asyncio.Queue(maxsize=2)
+    guard = OverflowGuard(queue=q, policy="drop-oldest", warn_on_drop=False)
+    for i in range(4):
+        guard.put(_p(i))
+    assert [q.get_nowait()["n"] for _ in range(2)] == [2, 3]
+    assert guard.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_keeps_latest_per_key_and_replays():
+    q: asyncio.Queue = asyncio.Queue(maxsize=1)
+    guard = OverflowGuard(queue=q, policy="coalesce")
+    task = asyncio.create_task(guard.run())
+
+    guard.put(_p(0, "a"))
+    guard.put(_p(1, "b"))
+    guard.put(_p(2, "b"))
+    guard.put(_p(3, "c"))
+
+    received = []
+    for _ in range(2):
+        received.append((await q.get())["n"])
+        q.task_done()
+
+    task.cancel()
+    assert received == [0, 2]
+    assert guard.coalesced == 1
+    assert guard.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_spill_replays_in_order(tmp_path):
+    q: asyncio.Queue = asyncio.Queue(maxsize=2)
+    spill = SpillLog(str(tmp_path / "spill"), segment_bytes=64)
+    guard = OverflowGuard(queue=q, policy="spill", spill=spill)
+    task = asyncio.create_task(guard.run())
+
+    for i in range(20):
+        guard.put(_p(i))
+    assert guard.spilled == 18
+
+    received = []
+    for _ in range(20):
+        received.append((await q.get())["n"])
+
+    task.cancel()
+    assert received == list(range(20))
+    assert guard.dropped == 0
+    assert guard.backlog() == 0
+    assert len(list((tmp_path / "spill").iterdir())) <= 1
+    guard.close()
+
+
+def test_spill_log_survives_restart(tmp_path):
+    spill = SpillLog(str(tmp_path))
+    spill.append({"n": 1})
+    spill.append({"n": 2})
+    spill.close()
+
+    reopened = SpillLog(str(tmp_path))
+    assert len(reopened) == 2
+    reopened.append({"n": 3})
+    assert [reopened.pop()["n"] for _ in range(3)] == [1, 2, 3]
+    assert reopened.pop() is None
+
+
+@pytest.mark.asyncio
+async def test_spill_skips_torn_line_and_replays_leftovers_on_start(tmp_path):
+    spill = SpillLog(str(tmp_path))
+    spill.append({"n": 1})
+    spill.close()
+    segment = next(tmp_path.iterdir())
+    with open(segment, "a", encoding="utf-8") as f:
+        f.write('{"n": 2, "src_pa')  # crash mid-write
+
+    q: asyncio.Queue = asyncio.Queue(maxsize=10)
+    guard = OverflowGuard(queue=q, policy="spill", spill=SpillLog(str(tmp_path)))
+    task = asyncio.create_task(guard.run())
+    try:
+        assert (await asyncio.wait_for(q.get(), 1))["n"] == 1
+        guard.put(_p(3))
+        assert (await asyncio.wait_for(q.get(), 1))["n"] == 3
+    finally:
+        task.cancel()
+        guard.close()
+    assert guard.stats()["spill_corrupt"] == 1
+    assert guard.backlog() == 0
+
+
+@pytest.mark.asyncio
+async def test_spill_does_not_replay_delivered_payloads_after_restart(tmp_path):
+    q: asyncio.Queue = asyncio.Queue(maxsize=1)
+    guard = OverflowGuard(queue=q, policy="spill", spill=SpillLog(str(tmp_path)))
+    task = asyncio.create_task(guard.run())
+    try:
+        for i in range(5):
+            guard.put(_p(i))
+        got = [(await asyncio.wait_for(q.get(), 1))["n"] for _ in range(5)]
+    finally:
+        task.cancel()
+        guard.close()
+    assert got == [0, 1, 2, 3, 4]
+
+    reopened = SpillLog(str(tmp_path))
+    assert len(reopened) == 0
+    assert reopened.pop() is None
+
+
+def test_spill_resumes_a_partial_drain_from_the_checkpoint(tmp_path):
+    spill = SpillLog(str(tmp_path))
+    for n in range(4):
+        spill.append({"n": n})
+    assert [spill.pop()["n"] for _ in range(2)] == [0, 1]
+    spill.close()
+
+    reopened = SpillLog(str(tmp_path))
+    assert len(reopened) == 2
+    assert [reopened.pop()["n"] for _ in range(2)] == [2, 3]
+    assert reopened.pop() is None
+    reopened.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        OverflowGuard(queue=asyncio.Queue(), policy="block")
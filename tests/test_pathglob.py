@@ -0,0 +1,20 @@
+from app.pathglob import compile_glob, glob_literal_prefix, normalize_path, split_path
+
+
+def test_normalize_and_split_path():
+    assert normalize_path("\\watch\\a\\\\b\\") == "/watch/a/b"
+    assert split_path("/") == [""]
+    assert split_path("/watch/a") == ["", "watch", "a"]
+
+
+def test_compile_glob_star_does_not_cross_separator():
+    assert compile_glob("/w/*/x.txt").match("/w/a/x.txt")
+    assert not compile_glob("/w/*/x.txt").match("/w/a/b/x.txt")
+    assert compile_glob("/w/**/x.txt").match("/w/a/b/x.txt")
+    assert compile_glob("/w/**/x.txt").match("/w/x.txt")
+    assert compile_glob("**/*.sw[!x]").match("/w/.a.swp")
+
+
+def test_glob_literal_prefix():
+    assert glob_literal_prefix("/w/logs/*.log") == ["", "w", "logs"]
+    assert glob_literal_prefix("**/build") == []
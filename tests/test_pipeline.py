@@ -2,7 +2,7 @@ import asyncio
 import pytest
 
 from app.events import ChangeFileEvent
-from app.pipeline import make_enqueue, events_consumer  # :contentReference[oaicite:5]{index=5}
+from app.pipeline import EventCoalescer, make_enqueue, events_consumer  # :contentReference[oaicite:5]{index=5}
 
 
 @pytest.mark.asyncio
@@ -36,8 +36,8 @@ async def test_events_consumer_calls_db_and_socket(monkeypatch):
 
     calls = {"db": 0, "socket": 0}
 
-    async def fake_insert_change_log(db_conn, p):
-        assert p is payload
+    async def fake_insert_change_logs(db_conn, batch):
+        assert batch == [payload]
         calls["db"] += 1
 
     async def fake_emit_socket(p):
@@ -45,7 +45,7 @@ async def test_events_consumer_calls_db_and_socket(monkeypatch):
         calls["socket"] += 1
         raise asyncio.CancelledError()
 
-    monkeypatch.setattr("app.pipeline.insert_change_log", fake_insert_change_log)
+    monkeypatch.setattr("app.pipeline.insert_change_logs", fake_insert_change_logs)
 
     task = asyncio.create_task(events_consumer(queue=q, db_conn=object(), emit_socket=fake_emit_socket))
 
@@ -54,3 +54,182 @@ async def test_events_consumer_calls_db_and_socket(monkeypatch):
 
     assert calls["db"] == 1
     assert calls["socket"] == 1
+
+
+@pytest.mark.asyncio
+async def test_events_consumer_writes_batch_in_one_call(monkeypatch):
+    q: asyncio.Queue = asyncio.Queue()
+    payloads = [
+        {"event": "modified", "src_path": f"f{i}", "dest_path": None, "is_directory": False, "timestamp_utc": "x"}
+        for i in range(5)
+    ]
+    for p in payloads:
+        await q.put(p)
+
+    batches = []
+    emitted = []
+
+    async def fake_insert_change_logs(db_conn, batch):
+        batches.append(list(batch))
+
+    async def fake_emit_socket(p):
+        emitted.append(p)
+
+    monkeypatch.setattr("app.pipeline.insert_change_logs", fake_insert_change_logs)
+
+    task = asyncio.create_task(
+        events_consumer(queue=q, db_conn=object(), emit_socket=fake_emit_socket, batch_size=10, flush_interval=0.01)
+    )
+    await q.join()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert batches == [payloads]
+    assert emitted == payloads
+
+
+@pytest.mark.asyncio
+async def test_events_consumer_isolates_bad_rows_and_failed_emits(monkeypatch):
+    q: asyncio.Queue = asyncio.Queue()
+    payloads = [
+        {"event": "modified", "src_path": f"f{i}", "dest_path": None, "is_directory": False, "timestamp_utc": "x"}
+        for i in range(4)
+    ]
+    for p in payloads:
+        await q.put(p)
+
+    stored = []
+    emitted = []
+
+    async def fake_insert_change_logs(db_conn, batch):
+        if any(p["src_path"] == "f1" for p in batch):
+            raise ValueError("bad row")
+        stored.extend(p["src_path"] for p in batch)
+        return list(range(len(stored) - len(batch) + 1, len(stored) + 1))
+
+    async def fake_emit_socket(p):
+        if p["src_path"] == "f2":
+            raise RuntimeError("socket down")
+        emitted.append((p["src_path"], p["seq"]))
+
+    monkeypatch.setattr("app.pipeline.insert_change_logs", fake_insert_change_logs)
+
+    task = asyncio.create_task(
+        events_consumer(queue=q, db_conn=object(), emit_socket=fake_emit_socket, batch_size=10, flush_interval=0.01)
+    )
+    await q.join()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert stored == ["f0", "f2", "f3"]
+    assert emitted == [("f0", 1), ("f3", 3)]
+
+
+def _evt(event, src, dest=None):
+    return {"event": event, "src_path": src, "dest_path": dest, "is_directory": False, "timestamp_utc": "x"}
+
+
+def _coalesce(events):
+    out = []
+    coalescer = EventCoalescer(loop=asyncio.get_running_loop(), sink=out.append, quiet_window=10)
+    for e in events:
+        coalescer.push(e)
+    coalescer.flush()
+    return out, coalescer.stats()
+
+
+@pytest.mark.asyncio
+async def test_coalescer_collapses_editor_save():
+    out, stats = _coalesce([_evt("created", "a"), _evt("modified", "a"), _evt("modified", "a")])
+
+    assert [(p["event"], p["src_path"]) for p in out] == [("created", "a")]
+    assert stats == {"received": 3, "emitted": 1, "merged": 2, "pending": 0}
+
+
+@pytest.mark.asyncio
+async def test_coalescer_cancels_create_delete_pair():
+    out, stats = _coalesce([_evt("created", "tmp"), _evt("modified", "tmp"), _evt("deleted", "tmp")])
+
+    assert out == []
+    assert stats["merged"] == 3
+
+
+@pytest.mark.asyncio
+async def test_coalescer_folds_temp_file_and_move_chains():
+    out, _ = _coalesce([
+        _evt("created", "a.tmp"),
+        _evt("moved", "a.tmp", "a"),
+        _evt("moved", "b", "c"),
+        _evt("moved", "c", "d"),
+        _evt("moved", "x", "y"),
+        _evt("moved", "y", "x"),
+    ])
+
+    assert [(p["event"], p["src_path"], p["dest_path"]) for p in out] == [
+        ("created", "a.tmp", None),
+        ("moved", "a.tmp", "a"),
+        ("moved", "b", "d"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_coalescer_folds_temp_file_onto_known_destination():
+    out, _ = _coalesce([
+        _evt("modified", "a"),
+        _evt("created", "a.tmp"),
+        _evt("moved", "a.tmp", "a"),
+        _evt("created", "b"),
+        _evt("created", "b.tmp"),
+        _evt("moved", "b.tmp", "b"),
+    ])
+
+    assert [(p["event"], p["src_path"], p["dest_path"]) for p in out] == [
+        ("modified", "a", None),
+        ("created", "b", None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_coalescer_folds_atomic_save_after_destination_was_emitted():
+    out = []
+    coalescer = EventCoalescer(loop=asyncio.get_running_loop(), sink=out.append, quiet_window=10)
+    coalescer.push(_evt("modified", "a"))
+    coalescer.flush()
+    coalescer.push(_evt("created", "a.tmp"))
+    coalescer.push(_evt("moved", "a.tmp", "a"))
+    coalescer.flush()
+
+    assert [(p["event"], p["src_path"]) for p in out] == [("modified", "a"), ("modified", "a")]
+
+
+@pytest.mark.asyncio
+async def test_coalescer_flushes_after_quiet_window():
+    out = []
+    coalescer = EventCoalescer(loop=asyncio.get_running_loop(), sink=out.append, quiet_window=0.01)
+    coalescer.push(_evt("modified", "a"))
+    coalescer.push(_evt("modified", "b"))
+    coalescer.push(_evt("modified", "a"))
+
+    assert out == []
+    await asyncio.sleep(0.05)
+
+    assert sorted(p["src_path"] for p in out) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_coalescer_busy_path_does_not_hold_back_quiet_ones():
+    out = []
+    coalescer = EventCoalescer(
+        loop=asyncio.get_running_loop(), sink=out.append, quiet_window=0.02, max_hold=10
+    )
+    coalescer.push(_evt("modified", "busy"))
+    coalescer.push(_evt("modified", "quiet"))
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+        coalescer.push(_evt("modified", "busy"))
+
+    assert [p["src_path"] for p in out] == ["quiet"]
+    coalescer.flush()
+    assert [p["src_path"] for p in out] == ["quiet", "busy"]
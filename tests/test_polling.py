@@ -0,0 +1,139 @@
+import os
+
+from app.polling import DirectoryIndex, index_file_for
+
+
+def _kinds(events):
+    return sorted((e.event_type, e.is_directory, os.path.basename(e.src_path), os.path.basename(e.dest_path or "")) for e in events)
+
+
+def test_directory_index_detects_create_modify_move_delete(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_text("1")
+
+    index = DirectoryIndex(str(tmp_path))
+    index.build()
+    assert index.poll() == []
+
+    (tmp_path / "sub" / "b.txt").write_text("new")
+    assert ("created", False, "b.txt", "") in _kinds(index.poll())
+
+    (tmp_path / "sub" / "a.txt").write_text("changed")
+    assert _kinds(index.poll()) == [("modified", False, "a.txt", "")]
+
+    os.rename(tmp_path / "sub" / "b.txt", tmp_path / "sub" / "c.txt")
+    assert ("moved", False, "b.txt", "c.txt") in _kinds(index.poll())
+
+    (tmp_path / "sub" / "a.txt").unlink()
+    (tmp_path / "sub" / "c.txt").unlink()
+    (tmp_path / "sub").rmdir()
+    kinds = _kinds(index.poll())
+    assert ("deleted", True, "sub", "") in kinds
+    assert ("deleted", False, "a.txt", "") in kinds
+
+
+def test_directory_index_skips_listing_unchanged_dirs(tmp_path, monkeypatch):
+    (tmp_path / "a.txt").write_text("1")
+    index = DirectoryIndex(str(tmp_path))
+    index.build()
+
+    monkeypatch.setattr("app.polling.RACY_WINDOW_NS", -10**18)
+    listed = []
+    real_scandir = os.scandir
+    monkeypatch.setattr("app.polling.os.scandir", lambda p: listed.append(p) or real_scandir(p))
+
+    with open(tmp_path / "a.txt", "a") as f:
+        f.write("more")
+
+    assert _kinds(index.poll()) == [("modified", False, "a.txt", "")]
+    assert listed == []
+
+
+def test_directory_index_persists_and_reports_offline_changes(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a.txt").write_text("1")
+
+    index = DirectoryIndex(str(root))
+    index.build()
+    index_file = index_file_for(str(tmp_path), str(root))
+    index.save(index_file)
+
+    (root / "b.txt").write_text("2")
+
+    restored = DirectoryIndex(str(root))
+    assert restored.load(index_file)
+    assert restored.file_count() == 1
+    assert ("created", False, "b.txt", "") in _kinds(restored.poll())
+
+
+def test_directory_index_rejects_index_of_other_root(tmp_path):
+    index = DirectoryIndex(str(tmp_path))
+    index.build()
+    index_file = str(tmp_path / "idx.json")
+    index.save(index_file)
+
+    assert not DirectoryIndex(str(tmp_path / "other")).load(index_file)
+
+
+def test_directory_index_does_not_descend_into_excluded_dirs(tmp_path, monkeypatch):
+    from app.filters import PathFilter
+
+    (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+    (tmp_path / "node_modules" / "pkg" / "index.js").write_text("x")
+    (tmp_path / "a.py").write_text("x")
+
+    index = DirectoryIndex(str(tmp_path), path_filter=PathFilter(str(tmp_path), exclude=["node_modules"]))
+    index.build()
+
+    assert len(index) == 1
+    assert index.file_count() == 1
+
+    (tmp_path / "node_modules" / "pkg" / "new.js").write_text("x")
+    assert index.poll() == []
+
+
+def test_adaptive_schedule_backs_off_quiet_dirs_and_snaps_back_on_change(tmp_path):
+    from app.polling import PollSchedule
+
+    (tmp_path / "hot").mkdir()
+    (tmp_path / "cold").mkdir()
+    index = DirectoryIndex(str(tmp_path), schedule=PollSchedule(min_interval=1, max_interval=8))
+    index.build()
+    hot, cold = str(tmp_path / "hot"), str(tmp_path / "cold")
+
+    now = 1000.0
+    for _ in range(5):
+        index.poll(now)
+        now += 8
+    assert index.intervals()[cold] == 8
+
+    (tmp_path / "hot" / "a.txt").write_text("1")
+    assert index.poll(now - 1) == []
+    assert ("created", False, "a.txt", "") in _kinds(index.poll(now))
+    assert index.intervals()[hot] == 1
+
+    # Only the hot dir is due a second later.
+    (tmp_path / "cold" / "b.txt").write_text("1")
+    assert index.poll(now + 1) == []
+    assert ("created", False, "b.txt", "") in _kinds(index.poll(now + 8))
+
+
+def test_stat_budget_defers_due_dirs_to_later_polls(tmp_path):
+    from app.polling import PollSchedule, StatBudget
+
+    for name in "abcd":
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "f").write_text("1")
+    budget = StatBudget(2)
+    index = DirectoryIndex(str(tmp_path), schedule=PollSchedule(min_interval=1, max_interval=1, budget=budget))
+    index.build()
+
+    for name in "abcd":
+        (tmp_path / name / "g").write_text("2")
+    seen = set()
+    now = budget._updated
+    for step in range(6):
+        seen.update(os.path.basename(os.path.dirname(e.src_path)) for e in index.poll(now + step) if not e.is_directory)
+    assert seen == set("abcd")
+    assert budget.deferred > 0
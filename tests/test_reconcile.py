@@ -0,0 +1,110 @@
+import asyncio
+import os
+
+import pytest
+
+from app.events import ChangeFileEvent
+from app.loggers.db_logger import init_db
+import app.reconcile
+from app.reconcile import Reconciler, diff_snapshots
+
+
+def test_diff_snapshots_orders_parents_and_skips_directory_mtimes():
+    old = {"/w/a": (True, 1, 0, 1), "/w/a/x": (False, 2, 1, 1), "/w/d": (True, 3, 0, 1), "/w/f": (False, 4, 1, 1)}
+    new = {"/w/a": (True, 1, 0, 9), "/w/a/x": (False, 2, 2, 2), "/w/n": (True, 5, 0, 1), "/w/n/y": (False, 6, 1, 1),
+           "/w/f": (True, 4, 0, 1)}
+
+    assert diff_snapshots(old, new) == [
+        ("deleted", "/w/d", True),
+        ("created", "/w/n", True),
+        ("created", "/w/n/y", False),
+        ("modified", "/w/a/x", False),
+        ("deleted", "/w/f", False),
+        ("created", "/w/f", True),
+    ]
+
+
+async def _reconcile(db_path, root, events):
+    reconciler = Reconciler(db_path=db_path, roots={root: None}, emit=events.append, workers=2, flush_interval=3600)
+    task = asyncio.create_task(reconciler.run())
+    for _ in range(200):
+        if reconciler.stats()["roots"][root]["state"] in ("done", "failed"):
+            break
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return reconciler
+
+
+@pytest.mark.asyncio
+async def test_reconciler_reports_offline_changes_against_saved_snapshot(tmp_path):
+    db_path = str(tmp_path / "h.db")
+    conn = await init_db(db_path)
+    root = str(tmp_path / "w")
+    os.makedirs(os.path.join(root, "sub"))
+    for name in ("keep", "gone", "edit"):
+        with open(os.path.join(root, "sub", name), "w") as f:
+            f.write("v1")
+
+    events = []
+    first = await _reconcile(db_path, root, events)
+    await first.close()
+    assert events == []
+    assert first.stats()["roots"][root]["entries"] == 4
+
+    os.remove(os.path.join(root, "sub", "gone"))
+    with open(os.path.join(root, "sub", "edit"), "w") as f:
+        f.write("v2-longer")
+    os.makedirs(os.path.join(root, "new"))
+
+    second = await _reconcile(db_path, root, events)
+    assert sorted((e.event, os.path.relpath(e.src_path, root)) for e in events) == [
+        ("created", "new"),
+        ("deleted", os.path.join("sub", "gone")),
+        ("modified", os.path.join("sub", "edit")),
+    ]
+
+    # A live change is written to the snapshot, so the next start does not report it again.
+    with open(os.path.join(root, "new", "live"), "w") as f:
+        f.write("x")
+    second.observe(ChangeFileEvent(event="created", src_path=os.path.join(root, "new", "live"), dest_path=None,
+                                   is_directory=False))
+    await second.close()
+
+    events.clear()
+    third = await _reconcile(db_path, root, events)
+    await third.close()
+    assert events == []
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_reconciler_saves_in_chunks_and_redoes_an_unfinished_baseline(tmp_path, monkeypatch):
+    monkeypatch.setattr(app.reconcile, "SAVE_CHUNK", 2)
+    db_path = str(tmp_path / "h.db")
+    conn = await init_db(db_path)
+    try:
+        root = str(tmp_path / "w")
+        os.makedirs(root)
+        for i in range(5):
+            with open(os.path.join(root, f"f{i}"), "w") as f:
+                f.write("v1")
+
+        events = []
+        await (await _reconcile(db_path, root, events)).close()
+        async with conn.execute("SELECT COUNT(*) FROM tree_snapshot WHERE root = ?", (root,)) as cur:
+            assert (await cur.fetchone())[0] == 6
+
+        # A save cut short before the root's row: the next start is a baseline, not 5 x "created".
+        await conn.execute("DELETE FROM tree_snapshot WHERE root = ? AND path IN (?, ?)",
+                           (root, root, os.path.join(root, "f0")))
+        await conn.commit()
+        os.remove(os.path.join(root, "f1"))
+        await (await _reconcile(db_path, root, events)).close()
+        assert events == []
+
+        os.remove(os.path.join(root, "f2"))
+        await (await _reconcile(db_path, root, events)).close()
+        assert [(e.event, os.path.basename(e.src_path)) for e in events] == [("deleted", "f2")]
+    finally:
+        await conn.close()
@@ -0,0 +1,58 @@
+import pytest
+
+from app.history import query_file_events
+from app.loggers.db_logger import init_db, insert_change_logs
+from app.replay import ReplayBuffer, read_gap
+
+
+def _evt(i, path=None):
+    return {"event": "created", "src_path": path or f"/w/f{i}", "dest_path": None, "is_directory": False,
+            "timestamp_utc": "2026-01-01T00:00:00.000+00:00"}
+
+
+def test_replay_buffer_covers_recent_gap_only():
+    buf = ReplayBuffer(3)
+    for seq in range(1, 6):
+        buf.append({**_evt(seq), "seq": seq})
+
+    assert buf.first_seq == 3
+    assert [p["seq"] for p in buf.since(3)] == [4, 5]
+    assert [p["seq"] for p in buf.since(2)] == [3, 4, 5]
+    assert buf.since(5) == []
+    assert buf.since(1) is None
+    assert ReplayBuffer(3).since(0) is None
+
+
+@pytest.mark.asyncio
+async def test_read_gap_falls_back_to_sqlite_and_reuses_buffer(tmp_path):
+    conn = await init_db(str(tmp_path / "r.db"))
+    ids = await insert_change_logs(conn, [_evt(i, "/w/skip" if i % 3 == 0 else None) for i in range(1, 11)])
+    assert list(ids) == list(range(1, 11))
+
+    buf = ReplayBuffer(4)
+    async with conn.execute("SELECT id, event, src_path, dest_path, is_directory, timestamp_utc FROM file_events") as cur:
+        for row in await cur.fetchall():
+            buf.append({"seq": row[0], "src_path": row[2]})
+
+    fetched = []
+
+    async def fetch(cursor, limit):
+        fetched.append(cursor)
+        return await query_file_events(conn, cursor=cursor, limit=limit, descending=False)
+
+    accept = lambda p: p["src_path"] != "/w/skip"
+
+    items, source, truncated = await read_gap(buf, fetch, 8, max_items=100, accept=accept)
+    assert (source, [p["seq"] for p in items], truncated) == ("memory", [10], False)
+    assert fetched == []
+
+    items, source, truncated = await read_gap(buf, fetch, 1, max_items=100, accept=accept)
+    assert source == "sqlite"
+    assert [p["seq"] for p in items] == [2, 4, 5, 7, 8, 10]
+    assert fetched == [1]
+
+    items, _, truncated = await read_gap(buf, fetch, 1, max_items=2, accept=accept)
+    assert [p["seq"] for p in items] == [2, 4]
+    assert truncated
+
+    await conn.close()
@@ -0,0 +1,172 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.loggers.db_logger import PartitionCatalog, PartitionedLane, init_db, insert_change_logs, insert_log_journals
+from app.loggers.retention import (
+    RetentionPolicy,
+    directory_of,
+    enforce_partition_retention,
+    enforce_retention,
+    hour_bucket,
+    open_maintenance_connection,
+    used_bytes,
+)
+
+NOW = datetime(2025, 1, 2, 12, 0, tzinfo=timezone.utc)
+
+
+def _ts(hours_ago: float) -> str:
+    return (NOW - timedelta(hours=hours_ago)).isoformat(timespec="milliseconds")
+
+
+def test_directory_of():
+    assert directory_of("/w/a/b.txt") == "/w/a"
+    assert directory_of("/b.txt") == "/"
+    assert directory_of("C:\\w\\b.txt") == "C:\\w"
+
+
+@pytest.mark.asyncio
+async def test_age_retention_rolls_up_and_deletes_in_chunks(tmp_path):
+    db_path = str(tmp_path / "r.db")
+    writer = await init_db(db_path)
+    await insert_change_logs(writer, [
+        {"event": "modified", "src_path": f"/w/a/{i}.txt", "dest_path": None, "is_directory": False,
+         "timestamp_utc": _ts(29.9 - (i % 2) * 0.1)}
+        for i in range(5)
+    ] + [
+        {"event": "created", "src_path": "/w/b/new.txt", "dest_path": None, "is_directory": False,
+         "timestamp_utc": _ts(1)},
+    ])
+    await insert_log_journals(writer, [
+        {"timestamp_utc": _ts(48), "level": "INFO", "message": "old", "logger_name": "x"},
+        {"timestamp_utc": _ts(0), "level": "INFO", "message": "new", "logger_name": "x"},
+    ])
+
+    conn = await open_maintenance_connection(db_path)
+    stats = await enforce_retention(conn, RetentionPolicy(max_age=timedelta(hours=24), chunk_size=2), now=NOW)
+
+    assert stats["file_events"] == 5
+    assert stats["log_journal"] == 1
+
+    async with conn.execute("SELECT src_path FROM file_events") as cur:
+        assert await cur.fetchall() == [("/w/b/new.txt",)]
+    async with conn.execute("SELECT hour_utc, directory, event, count FROM file_events_rollup") as cur:
+        assert await cur.fetchall() == [("2025-01-01T06:00:00+00:00", "/w/a", "modified", 5)]
+    async with conn.execute("SELECT level, logger_name, count FROM log_journal_rollup") as cur:
+        assert await cur.fetchall() == [("INFO", "x", 1)]
+
+    await conn.close()
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_size_retention_deletes_oldest_and_vacuums(tmp_path):
+    db_path = str(tmp_path / "r.db")
+    writer = await init_db(db_path)
+    await insert_log_journals(writer, [
+        {"timestamp_utc": _ts(0), "level": "INFO", "message": "x" * 500, "logger_name": "x"}
+        for _ in range(2000)
+    ])
+
+    conn = await open_maintenance_connection(db_path)
+    async with conn.execute("PRAGMA auto_vacuum") as cur:
+        assert (await cur.fetchone())[0] == 2
+
+    limit = (await used_bytes(conn)) // 2
+    stats = await enforce_retention(conn, RetentionPolicy(max_bytes=limit, chunk_size=100), now=NOW)
+
+    assert stats["log_journal"] > 0
+    assert stats["vacuumed_pages"] > 0
+    assert await used_bytes(conn) <= limit
+    async with conn.execute("SELECT MIN(id) FROM log_journal") as cur:
+        assert (await cur.fetchone())[0] == stats["log_journal"] + 1
+
+    await conn.close()
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_partition_retention_rolls_up_and_unlinks_whole_partitions(tmp_path):
+    db_path = str(tmp_path / "p.db")
+    await (await init_db(db_path)).close()
+    catalog = PartitionCatalog(db_path, "hour")
+    events = PartitionedLane("file_events", db_path, catalog)
+    logs = PartitionedLane("log_journal", db_path, catalog)
+    events.start()
+    logs.start()
+    try:
+        for hours_ago in (30, 29, 1):
+            await insert_change_logs(events, [
+                {"event": "modified", "src_path": f"/w/a/{i}.txt", "dest_path": None, "is_directory": False,
+                 "timestamp_utc": _ts(hours_ago)}
+                for i in range(3)
+            ])
+            if hours_ago == 30:
+                await insert_log_journals(logs, [
+                    {"timestamp_utc": _ts(30), "level": "INFO", "message": "old", "logger_name": "x",
+                     "repeat_count": 4},
+                ])
+    finally:
+        events.close()
+        logs.close()
+    assert len(catalog.keys()) == 3
+
+    conn = await open_maintenance_connection(db_path)
+    try:
+        policy = RetentionPolicy(max_age=timedelta(hours=24))
+        stats = await enforce_partition_retention(conn, catalog, policy, now=NOW)
+        assert stats == {"file_events": 6, "log_journal": 4, "partitions": 2}
+        assert catalog.keys() == [catalog.key_of(_ts(1))]
+        assert all(name.startswith(catalog.keys()[0]) for name in os.listdir(catalog.directory))
+
+        async with conn.execute("SELECT hour_utc, directory, event, count FROM file_events_rollup ORDER BY 1") as cur:
+            assert await cur.fetchall() == [
+                (hour_bucket(_ts(30)), "/w/a", "modified", 3),
+                (hour_bucket(_ts(29)), "/w/a", "modified", 3),
+            ]
+        async with conn.execute("SELECT level, logger_name, count FROM log_journal_rollup") as cur:
+            assert await cur.fetchall() == [("INFO", "x", 4)]
+
+        # The newest partition is kept for the writers even when it is past the cutoff.
+        stats = await enforce_partition_retention(conn, catalog, policy, now=NOW + timedelta(days=7))
+        assert stats["partitions"] == 0
+    finally:
+        await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_partition_retention_keeps_partitions_a_live_lane_is_still_on(tmp_path):
+    db_path = str(tmp_path / "p.db")
+    await (await init_db(db_path)).close()
+    catalog = PartitionCatalog(db_path, "hour")
+    events = PartitionedLane("file_events", db_path, catalog)
+    logs = PartitionedLane("log_journal", db_path, catalog)
+    events.start()
+    logs.start()
+    conn = await open_maintenance_connection(db_path)
+    try:
+        await insert_log_journals(logs, [
+            {"timestamp_utc": _ts(30), "level": "INFO", "message": "old", "logger_name": "x"},
+        ])
+        for hours_ago in (29, 1):
+            await insert_change_logs(events, [
+                {"event": "modified", "src_path": "/w/a/f.txt", "dest_path": None, "is_directory": False,
+                 "timestamp_utc": _ts(hours_ago)},
+            ])
+        assert (logs.current, events.current) == (catalog.key_of(_ts(30)), catalog.key_of(_ts(1)))
+
+        # The logs lane is still attached to the oldest partition and may move into the next one.
+        policy = RetentionPolicy(max_age=timedelta(hours=24))
+        stats = await enforce_partition_retention(conn, catalog, policy, now=NOW)
+        assert stats["partitions"] == 0
+        assert len(catalog.keys()) == 3
+
+        logs.close()
+        stats = await enforce_partition_retention(conn, catalog, policy, now=NOW)
+        assert stats["partitions"] == 2
+    finally:
+        events.close()
+        logs.close()
+        await conn.close()
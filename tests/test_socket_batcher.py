@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+import pytest
+
+from app.loggers.log_sampling import ECHO_ATTR
+from app.socket_batcher import SocketBatcher
+
+
+@pytest.mark.asyncio
+async def test_socket_batcher_emits_one_frame_per_window():
+    frames = []
+
+    async def emit_batch(batch):
+        frames.append(batch)
+
+    batcher = SocketBatcher(emit_batch=emit_batch, max_size=3, max_wait=0.01)
+    task = asyncio.create_task(batcher.run())
+
+    for i in range(4):
+        batcher.add({"n": i})
+    await asyncio.sleep(0.05)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert frames == [[{"n": 0}, {"n": 1}, {"n": 2}], [{"n": 3}]]
+
+
+@pytest.mark.asyncio
+async def test_socket_batcher_survives_emit_failure():
+    frames = []
+
+    async def emit_batch(batch):
+        frames.append(batch)
+        if len(frames) == 1:
+            raise RuntimeError("boom")
+
+    batcher = SocketBatcher(emit_batch=emit_batch, max_size=1, max_wait=0)
+    task = asyncio.create_task(batcher.run())
+
+    batcher.add({"n": 0})
+    batcher.add({"n": 1})
+    await asyncio.sleep(0.01)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert frames == [[{"n": 0}], [{"n": 1}]]
+
+
+@pytest.mark.asyncio
+async def test_socket_batcher_flush_emits_queued_items_before_cancel():
+    frames = []
+
+    async def emit_batch(batch):
+        frames.append(batch)
+
+    batcher = SocketBatcher(emit_batch=emit_batch, max_size=10, max_wait=0.02)
+    task = asyncio.create_task(batcher.run())
+    for i in range(3):
+        batcher.add({"n": i})
+
+    try:
+        assert await batcher.flush(1)
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert frames == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+
+
+@pytest.mark.asyncio
+async def test_socket_batcher_counts_drops_and_throttles_the_warning(caplog):
+    async def emit_batch(batch):
+        pass
+
+    batcher = SocketBatcher(emit_batch=emit_batch, max_size=1, max_wait=0, maxsize=1)
+    with caplog.at_level(logging.WARNING, logger="hawkeye-socket-batcher"):
+        for i in range(5):
+            batcher.add({"n": i})
+
+    assert batcher.stats() == {"queued": 1, "dropped": 4}
+    assert len(caplog.records) == 1
+    assert getattr(caplog.records[0], ECHO_ATTR) is True
@@ -0,0 +1,96 @@
+import pytest
+
+from app.subscriptions import Subscription, SubscriptionIndex, SubscriptionRouter
+
+
+def _evt(src, event="modified", dest=None):
+    return {"event": event, "src_path": src, "dest_path": dest, "is_directory": False}
+
+
+def test_subscription_from_dict_normalizes():
+    sub = Subscription.from_dict({"paths": "\\watch\\a\\", "events": ["created"], "levels": ["warning"]})
+
+    assert sub.paths == ("/watch/a",)
+    assert sub.events == frozenset({"created"})
+    assert sub.levels == frozenset({"WARNING"})
+    assert sub.key() == Subscription.from_dict({"paths": ["/watch/a"], "events": "created", "levels": "WARNING"}).key()
+
+
+@pytest.mark.parametrize("data", [{"paths": 5}, {"events": {"created": 1}}, {"globs": ["*.log", 3]}])
+def test_subscription_from_dict_rejects_non_string_lists(data):
+    with pytest.raises(ValueError):
+        Subscription.from_dict(data)
+
+
+def test_index_prunes_empty_nodes_on_remove():
+    index = SubscriptionIndex()
+    index.add("deep", Subscription(paths=("/w/a/b/c",), globs=("/w/a/x/*.log",)))
+    index.add("shallow", Subscription(paths=("/w/a",)))
+
+    index.remove("deep")
+    node = index._node(["", "w", "a"])
+    assert node is not None and node.children == {}
+
+    index.remove("shallow")
+    assert index._root.children == {}
+
+
+def test_index_routes_by_prefix_glob_and_event_type():
+    index = SubscriptionIndex()
+    index.add("all", Subscription())
+    index.add("a", Subscription(paths=("/w/a",)))
+    index.add("a-created", Subscription(paths=("/w/a",), events=frozenset({"created"})))
+    index.add("logs", Subscription(globs=("/w/**/*.log",)))
+
+    assert index.match_file_event(_evt("/w/a/x.txt")) == {"all", "a"}
+    assert index.match_file_event(_evt("/w/a/x.txt", "created")) == {"all", "a", "a-created"}
+    assert index.match_file_event(_evt("/w/ab/x.txt")) == {"all"}
+    assert index.match_file_event(_evt("/w/b/c/run.log")) == {"all", "logs"}
+    assert index.match_file_event(_evt("/w/b/x", "moved", "/w/a/x")) == {"all", "a"}
+
+    index.remove("a")
+    assert index.match_file_event(_evt("/w/a/x.txt")) == {"all"}
+
+
+def test_index_routes_logs_by_level():
+    index = SubscriptionIndex()
+    index.add("all", Subscription())
+    index.add("errors", Subscription(levels=frozenset({"ERROR"})))
+    index.add("files-only", Subscription(paths=("/w",), levels=frozenset()))
+
+    assert index.match_log({"level": "INFO"}) == {"all"}
+    assert index.match_log({"level": "ERROR"}) == {"all", "errors"}
+
+
+def test_router_shares_rooms_between_identical_filters():
+    router = SubscriptionRouter()
+    sub = Subscription(paths=("/w/a",))
+
+    _, room1 = router.attach("s1", "event", sub)
+    _, room2 = router.attach("s2", "event", sub)
+    assert room1 == room2
+    assert SubscriptionRouter.room_mode(room1) == "event"
+
+    router.detach("s1")
+    assert router.rooms_for_file_event(_evt("/w/a/x")) == {room1}
+
+    old, room3 = router.attach("s2", "batch", sub)
+    assert old == room1
+    assert router.rooms_for_file_event(_evt("/w/a/x")) == {room3}
+
+
+def test_router_keeps_wire_formats_in_separate_rooms():
+    router = SubscriptionRouter()
+    sub = Subscription.from_dict({"paths": ["/w"]})
+    _, json_room = router.attach("a", "event", sub)
+    _, compact_room = router.attach("b", "event", sub, "compact")
+
+    assert json_room != compact_room
+    assert SubscriptionRouter.room_wire(json_room) == "json"
+    assert SubscriptionRouter.room_wire(compact_room) == "compact"
+    assert SubscriptionRouter.room_mode(compact_room) == "event"
+    assert router.members(compact_room) == {"b"}
+
+    router.detach("b")
+    assert router.members(compact_room) == set()
+    assert router.rooms_for_file_event({"event": "created", "src_path": "/w/x"}) == {json_room}
@@ -1,5 +1,10 @@
 import types
-from app.watcher import _parse_watch_dirs, HawkeyWatcher  # :contentReference[oaicite:10]{index=10}
+
+from watchdog.events import FileCreatedEvent, FileMovedEvent
+
+from app.events import EventEmitter
+from app.filters import PathFilter
+from app.watcher import _FileCoreHandler, _parse_watch_dirs, HawkeyWatcher  # :contentReference[oaicite:10]{index=10}
 
 
 def test_parse_watch_dirs():
@@ -30,4 +35,92 @@ def test_watcher_start_schedules_only_existing(monkeypatch):
     w = HawkeyWatcher(watch_dirs=["ok", "missing"], recursive=True)
     w.start()
 
+    assert w.wait_ready(5)
     assert scheduled == [("ok", True)]
+    assert {d: s["state"] for d, s in w.status()["dirs"].items()} == {"ok": "watching", "missing": "missing"}
+
+
+def test_watcher_polls_dirs_that_exceed_the_inotify_budget(tmp_path, monkeypatch):
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+    polled = []
+
+    class FakePollingObserver:
+        def schedule(self, handler, path, recursive=True):
+            polled.append(path)
+
+        def start(self):
+            pass
+
+        def is_alive(self):
+            return True
+
+        def stop(self):
+            pass
+
+    monkeypatch.setattr("app.watcher.inotify_watch_limit", lambda: 2)
+    monkeypatch.setattr("app.watcher._make_observer", lambda *args: FakePollingObserver())
+
+    w = HawkeyWatcher(watch_dirs=[str(tmp_path)], recursive=True)
+    w.start()
+
+    assert w.wait_ready(5)
+    assert polled == [str(tmp_path)]
+    assert w.status()["dirs"][str(tmp_path)]["state"] == "polling"
+    w.stop()
+
+
+def test_failed_native_watch_returns_its_inotify_budget(tmp_path, monkeypatch):
+    (tmp_path / "a").mkdir()
+
+    class FailingObserver:
+        def start(self):
+            pass
+
+        def schedule(self, handler, path, recursive=True):
+            raise OSError("inotify_add_watch failed")
+
+        def stop(self):
+            pass
+
+    class FakePollingObserver(FailingObserver):
+        def schedule(self, handler, path, recursive=True):
+            pass
+
+        def is_alive(self):
+            return False
+
+    monkeypatch.setattr("app.watcher.inotify_watch_limit", lambda: 100)
+    monkeypatch.setattr("app.watcher.Observer", FailingObserver)
+    monkeypatch.setattr("app.watcher._make_observer", lambda *args: FakePollingObserver())
+
+    w = HawkeyWatcher(watch_dirs=[str(tmp_path)], recursive=True)
+    w.start()
+
+    assert w.wait_ready(5)
+    assert w.status()["dirs"][str(tmp_path)]["state"] == "polling"
+    assert w._budget.remaining == 100
+    w.stop()
+
+
+def test_dirs_skipped_while_stopping_still_complete_readiness(tmp_path):
+    w = HawkeyWatcher(watch_dirs=[str(tmp_path)], recursive=True)
+    w.stop()
+    w.start()
+
+    assert w.wait_ready(5)
+    assert w.status()["dirs"][str(tmp_path)]["state"] == "stopped"
+
+
+def test_handler_drops_excluded_events_before_emitting():
+    emitter = EventEmitter()
+    seen = []
+    emitter.add(lambda e: seen.append(e.src_path))
+    handler = _FileCoreHandler(emitter, PathFilter("/w", exclude=[".git", "*.swp"]))
+
+    handler.on_created(FileCreatedEvent("/w/.git/index"))
+    handler.on_created(FileCreatedEvent("/w/a.swp"))
+    handler.on_created(FileCreatedEvent("/w/a.txt"))
+    handler.on_moved(FileMovedEvent("/w/a.swp", "/w/a"))
+
+    assert seen == ["/w/a.txt", "/w/a.swp"]
@@ -0,0 +1,62 @@
+import json
+import pytest
+
+from app.wire import WireEncoder, decode_frame, expand_file_frame, negotiate_wire
+
+
+def _events(n, root="/watched/project/src/module"):
+    return [
+        {"event": "modified", "src_path": f"{root}/file{i}.py", "dest_path": None, "is_directory": False,
+         "timestamp_utc": "2026-01-01T00:00:00.000+00:00"}
+        for i in range(n)
+    ]
+
+
+def test_negotiate_falls_back_to_json():
+    assert negotiate_wire("compact") == "compact"
+    assert negotiate_wire("bogus") == "json"
+    assert negotiate_wire(None) == "json"
+
+
+def test_compact_frames_send_each_prefix_once_and_round_trip():
+    encoder = WireEncoder("compact")
+    table = {}
+
+    first = encoder.encode_file_events(_events(1))
+    assert first["p"] == [[0, "/watched/project/src/module/"]]
+    second = encoder.encode_file_events(_events(2))
+    assert "p" not in second
+
+    moved = {"event": "moved", "src_path": "/a/x", "dest_path": "/b/y", "is_directory": True, "seq": 9,
+             "timestamp_utc": "t", "size": 3, "_enqueued_at": 1.0}
+    third = encoder.encode_file_events([moved])
+
+    decoded = [expand_file_frame(f, table) for f in (first, second, third)]
+    assert decoded[1] == _events(2)
+    assert decoded[2] == [{k: v for k, v in moved.items() if k != "_enqueued_at"}]
+
+    plain = len(json.dumps(_events(50)))
+    compact = len(json.dumps(encoder.encode_file_events(_events(50))))
+    assert compact < plain / 2
+
+
+def test_compressed_batch_frames_and_prefix_reset():
+    encoder = WireEncoder("compact", compress=True, max_prefixes=4)
+    frame = encoder.encode_file_events(_events(200), batch=True)
+    assert isinstance(frame, bytes) and frame[0] == 1
+    decoded = decode_frame(frame, "compact")
+    assert len(decoded["e"]) == 200
+    assert "r" in decoded
+
+    assert encoder.encode_logs([{"timestamp_utc": "t", "level": "INFO", "logger_name": "x", "message": "m"}]) == {
+        "l": [["t", "INFO", "x", "m", 1]]
+    }
+
+
+def test_msgpack_round_trip():
+    pytest.importorskip("msgpack")
+    encoder = WireEncoder("msgpack", compress=True)
+    table = {}
+    frame = encoder.encode_file_events(_events(3), batch=True)
+    assert isinstance(frame, bytes)
+    assert expand_file_frame(decode_frame(frame, "msgpack"), table) == _events(3)